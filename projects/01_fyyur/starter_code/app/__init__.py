@@ -1,13 +1,24 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_bootstrap import Bootstrap
 from flask_moment import Moment
 from config import config
+from .assets import Assets
+from .autocomplete import Autocomplete
+from .cache import PageCache
+from .jobs import JobRunner
+from .routing import RoutingSQLAlchemy
+from .templating import init_bytecode_cache
+from .timing import RequestTiming
 # from flask.logging import create_logger
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 moment = Moment()
 bootstrap = Bootstrap()
+autocomplete = Autocomplete()
+page_cache = PageCache()
+request_timing = RequestTiming()
+jobs = JobRunner()
+assets = Assets()
 # log = create_logger()
 
 
@@ -19,9 +30,19 @@ def create_app(config_name):
     db.init_app(app)
     moment.init_app(app)
     bootstrap.init_app(app)
+    page_cache.init_app(app)
+    request_timing.init_app(app)
+    jobs.init_app(app)
+    assets.init_app(app)
+    init_bytecode_cache(app)
     # log.init_app(app)
 
     from .main import main as main_blueprint
     app.register_blueprint(main_blueprint)
 
+    from .api import api as api_blueprint
+    app.register_blueprint(api_blueprint, url_prefix='/api/v1')
+
+    autocomplete.init_app(app)
+
     return app
@@ -0,0 +1,27 @@
+from flask import jsonify
+from . import api
+
+
+def error_response(status, message):
+    response = jsonify({'error': status, 'message': message})
+    response.status_code = status
+    return response
+
+
+class InvalidParameter(ValueError):
+    pass
+
+
+@api.errorhandler(InvalidParameter)
+def bad_request(error):
+    return error_response(400, str(error))
+
+
+@api.errorhandler(404)
+def not_found_error(error):
+    return error_response(404, 'Resource not found.')
+
+
+@api.errorhandler(500)
+def server_error(error):
+    return error_response(500, 'Internal server error.')
@@ -0,0 +1,183 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from flask import request, jsonify, current_app, abort
+from sqlalchemy import literal, tuple_
+from . import api
+from .errors import InvalidParameter
+from ..models import db, Artist, Venue, Show, DeletionJob
+from ..queries import venues_in_box, venues_near
+
+# The field profiles a client picks with ?profile=, on top of which ?fields=
+# keeps a subset of the keys
+PROFILES = {'s': 'format_s', 'm': 'format_m', 'l': 'format_l'}
+
+
+def fieldset(model, default_profile):
+    profile = request.args.get('profile', default_profile)
+    if not hasattr(model, PROFILES.get(profile, '')):
+        raise InvalidParameter(f'Unknown profile {profile!r}.')
+    fields = sorted(filter(None, request.args.get('fields', '').split(',')))
+    return profile, fields
+
+
+def represent(obj, profile, fields):
+    data = getattr(obj, PROFILES[profile])()
+    if fields:
+        data = {name: value for name, value in data.items() if name in fields}
+    return data
+
+
+def make_etag(*parts):
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def conditional(etag, serialize):
+    # Answer 304 when the client has the current representation, before
+    # serializing anything
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(serialize())
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(
+        json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor, keys):
+    # The cursor holds the sort key of the last row of the previous page
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values = [datetime.fromisoformat(value) if key.type.python_type is
+                  datetime else int(value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError):
+        raise InvalidParameter('Invalid cursor.')
+    if len(values) != len(keys):
+        raise InvalidParameter('Invalid cursor.')
+    return values
+
+
+def page(query, keys, version=None):
+    # Keyset pagination over `keys`, which must be unique & indexed
+    profile, fields = fieldset(query.column_descriptions[0]['type'], 's')
+    per_page = current_app.config.get('API_PER_PAGE', 20)
+    limit = min(max(request.args.get('limit', per_page, type=int), 1), 100)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        query = query.filter(tuple_(*keys) > tuple_(*[
+            literal(value, key.type) for key, value in zip(keys, values)]))
+    rows = query.order_by(*keys).limit(limit + 1).all()
+    rows, more = rows[:limit], len(rows) > limit
+
+    def key(row):
+        return [getattr(row, column.key) for column in keys]
+
+    next_cursor = encode_cursor(key(rows[-1])) if more else None
+    etag = make_etag(request.path, profile, fields, limit, cursor, [
+        (key(row), version and getattr(row, version)) for row in rows])
+    return conditional(etag, lambda: {
+        'data': [represent(row, profile, fields) for row in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+def entity(model, id):
+    profile, fields = fieldset(model, 'l')
+    version = db.session.query(model.version_id).filter(
+        model.id == id, model.deleted_at.is_(None)).scalar()
+    if version is None:
+        abort(404)
+    etag = make_etag(model.__tablename__, id, version, profile, fields)
+    return conditional(etag, lambda: represent(
+        model.query.get(id), profile, fields))
+
+
+@api.route('/venues')
+def list_venues():
+    return page(Venue.query.filter(Venue.deleted_at.is_(None)), [Venue.id],
+                'version_id')
+
+
+def float_arg(name, low, high, default=None):
+    value = request.args.get(name, default, type=float)
+    if value is None or not low <= value <= high:
+        raise InvalidParameter(f'{name} must be a number in [{low}, {high}].')
+    return value
+
+
+@api.route('/venues/near')
+def near_venues():
+    # ?lat=&lng=[&radius=km] (nearest first, with their distance), or
+    # ?bbox=min_lng,min_lat,max_lng,max_lat
+    profile, fields = fieldset(Venue, 's')
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    if 'bbox' in request.args:
+        try:
+            min_lng, min_lat, max_lng, max_lat = map(
+                float, request.args['bbox'].split(','))
+            if not (-90 <= min_lat <= max_lat <= 90 and min_lng <= max_lng):
+                raise ValueError
+        except ValueError:
+            raise InvalidParameter('bbox must be min_lng,min_lat,max_lng,'
+                                   'max_lat.')
+        venues = venues_in_box(min_lat, min_lng, max_lat, max_lng).order_by(
+            Venue.id).limit(limit)
+        return jsonify({'data': [represent(venue, profile, fields)
+                                 for venue in venues]})
+
+    latitude = float_arg('lat', -90, 90)
+    longitude = float_arg('lng', -180, 180)
+    radius = float_arg('radius', 0, 500, 20)
+    data = []
+    for venue, distance in venues_near(latitude, longitude, radius, limit):
+        venue_dict = represent(venue, profile, fields)
+        venue_dict['distance_km'] = round(distance, 3)
+        data.append(venue_dict)
+    return jsonify({'data': data})
+
+
+@api.route('/venues/<int:venue_id>')
+def get_venue(venue_id):
+    return entity(Venue, venue_id)
+
+
+@api.route('/artists')
+def list_artists():
+    return page(Artist.query.filter(Artist.deleted_at.is_(None)),
+                [Artist.id], 'version_id')
+
+
+@api.route('/artists/<int:artist_id>')
+def get_artist(artist_id):
+    return entity(Artist, artist_id)
+
+
+@api.route('/shows')
+def list_shows():
+    # Shows are never updated, their keys are enough to version a page; the
+    # shows of venues & artists being deleted are left out
+    query = Show.query.join(Venue, Venue.id == Show.venue_id).join(
+        Artist, Artist.id == Show.artist_id).filter(
+        Venue.deleted_at.is_(None), Artist.deleted_at.is_(None))
+    for name in ('venue_id', 'artist_id'):
+        id = request.args.get(name, type=int)
+        if id is not None:
+            query = query.filter(getattr(Show, name) == id)
+    return page(query, [Show.start_time, Show.artist_id, Show.venue_id])
+
+
+@api.route('/deletions/<int:job_id>')
+def get_deletion(job_id):
+    # The progress of the background deletion of a venue or an artist
+    job = DeletionJob.query.get_or_404(job_id)
+    response = jsonify(job.format_l())
+    response.cache_control.no_cache = True
+    return response
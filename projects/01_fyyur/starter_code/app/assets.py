@@ -0,0 +1,215 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# The bundles of the layout, concatenated in order from the static files
+BUNDLES = {
+    'css/fyyur.css': ['css/bootstrap.min.css', 'css/layout.main.css',
+                      'css/main.css', 'css/main.responsive.css',
+                      'css/main.quickfix.css'],
+    'js/head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+    'js/fyyur.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js',
+                    'js/plugins.js'],
+}
+# The types worth serving compressed (fonts like woff & images already are)
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ttf', '.otf', '.eot', '.map'}
+# Fingerprinted files never change, they can be cached "forever"
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+CSS_TOKENS = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')'  # strings, kept as is
+    r'|(/\*(?!!).*?\*/)'                          # comments, but /*! ones
+    r'|\s*;?\s*(})\s*|\s*([{;,>])\s*'          # punctuation
+    r'|(\s+)', re.S)
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+JS_CONTINUED_LINE = re.compile(r'\\\r?$', re.M)
+
+
+def assets_dir(app):
+    return app.config.get('ASSETS_DIR') or \
+        os.path.join(app.static_folder, 'dist')
+
+
+def minify_css(css):
+    # Drop the comments, the last semicolons of the blocks & the whitespace
+    # which doesn't separate tokens, leaving the strings as they are
+    def replace(match):
+        string, comment, end, punctuation, space = match.groups()
+        if string:
+            return string
+        if comment:
+            return ''
+        return end or punctuation or ' '
+    return CSS_TOKENS.sub(replace, css).strip()
+
+
+def minify_js(js):
+    # Whitespace & whole line comments only: without a parser, anything more
+    # could change the code. Strings can only span lines as template literals
+    # or with a trailing backslash, the files having some are left as they are
+    if '`' in js or JS_CONTINUED_LINE.search(js):
+        return js
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines
+                     if line and not line.startswith('//'))
+
+
+def fingerprint(path, content):
+    # css/main.css -> dist/css/main.<hash>.css
+    root, ext = posixpath.splitext(path)
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    return f'dist/{root}.{digest}{ext}'
+
+
+def rewrite_urls(css, source, target, manifest):
+    # Point the relative url()s of `source` to the fingerprinted files, from
+    # the directory of `target`
+    def replace(match):
+        url = match.group(2)
+        if re.match(r'^(?:[a-z]+:|/|#)', url):
+            return match.group(0)
+        path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+        path = posixpath.normpath(posixpath.join(
+            posixpath.dirname(source), path))
+        path = manifest.get(path, path)
+        return f'url("{posixpath.relpath(path, posixpath.dirname(target))}' \
+               f'{suffix}")'
+    return CSS_URL.sub(replace, css)
+
+
+def static_files(static_folder, output):
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs
+                         if os.path.join(root, d) != output)
+        for name in sorted(files):
+            yield os.path.relpath(os.path.join(root, name),
+                                  static_folder).replace(os.sep, '/')
+
+
+def write_variants(output, path, content):
+    # Write the file, and its gzip & brotli variants when it's compressible
+    filename = os.path.join(output, path[len('dist/'):])
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'wb') as f:
+        f.write(content)
+    sizes = {'raw': len(content)}
+    if posixpath.splitext(path)[1] in COMPRESSIBLE:
+        compressed = gzip.compress(content, 9, mtime=0)
+        with open(filename + '.gz', 'wb') as f:
+            f.write(compressed)
+        sizes['gzip'] = len(compressed)
+        if brotli is not None:
+            compressed = brotli.compress(content)
+            with open(filename + '.br', 'wb') as f:
+                f.write(compressed)
+            sizes['br'] = len(compressed)
+    return sizes
+
+
+def build(app):
+    # Fingerprint every static file, then build the minified bundles (their
+    # url()s pointing to the fingerprinted files), and write the manifest;
+    # returns the sizes of what was written
+    output = assets_dir(app)
+    manifest, sizes = {}, {}
+    for path in static_files(app.static_folder, output):
+        with open(os.path.join(app.static_folder, path), 'rb') as f:
+            content = f.read()
+        manifest[path] = fingerprint(path, content)
+        sizes[path] = write_variants(output, manifest[path], content)
+
+    for bundle, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(app.static_folder, source),
+                      encoding='utf-8') as f:
+                text = f.read()
+            if bundle.endswith('.css'):
+                parts.append(rewrite_urls(
+                    minify_css(text), source, 'dist/' + bundle, manifest))
+            else:
+                parts.append(text if source.endswith('.min.js')
+                             else minify_js(text))
+        separator = '\n' if bundle.endswith('.css') else ';\n'
+        content = separator.join(parts).encode('utf-8')
+        manifest[bundle] = fingerprint(bundle, content)
+        sizes[bundle] = write_variants(output, manifest[bundle], content)
+
+    with open(os.path.join(output, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    app.extensions['assets'] = manifest
+    return sizes
+
+
+class Assets:
+    # Serves the files built by `flask assets build`: url_for('static', ...)
+    # gives their fingerprinted URL, which is served precompressed when the
+    # client accepts it, and cached as immutable. Without a build, the
+    # original static files are served as usual
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        manifest = {}
+        path = os.path.join(assets_dir(app), 'manifest.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                manifest = json.load(f)
+        app.extensions['assets'] = manifest
+
+        app.url_defaults(self.fingerprinted_url)
+        app.jinja_env.globals['asset_urls'] = self.urls
+        send_static = app.view_functions['static']
+        app.view_functions['static'] = \
+            lambda filename: self.send(send_static, filename)
+
+    @property
+    def manifest(self):
+        return current_app.extensions['assets']
+
+    def fingerprinted_url(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.manifest:
+            values['filename'] = self.manifest[values['filename']]
+
+    def urls(self, bundle):
+        # The URL of the built bundle, or the URLs of its files
+        if bundle in self.manifest:
+            return [url_for('static', filename=bundle)]
+        return [url_for('static', filename=source)
+                for source in BUNDLES[bundle]]
+
+    def send(self, send_static, filename):
+        if not filename.startswith('dist/'):
+            return send_static(filename=filename)
+
+        directory, path = assets_dir(current_app), filename[len('dist/'):]
+        mimetype = mimetypes.guess_type(path)[0]
+        encoding = None
+        for name, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[name] and \
+                    os.path.isfile(os.path.join(directory, path + suffix)):
+                encoding, path = name, path + suffix
+                break
+
+        # (max_age is Flask 2's, cache_timeout Flask 1's: set it afterwards)
+        response = send_from_directory(directory, path, mimetype=mimetype)
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.expires = None
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
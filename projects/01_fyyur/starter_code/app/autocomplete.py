@@ -0,0 +1,163 @@
+import re
+import time
+from bisect import bisect_left, insort
+from threading import Lock
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+
+class PrefixIndex:
+    # A sorted array of (key, kind, id, name) entries answering prefix
+    # queries with a binary search. Every word of a name starts a key, so
+    # "sax" finds "The Wild Sax Band" as well as "Saxophonic".
+
+    def __init__(self):
+        self.entries = []
+        self.keys = {}
+        self.lock = Lock()
+        # The database's names signature when the index was built, and when
+        # it was last compared (time.monotonic())
+        self.signature = None
+        self.checked_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def name_keys(name):
+        name = name.lower()
+        return [name[match.start():] for match in re.finditer(r'\w+', name)]
+
+    def add(self, kind, id, name):
+        with self.lock:
+            self._remove(kind, id)
+            keys = self.name_keys(name)
+            for key in keys:
+                insort(self.entries, (key, kind, id, name))
+            self.keys[(kind, id)] = (keys, name)
+
+    def extend(self, items):
+        # Bulk load (kind, id, name) items, sorting once instead of per insert
+        items = list(items)
+        with self.lock:
+            for kind, id, name in items:
+                self._remove(kind, id)
+            for kind, id, name in items:
+                keys = self.name_keys(name)
+                self.entries.extend((key, kind, id, name) for key in keys)
+                self.keys[(kind, id)] = (keys, name)
+            self.entries.sort()
+
+    def remove(self, kind, id):
+        with self.lock:
+            self._remove(kind, id)
+
+    def _remove(self, kind, id):
+        keys, name = self.keys.pop((kind, id), ((), None))
+        for key in keys:
+            position = bisect_left(self.entries, (key, kind, id, name))
+            del self.entries[position]
+
+    def complete(self, prefix, limit=10):
+        prefix = prefix.lower().strip()
+        results, seen = [], set()
+        if not prefix:
+            return results
+
+        # The entries starting with `prefix` are contiguous from its position;
+        # read them under the lock, add/remove shift them in place
+        with self.lock:
+            entries = self.entries
+            position = bisect_left(entries, (prefix,))
+            while position < len(entries) and len(results) < limit:
+                key, kind, id, name = entries[position]
+                if not key.startswith(prefix):
+                    break
+                if (kind, id) not in seen:
+                    seen.add((kind, id))
+                    results.append({'type': kind, 'id': id, 'name': name})
+                position += 1
+
+        return results
+
+
+class Autocomplete:
+    # The index of a worker follows its own creates, edits & deletes; every
+    # AUTOCOMPLETE_REFRESH seconds, a completion also checks the database's
+    # signature of the names, and rebuilds the index when another worker
+    # changed them
+
+    def __init__(self, app=None):
+        self.refreshing = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['autocomplete'] = PrefixIndex()
+        with app.app_context():
+            self.rebuild()
+
+    @property
+    def index(self):
+        return current_app.extensions['autocomplete']
+
+    @staticmethod
+    def signature():
+        # Changes with any listed name: the number of listed artists & venues,
+        # their highest id and the sum of their versions (bumped by updates,
+        # including the soft deletion)
+        from .models import db, Artist, Venue
+        with db.engine.connect() as connection:
+            return tuple(tuple(connection.execute(select([
+                func.count(), func.max(table.c.id),
+                func.sum(table.c.version_id)]).where(
+                table.c.deleted_at.is_(None))).first())
+                for table in (Artist.__table__, Venue.__table__))
+
+    def rebuild(self, signature=None):
+        from .models import db, Artist, Venue
+
+        # Load every artist & venue name; the tables may not exist yet
+        # (e.g. before the first migration), leaving the index empty
+        index = PrefixIndex()
+        try:
+            index.signature = signature or self.signature()
+            for kind, model in (('artist', Artist), ('venue', Venue)):
+                index.extend((kind, id, name) for id, name in
+                             db.session.query(model.id, model.name).filter(
+                                 model.deleted_at.is_(None)))
+        except SQLAlchemyError:
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+        current_app.extensions['autocomplete'] = index
+
+    def add(self, kind, id, name):
+        self.index.add(kind, id, name)
+
+    def remove(self, kind, id):
+        self.index.remove(kind, id)
+
+    def refresh(self):
+        # Rebuild the index if the names changed since it was built, checking
+        # at most every AUTOCOMPLETE_REFRESH seconds, in one thread at a time
+        index = self.index
+        interval = current_app.config.get('AUTOCOMPLETE_REFRESH', 60)
+        if not interval or time.monotonic() - index.checked_at < interval or \
+                not self.refreshing.acquire(blocking=False):
+            return
+        try:
+            index.checked_at = time.monotonic()
+            signature = self.signature()
+            if signature != index.signature:
+                self.rebuild(signature)
+        except SQLAlchemyError:
+            current_app.logger.exception('Autocomplete refresh failed')
+        finally:
+            self.refreshing.release()
+
+    def complete(self, prefix, limit=10):
+        self.refresh()
+        return self.index.complete(prefix, limit)
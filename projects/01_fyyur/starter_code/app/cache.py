@@ -0,0 +1,183 @@
+import pickle
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from flask import current_app, request, session, make_response
+from .routing import read_from_primary
+
+
+class NullBackend:
+    # Caches nothing; used to switch the page cache off (e.g. in tests)
+
+    stores = False
+
+    def __init__(self, max_entries=None):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def __len__(self):
+        return 0
+
+
+class LRUBackend:
+    # An in-process, size-bounded least recently used cache with per-entry
+    # expiry
+
+    stores = True
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def incr(self, key):
+        with self.lock:
+            value = (self.entries.get(key) or (0, None))[0] + 1
+            self.entries[key] = (value, float('inf'))
+            self.entries.move_to_end(key)
+            return value
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# The storage of LocalSharedBackend, shared by every app in the process
+shared_entries = OrderedDict()
+shared_lock = Lock()
+
+
+class LocalSharedBackend(LRUBackend):
+    # A stand-in for a shared cache server (memcached, redis): values are
+    # serialized and every app instance in the process sees the same store,
+    # which is enough to exercise cross-worker invalidation locally
+
+    def __init__(self, max_entries=1024):
+        super().__init__(max_entries)
+        self.entries = shared_entries
+        self.lock = shared_lock
+
+    def get(self, key):
+        value = super().get(key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout):
+        super().set(key, pickle.dumps(value), timeout)
+
+    def incr(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            value = pickle.loads(entry[0]) + 1 if entry else 1
+            self.entries[key] = (pickle.dumps(value), float('inf'))
+            return value
+
+
+backends = {
+    'null': NullBackend,
+    'lru': LRUBackend,
+    'shared': LocalSharedBackend,
+}
+
+
+class PageCache:
+    # Caches rendered GET responses per namespace (a route, or a route & an
+    # entity id). Invalidating a namespace bumps its version, so every cached
+    # variant (e.g. different query strings) becomes unreachable at once.
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND', 'lru')
+        if isinstance(backend, str):
+            max_entries = app.config.get('CACHE_MAX_ENTRIES', 1024)
+            backend = backends[backend](max_entries)
+        app.extensions['page_cache'] = {
+            'backend': backend,
+            'stats': {'hits': 0, 'misses': 0, 'invalidations': 0},
+        }
+
+    @property
+    def backend(self):
+        return current_app.extensions['page_cache']['backend']
+
+    @property
+    def stats(self):
+        stats = dict(current_app.extensions['page_cache']['stats'])
+        stats['entries'] = len(self.backend)
+        return stats
+
+    def count(self, name):
+        current_app.extensions['page_cache']['stats'][name] += 1
+
+    def key(self, namespace):
+        version = self.backend.get(f'version:{namespace}') or 0
+        return f'page:{namespace}:{version}:{request.query_string.decode()}'
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.incr(f'version:{namespace}')
+            self.count('invalidations')
+
+    def cached(self, namespace):
+        # `namespace` is a format string filled with the view's arguments,
+        # e.g. 'venue:{venue_id}'
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                # Pages showing flashed messages are never cached nor served
+                # from the cache
+                if request.method != 'GET' or '_flashes' in session:
+                    return f(*args, **kwargs)
+
+                key = self.key(namespace.format(**kwargs))
+                cached = self.backend.get(key)
+                if cached is not None:
+                    self.count('hits')
+                    body, status, mimetype = cached
+                    return current_app.response_class(
+                        body, status, mimetype=mimetype)
+
+                self.count('misses')
+                # A page rendered from a lagging replica would be cached
+                # under the version its write just bumped, and outlive it
+                if self.backend.stores:
+                    read_from_primary()
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200 and '_flashes' not in session:
+                    timeout = current_app.config.get(
+                        'CACHE_DEFAULT_TIMEOUT', 300)
+                    self.backend.set(key, (
+                        response.get_data(), response.status_code,
+                        response.mimetype), timeout)
+                return response
+            return decorated
+        return decorator
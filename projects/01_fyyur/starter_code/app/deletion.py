@@ -0,0 +1,116 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, select
+from . import db, jobs, page_cache
+from .models import Artist, Venue, Show, DeletionJob, venue_genres, \
+    artist_genres, count_shows, refresh_genre_counts
+
+# kind -> the kind of the other side of its shows
+counterparts = {'venue': 'artist', 'artist': 'venue'}
+
+# kind -> (model, its foreign key in shows, its genres association fk)
+entities = {
+    'venue': (Venue, Show.__table__.c.venue_id, venue_genres.c.venue_id),
+    'artist': (Artist, Show.__table__.c.artist_id, artist_genres.c.artist_id),
+}
+
+
+def start_deletion(entity):
+    # Hide the venue/artist right away, and queue the deletion of its rows
+    kind = 'venue' if isinstance(entity, Venue) else 'artist'
+    entity.deleted_at = datetime.utcnow()
+    job = DeletionJob(kind, entity.id)
+    db.session.add(job)
+    db.session.flush()
+    job_id = job.id
+    db.session.commit()
+    jobs.submit(run_deletion, job_id)
+    return job_id
+
+
+def delete_shows(connection, fk, id, batch_size):
+    # Delete the next `batch_size` shows (in start time order, an index range
+    # of (fk, start_time)) of the venue/artist, and return them
+    shows = Show.__table__
+    condition = fk == id
+    cut = connection.execute(select([shows.c.start_time]).where(
+        condition).order_by(shows.c.start_time).offset(
+        batch_size - 1).limit(1)).scalar()
+    if cut is not None:
+        condition = and_(condition, shows.c.start_time <= cut)
+
+    rows = connection.execute(select([
+        shows.c.venue_id, shows.c.artist_id, shows.c.start_time]).where(
+        condition)).fetchall()
+    if rows:
+        connection.execute(shows.delete().where(condition))
+        # The counters of the other side of the shows drop
+        count_shows(connection, rows, datetime.now(), -1)
+    return rows
+
+
+def update_job(connection, job_id, **values):
+    jobs_table = DeletionJob.__table__
+    connection.execute(jobs_table.update().where(
+        jobs_table.c.id == job_id).values(**values))
+
+
+def run_deletion(job_id, batch_size=None):
+    # Delete the shows in batches, a short transaction each, then the
+    # venue/artist itself (the database cascades to its genre links)
+    batch_size = batch_size or current_app.config['DELETE_BATCH_SIZE']
+    jobs_table = DeletionJob.__table__
+    with db.engine.begin() as connection:
+        job = connection.execute(select([jobs_table]).where(
+            jobs_table.c.id == job_id)).first()
+        update_job(connection, job_id, status='running', error=None)
+
+    try:
+        model, fk, genres_fk = entities[job.kind]
+        table = model.__table__
+        while True:
+            with db.engine.begin() as connection:
+                deleted = delete_shows(connection, fk, job.entity_id,
+                                       batch_size)
+                if deleted:
+                    update_job(connection, job_id, deleted_shows=(
+                        jobs_table.c.deleted_shows + len(deleted)))
+            if not deleted:
+                break
+            # The pages of the other side of the shows, cached meanwhile,
+            # still list them
+            counterpart = counterparts[job.kind]
+            page_cache.invalidate(*{
+                f'{counterpart}:{getattr(show, counterpart + "_id")}'
+                for show in deleted})
+
+        with db.engine.begin() as connection:
+            genre_ids = [genre_id for genre_id, in connection.execute(
+                select([genres_fk.table.c.genre_id]).where(
+                    genres_fk == job.entity_id))]
+            connection.execute(table.delete().where(
+                table.c.id == job.entity_id))
+            refresh_genre_counts(connection, genre_ids)
+            update_job(connection, job_id, status='done',
+                       finished_at=datetime.utcnow())
+        # Drop the pages cached while the job ran, with the old genre counts
+        # & shows
+        page_cache.invalidate(f'{job.kind}s', 'genres', 'shows',
+                              f'{job.kind}:{job.entity_id}')
+
+    except Exception as error:
+        with db.engine.begin() as connection:
+            update_job(connection, job_id, status='failed', error=str(error),
+                       finished_at=datetime.utcnow())
+        raise
+
+
+def resume_deletions():
+    # Run the deletions left unfinished (e.g. by a restart) to completion;
+    # returns their job ids
+    job_ids = [job_id for job_id, in db.session.query(DeletionJob.id).filter(
+        DeletionJob.status != 'done').order_by(DeletionJob.id)]
+    db.session.remove()
+    for job_id in job_ids:
+        run_deletion(job_id)
+    return job_ids
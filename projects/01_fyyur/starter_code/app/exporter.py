@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from datetime import datetime
+from . import db
+from .models import Artist, Venue, Show
+
+# The exported columns, in the layout `flask import` reads back
+export_columns = {
+    'venues': [Venue.id, Venue.name, Venue.city, Venue.state, Venue.address,
+               Venue.phone, Venue.genres, Venue.website, Venue.seeking_talent,
+               Venue.seeking_description, Venue.image_link,
+               Venue.facebook_link],
+    'artists': [Artist.id, Artist.name, Artist.city, Artist.state,
+                Artist.phone, Artist.genres, Artist.website,
+                Artist.seeking_venue, Artist.seeking_description,
+                Artist.image_link, Artist.facebook_link],
+    'shows': [Show.artist_id, Show.venue_id, Show.start_time, Show.duration],
+}
+
+mimetypes = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def export_rows(kind, batch_size=1000):
+    # Stream the rows through a server-side cursor, `batch_size` at a time,
+    # instead of loading the whole table; the venues & artists being deleted
+    # (and their shows) are left out
+    columns = export_columns[kind]
+    primary_key = columns[0].class_.__table__.primary_key.columns
+    query = db.session.query(*columns)
+    if kind == 'shows':
+        query = query.select_from(Show).join(
+            Venue, Venue.id == Show.venue_id).join(
+            Artist, Artist.id == Show.artist_id).filter(
+            Venue.deleted_at.is_(None), Artist.deleted_at.is_(None))
+    else:
+        query = query.filter(columns[0].class_.deleted_at.is_(None))
+    return query.order_by(*primary_key).yield_per(batch_size)
+
+
+def export_lines(kind, format='csv', batch_size=1000):
+    # Generate the export of `kind` as chunks of `batch_size` lines
+    names = [column.key for column in export_columns[kind]]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == 'csv':
+        writer.writerow(names)
+
+    count = 0
+    for count, row in enumerate(export_rows(kind, batch_size), 1):
+        values = [export_value(value) for value in row]
+        if format == 'csv':
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(names, values))) + '\n')
+
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell() or count == 0:
+        yield buffer.getvalue()
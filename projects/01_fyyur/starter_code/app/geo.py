@@ -0,0 +1,97 @@
+import csv
+import math
+import os
+from functools import lru_cache
+
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+# The precision of the stored geohashes, cells of about 5 x 5 m
+GEOHASH_PRECISION = 9
+CENTROIDS_PATH = os.path.join(os.path.dirname(__file__), 'data',
+                              'city_centroids.csv')
+
+
+@lru_cache(maxsize=None)
+def centroids():
+    # (city, state) -> (latitude, longitude) of the bundled city centroids
+    with open(CENTROIDS_PATH, newline='') as f:
+        return {(row['city'].casefold(), row['state'].upper()):
+                (float(row['latitude']), float(row['longitude']))
+                for row in csv.DictReader(f)}
+
+
+def geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    # Interleave the bisections of the longitude & latitude ranges, 5 bits
+    # per character; the hashes of a cell share its prefix, so a cell is a
+    # range of an index on the hashes
+    ranges = [[-180.0, 180.0], [-90.0, 90.0]]
+    values = [longitude, latitude]
+    chars, bits, bit = [], 0, 0
+    while len(chars) < precision:
+        interval, value = ranges[bit % 2], values[bit % 2]
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        bit += 1
+        if bit % 5 == 0:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+    return ''.join(chars)
+
+
+def locate(city, state):
+    # The (latitude, longitude, geohash) of the centroid of the city, or
+    # Nones when it isn't in the table
+    point = centroids().get(((city or '').strip().casefold(),
+                             (state or '').strip().upper()))
+    if point is None:
+        return None, None, None
+    return point + (geohash(*point),)
+
+
+def cell_size(precision):
+    # The (height, width) in degrees of the cells of a geohash precision
+    lat_bits = 5 * precision // 2
+    return 180 / 2 ** lat_bits, 360 / 2 ** (5 * precision - lat_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    # The (min_lat, min_lng, max_lat, max_lng) around a circle; the
+    # longitudes may go past +/-180, and span everything near the poles
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), -180, min(max_lat, 90), 180
+    delta_lng = math.degrees(radius_km / EARTH_RADIUS_KM /
+                             math.cos(math.radians(latitude)))
+    return min_lat, longitude - delta_lng, max_lat, longitude + delta_lng
+
+
+def covering_cells(min_lat, min_lng, max_lat, max_lng):
+    # The geohash prefixes of the cells covering the box: the finest cells
+    # at least as large as the box, of which it touches 4 at most. A box
+    # larger than any cell is covered by the empty prefix
+    height, width = max_lat - min_lat, max_lng - min_lng
+    precision = 0
+    while precision < GEOHASH_PRECISION:
+        cell_height, cell_width = cell_size(precision + 1)
+        if cell_height < height or cell_width < width:
+            break
+        precision += 1
+    if precision == 0:
+        return ['']
+    return sorted({geohash(latitude, (longitude + 180) % 360 - 180, precision)
+                   for latitude in (min_lat, max_lat)
+                   for longitude in (min_lng, max_lng)})
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    # Great-circle (haversine) distance
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * \
+        math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(a), 1))
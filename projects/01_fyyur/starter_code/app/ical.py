@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from . import db
+from .models import Artist, Venue, Show
+
+PRODID = '-//Fyyur//Show calendars//EN'
+
+
+def escape_text(value):
+    # Escape a TEXT property value (RFC 5545, 3.3.11)
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(
+        ',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def fold(line):
+    # Fold a content line into CRLF-terminated lines of at most 75 octets,
+    # without splitting a UTF-8 sequence (RFC 5545, 3.1)
+    encoded, chunks, limit = line.encode('utf-8'), [], 75
+    while len(encoded) > limit:
+        cut = limit
+        while encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        chunks.append(encoded[:cut])
+        # The continuation lines start with a space
+        encoded, limit = encoded[cut:], 74
+    chunks.append(encoded)
+    return b'\r\n '.join(chunks).decode('utf-8') + '\r\n'
+
+
+def ical_time(value):
+    # The show times are local times of the venue, written as floating times
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def calendar_shows(model, id, batch_size=1000):
+    # Stream the shows of the venue/artist with their artist & venue names
+    # (but not those of artists/venues being deleted), in order, from its
+    # (fk, start_time) index
+    fk = Show.venue_id if model is Venue else Show.artist_id
+    return db.session.query(
+        Show.artist_id, Show.venue_id, Show.start_time, Show.duration,
+        Artist.name.label('artist_name'), Venue.name.label('venue_name'),
+        Venue.address, Venue.city, Venue.state,
+    ).join(Artist, Artist.id == Show.artist_id).join(
+        Venue, Venue.id == Show.venue_id).filter(
+        fk == id, Artist.deleted_at.is_(None),
+        Venue.deleted_at.is_(None)).order_by(
+        Show.start_time).yield_per(batch_size)
+
+
+def counterparts_updated_at(model, id):
+    # The last update of the artists of the venue's shows (or the venues of
+    # the artist's), whose names & addresses are in its feed too
+    if model is Venue:
+        fk, counterpart, counterpart_fk = Show.venue_id, Artist, Show.artist_id
+    else:
+        fk, counterpart, counterpart_fk = Show.artist_id, Venue, Show.venue_id
+    return select([func.max(counterpart.updated_at)]).select_from(
+        Show.__table__.join(counterpart.__table__,
+                            counterpart.id == counterpart_fk)).where(
+        fk == id).as_scalar()
+
+
+def show_event(show, stamp):
+    uid = f'show-{show.artist_id}-{show.venue_id}-' \
+          f'{ical_time(show.start_time)}@fyyur'
+    end_time = show.start_time + timedelta(minutes=show.duration)
+    location = ', '.join(filter(None, [show.venue_name, show.address,
+                                       show.city, show.state]))
+    return ''.join(fold(line) for line in [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{ical_time(show.start_time)}',
+        f'DTEND:{ical_time(end_time)}',
+        f'SUMMARY:{escape_text(f"{show.artist_name} at {show.venue_name}")}',
+        f'LOCATION:{escape_text(location)}',
+        'END:VEVENT',
+    ])
+
+
+def calendar_lines(model, id, name, batch_size=1000):
+    # Generate the iCalendar feed of the venue/artist's shows, as chunks of
+    # `batch_size` events
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    yield ''.join(fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ])
+
+    events = []
+    for show in calendar_shows(model, id, batch_size):
+        events.append(show_event(show, stamp))
+        if len(events) == batch_size:
+            yield ''.join(events)
+            events = []
+
+    yield ''.join(events) + fold('END:VCALENDAR')
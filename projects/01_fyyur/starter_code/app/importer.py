@@ -0,0 +1,388 @@
+import csv
+import io
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy import and_, func, select, text, union_all
+from werkzeug.datastructures import MultiDict
+from . import db
+from .geo import locate
+from .models import Artist, Venue, Show, Genre, ImportCheckpoint, \
+    venue_genres, artist_genres, refresh_genre_counts, count_shows, \
+    MAX_SHOW_DURATION
+from .main.forms import VenueForm, ArtistForm, ShowForm
+
+
+def read_records(path, format=None):
+    # Stream the records of a CSV or NDJSON file as dicts
+    format = format or ('csv' if path.endswith('.csv') else 'ndjson')
+    with open(path, newline='') as f:
+        if format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def column_defaults(table):
+    # The Python-side defaults, which COPY wouldn't apply
+    return {column.name: column.default.arg(None) if column.default.is_callable
+            else column.default.arg for column in table.columns
+            if column.default is not None and
+            (column.default.is_scalar or column.default.is_callable)}
+
+
+def insert_rows(connection, table, rows):
+    if not rows:
+        return
+
+    # PostgreSQL: stream the batch through COPY
+    if connection.dialect.name == 'postgresql':
+        columns = list(rows[0])
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['\\N' if row[name] is None else row[name]
+                             for name in columns])
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN "
+            f"WITH (FORMAT csv, NULL '\\N')", buffer)
+        return
+
+    # Anywhere else: a single executemany
+    connection.execute(table.insert(), rows)
+
+
+def allocate_ids(connection, table, count, reserved=0):
+    # Reserve `count` primary keys above the table's ids and `reserved`
+    if count == 0:
+        return []
+    if connection.dialect.name == 'postgresql':
+        if reserved:
+            connection.execute(text(
+                "SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+                f"greatest(:reserved, (SELECT max(id) FROM {table.name})))"),
+                table=table.name, reserved=reserved)
+        return [id for id, in connection.execute(text(
+            "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+            "FROM generate_series(1, :count)"), table=table.name, count=count)]
+    start = max(reserved, connection.execute(
+        select([func.coalesce(func.max(table.c.id), 0)])).scalar()) + 1
+    return list(range(start, start + count))
+
+
+class Importer(ABC):
+    form_class = None
+    # Nullable fields whose validators only apply to non-empty values
+    optional = ()
+    # Why write() drops rows, for the import log
+    skipped = ''
+
+    def __init__(self, connection=None):
+        self.connection = connection
+
+    def form_data(self, record):
+        return MultiDict(record)
+
+    def validate(self, record):
+        # Apply the same rules as the HTML form
+        form = self.form_class(formdata=self.form_data(record),
+                               meta={'csrf': False})
+        form.validate()
+        errors = {name: messages for name, messages in form.errors.items()
+                  if name not in self.optional or form[name].data}
+        if errors:
+            return None, errors
+        return form.data, None
+
+    def existing_ids(self, model, ids, listed=False):
+        # The `ids` taken in the model's table; only those of the listed rows
+        # (not being deleted) with `listed`
+        if not ids:
+            return set()
+        table = model.__table__
+        condition = table.c.id.in_(ids)
+        if listed:
+            condition = and_(condition, table.c.deleted_at.is_(None))
+        return {id for id, in self.connection.execute(
+            select([table.c.id]).where(condition))}
+
+    @abstractmethod
+    def write(self, rows):
+        # Insert the valid `rows`, dropping (from the list) those the
+        # database would refuse
+        pass
+
+
+class EntityImporter(Importer):
+    model = None
+    association = None
+    fields = ()
+    optional = ('image_link', 'facebook_link')
+    skipped = 'id already taken'
+
+    def form_data(self, record):
+        data = MultiDict(record)
+        genres = record.get('genres') or []
+        if isinstance(genres, str):
+            genres = [name.strip() for name in genres.split(',')]
+        data.setlist('genres', genres)
+        return data
+
+    def validate(self, record):
+        data, errors = super().validate(record)
+        if data is None:
+            return None, errors
+
+        # Leave the empty optional fields out, to get their column default
+        row = {name: data[name] for name in self.fields
+               if data[name] or name not in self.optional}
+        row['id'] = int(record['id']) if record.get('id') else None
+        row['genres'] = ','.join(Genre.split(','.join(data['genres'])))
+        return row, None
+
+    def ensure_genres(self, names):
+        # Get the ids of the genres named `names`, creating the missing ones
+        genres = Genre.__table__
+        query = select([genres.c.name, genres.c.id]).where(
+            genres.c.name.in_(names))
+        ids = dict(self.connection.execute(query).fetchall())
+        missing = [{'name': name, 'num_venues': 0, 'num_artists': 0}
+                   for name in names if name not in ids]
+        if missing:
+            self.connection.execute(genres.insert(), missing)
+            ids = dict(self.connection.execute(query).fetchall())
+        return ids
+
+    def write(self, rows):
+        table = self.model.__table__
+        defaults = column_defaults(table)
+
+        # Drop the rows whose id is taken, by a listed row or by an earlier
+        # row of the batch: the whole batch would fail (again on resuming)
+        taken = self.existing_ids(self.model, {
+            row['id'] for row in rows if row['id'] is not None})
+        kept = []
+        for row in rows:
+            if row['id'] is not None:
+                if row['id'] in taken:
+                    continue
+                taken.add(row['id'])
+            kept.append(row)
+        rows[:] = kept
+
+        # Give an id to the rows coming without one
+        explicit = [row['id'] for row in rows if row['id'] is not None]
+        new_ids = iter(allocate_ids(self.connection, table,
+                                    len(rows) - len(explicit),
+                                    max(explicit, default=0)))
+        for row in rows:
+            if row['id'] is None:
+                row['id'] = next(new_ids)
+            for column in table.columns:
+                row.setdefault(column.name, defaults.get(column.name))
+
+        insert_rows(self.connection, table, rows)
+        if explicit and self.connection.dialect.name == 'postgresql':
+            self.connection.execute(text(
+                "SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+                f"(SELECT max(id) FROM {table.name}))"), table=table.name)
+
+        # Link the rows to their normalized genres
+        links = {(row['id'], name) for row in rows
+                 for name in Genre.split(row['genres'])}
+        if not links:
+            return
+        genre_ids = self.ensure_genres({name for _, name in links})
+        owner, genre = self.association.c.keys()
+        self.connection.execute(self.association.insert(), [
+            {owner: id, genre: genre_ids[name]} for id, name in links])
+        refresh_genre_counts(self.connection, list(genre_ids.values()))
+
+
+class VenueImporter(EntityImporter):
+    form_class = VenueForm
+    model = Venue
+    association = venue_genres
+    fields = ('name', 'city', 'state', 'address', 'phone', 'image_link',
+              'facebook_link')
+
+    def validate(self, record):
+        row, errors = super().validate(record)
+        if row is not None:
+            row['latitude'], row['longitude'], row['geohash'] = locate(
+                row['city'], row['state'])
+        return row, errors
+
+
+class ArtistImporter(EntityImporter):
+    form_class = ArtistForm
+    model = Artist
+    association = artist_genres
+    fields = ('name', 'city', 'state', 'phone', 'image_link', 'facebook_link')
+
+
+class ShowImporter(Importer):
+    form_class = ShowForm
+    skipped = ('unknown artist or venue (or being deleted), or overlapping '
+               'another booking')
+
+    def form_data(self, record):
+        # Leave the blank fields out, to get the form defaults (duration)
+        return MultiDict({name: value for name, value in record.items()
+                          if value not in ('', None)})
+
+    def validate(self, record):
+        data, errors = super().validate(record)
+        if data is None:
+            return None, errors
+        try:
+            return {'artist_id': int(data['artist_id']),
+                    'venue_id': int(data['venue_id']),
+                    'start_time': data['start_time'],
+                    'duration': data['duration']}, None
+        except ValueError:
+            return None, {'id': ['Artist & venue ids must be integers.']}
+
+    def booked_slots(self, rows):
+        # The (start, end) slots of the listed shows of the batch's venues &
+        # artists which may overlap its shows, in a single query (a bounded
+        # range of each (fk, start_time) index): (kind, id) -> [slots]
+        shows = Show.__table__
+        start = min(row['start_time'] for row in rows) - \
+            timedelta(minutes=MAX_SHOW_DURATION)
+        end = max(row['start_time'] + timedelta(minutes=row['duration'])
+                  for row in rows)
+        window = and_(shows.c.start_time > start, shows.c.start_time < end)
+        query = union_all(*(
+            select([shows.c.venue_id, shows.c.artist_id, shows.c.start_time,
+                    shows.c.duration]).where(and_(fk.in_(ids), window))
+            for fk, ids in (
+                (shows.c.venue_id, {row['venue_id'] for row in rows}),
+                (shows.c.artist_id, {row['artist_id'] for row in rows}))))
+
+        booked = {}
+        for venue_id, artist_id, start_time, duration in {
+                tuple(show) for show in self.connection.execute(query)}:
+            slot = (start_time, start_time + timedelta(minutes=duration))
+            booked.setdefault(('venue', venue_id), []).append(slot)
+            booked.setdefault(('artist', artist_id), []).append(slot)
+        return booked
+
+    def bookable(self, row, booked):
+        # Whether the show overlaps none of the `booked` slots of its venue or
+        # artist (listed, or accepted earlier in the batch), then book it
+        start_time = row['start_time']
+        end_time = start_time + timedelta(minutes=row['duration'])
+        keys = (('venue', row['venue_id']), ('artist', row['artist_id']))
+        if any(start < end_time and start_time < end
+               for key in keys for start, end in booked.get(key, ())):
+            return False
+        for key in keys:
+            booked.setdefault(key, []).append((start_time, end_time))
+        return True
+
+    def write(self, rows):
+        # Drop the shows of unknown artists/venues and the shows overlapping
+        # another booking, which the database would refuse, and like the HTML
+        # form the shows of artists/venues being deleted
+        artist_ids = self.existing_ids(
+            Artist, {row['artist_id'] for row in rows}, listed=True)
+        venue_ids = self.existing_ids(
+            Venue, {row['venue_id'] for row in rows}, listed=True)
+        rows[:] = [row for row in rows if row['artist_id'] in artist_ids and
+                   row['venue_id'] in venue_ids]
+        booked = self.booked_slots(rows) if rows else {}
+        rows[:] = [row for row in rows if self.bookable(row, booked)]
+
+        insert_rows(self.connection, Show.__table__, rows)
+        count_shows(self.connection, [
+            (row['venue_id'], row['artist_id'], row['start_time'])
+            for row in rows], datetime.now())
+
+
+importers = {
+    'venues': VenueImporter,
+    'artists': ArtistImporter,
+    'shows': ShowImporter,
+}
+
+
+def read_checkpoint(path):
+    checkpoints = ImportCheckpoint.__table__
+    with db.engine.connect() as connection:
+        return connection.execute(select([checkpoints.c.records]).where(
+            checkpoints.c.path == path)).scalar() or 0
+
+
+def write_checkpoint(connection, path, records):
+    checkpoints = ImportCheckpoint.__table__
+    values = {'records': records, 'updated_at': datetime.utcnow()}
+    if not connection.execute(checkpoints.update().where(
+            checkpoints.c.path == path).values(**values)).rowcount:
+        connection.execute(checkpoints.insert().values(path=path, **values))
+
+
+def delete_checkpoint(path):
+    checkpoints = ImportCheckpoint.__table__
+    with db.engine.begin() as connection:
+        connection.execute(checkpoints.delete().where(
+            checkpoints.c.path == path))
+
+
+def run_import(kind, path, format=None, batch_size=1000, restart=False,
+               echo=print):
+    # Import the records of `path` in batches, each committed on its own with
+    # the checkpoint of the records it went through, so an interrupted run
+    # can be resumed without importing a batch twice
+    checkpoint = os.path.abspath(path)
+    skip = 0 if restart else read_checkpoint(checkpoint)
+    if skip:
+        echo(f'Resuming after {skip} records.')
+
+    stats = {'read': skip, 'imported': 0, 'rejected': 0}
+    records = islice(read_records(path, format), skip, None)
+    validator = importers[kind]()
+    started = time.perf_counter()
+
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+
+        rows = []
+        for number, record in enumerate(batch, stats['read'] + 1):
+            row, errors = validator.validate(record)
+            if row is None:
+                stats['rejected'] += 1
+                echo(f'Record {number} rejected: {errors}')
+            else:
+                rows.append(row)
+
+        submitted = len(rows)
+        with db.engine.begin() as connection:
+            if rows:
+                importers[kind](connection).write(rows)
+            write_checkpoint(connection, checkpoint,
+                             stats['read'] + len(batch))
+        if submitted > len(rows):
+            echo(f'{submitted - len(rows)} {kind} skipped: '
+                 f'{validator.skipped}.')
+        stats['rejected'] += submitted - len(rows)
+        stats['imported'] += len(rows)
+        stats['read'] += len(batch)
+
+        elapsed = time.perf_counter() - started
+        echo(f"{stats['read']} records read, {stats['imported']} imported, "
+             f"{stats['rejected']} rejected "
+             f"({(stats['read'] - skip) / elapsed:.0f} records/s)")
+
+    delete_checkpoint(checkpoint)
+    stats['seconds'] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,51 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from flask import current_app
+
+logger = logging.getLogger('fyyur.jobs')
+
+
+class JobRunner:
+    # Runs functions off the request, on a local thread pool & queue, within
+    # an app context. With JOB_WORKERS = 0 they run inline instead (tests)
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        workers = app.config.get('JOB_WORKERS', 2)
+        app.extensions['jobs'] = {
+            'executor': ThreadPoolExecutor(
+                workers, thread_name_prefix='fyyur-job') if workers else None,
+            'pending': set(),
+        }
+
+    def submit(self, f, *args, **kwargs):
+        app = current_app._get_current_object()
+        state = app.extensions['jobs']
+
+        def run():
+            with app.app_context():
+                try:
+                    return f(*args, **kwargs)
+                except Exception:
+                    logger.exception(f'Job {f.__name__}{args} failed')
+                    raise
+
+        if state['executor'] is None:
+            future = Future()
+            try:
+                future.set_result(run())
+            except Exception as error:
+                future.set_exception(error)
+            return future
+
+        future = state['executor'].submit(run)
+        state['pending'].add(future)
+        future.add_done_callback(state['pending'].discard)
+        return future
+
+    def wait(self, timeout=None):
+        # Wait for the submitted jobs to finish
+        return wait(list(current_app.extensions['jobs']['pending']), timeout)
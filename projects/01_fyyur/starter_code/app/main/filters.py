@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from . import main
+
+# The app's own formats, which take precedence over Babel's named formats
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+NAMED_FORMATS = ('short', 'medium', 'long', 'full')
+
+
+@lru_cache(maxsize=64)
+def compiled_pattern(format, locale):
+    # Resolve & compile a Babel pattern once per (format, locale); Babel is
+    # imported by the first page to format a date, not at boot
+    import babel.dates
+    from babel import Locale
+    locale = Locale.parse(locale or babel.dates.LC_TIME)
+    if format in DATETIME_FORMATS:
+        pattern = DATETIME_FORMATS[format]
+    elif format in NAMED_FORMATS:
+        # Babel's own short/medium/long/full: the locale's date & time
+        # patterns, combined the way babel.dates.format_datetime does
+        date = babel.dates.get_date_format(format, locale).pattern
+        time = babel.dates.get_time_format(format, locale).pattern
+        pattern = babel.dates.get_datetime_format(format, locale).replace(
+            '{0}', time).replace('{1}', date)
+    else:
+        pattern = format
+    return babel.dates.parse_pattern(pattern), locale
+
+
+@lru_cache(maxsize=4096)
+def cached_format_datetime(value, format, locale):
+    # Listings repeat the same start times, so keep their formatted output
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    if value.tzinfo is None:
+        # Like babel.dates.format_datetime, read naive datetimes as UTC
+        value = value.replace(tzinfo=timezone.utc)
+    pattern, locale = compiled_pattern(format, locale)
+    return pattern.apply(value, locale)
+
+
+@main.app_template_filter('datetime')
+def format_datetime(value, format='medium', locale=None):
+    return cached_format_datetime(value, format, locale)
@@ -1,50 +1,134 @@
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
+from sqlalchemy.exc import IntegrityError
 from . import main
-from flask import render_template, request, redirect, url_for, flash
-from ..models import db, Artist, Venue, Show
+from flask import render_template, request, redirect, url_for, flash, \
+    jsonify, abort, Response, stream_with_context
+from .. import autocomplete, page_cache
+from ..deletion import start_deletion
+from ..exporter import export_lines, mimetypes
+from ..ical import calendar_lines, counterparts_updated_at
+from ..models import db, Artist, Venue, Show, DEFAULT_SHOW_DURATION, \
+    MAX_SHOW_DURATION
+from ..projections import projections
+from ..queries import venue_directory, venue_detail, artist_detail, \
+    genre_filter, genre_list, booking_conflicts, shows_between, listed, \
+    both_listed
+from ..search import search
 from .forms import ShowForm, VenueForm, ArtistForm, DeleteArtist, DeleteVenue
 
 
+def venue_pages(venue_id):
+    # The cached pages showing a venue: its own, the listings & the pages of
+    # the artists playing there
+    artist_ids = db.session.query(Show.artist_id).filter(
+        Show.venue_id == venue_id).distinct()
+    return ['venues', 'genres', 'shows', f'venue:{venue_id}'] + \
+        [f'artist:{artist_id}' for artist_id, in artist_ids]
+
+
+def artist_pages(artist_id):
+    # The cached pages showing an artist: its own, the listings & the pages
+    # of the venues it plays at
+    venue_ids = db.session.query(Show.venue_id).filter(
+        Show.artist_id == artist_id).distinct()
+    return ['artists', 'genres', 'shows', f'artist:{artist_id}'] + \
+        [f'venue:{venue_id}' for venue_id, in venue_ids]
+
+
+def calendar(model, id):
+    # Answer 304 while the venue/artist, its shows and their artists/venues
+    # haven't changed since the client's copy, else stream the feed as it's
+    # read
+    entity = db.session.query(
+        model.name, model.updated_at,
+        counterparts_updated_at(model, id).label('counterparts_updated_at'),
+    ).filter(model.id == id, model.deleted_at.is_(None)).first()
+    if entity is None:
+        abort(404)
+
+    modified = max(filter(None, [entity.updated_at,
+                                 entity.counterparts_updated_at]),
+                   default=None)
+    modified = modified and modified.replace(microsecond=0,
+                                             tzinfo=timezone.utc)
+    if modified and request.if_modified_since and \
+            modified <= request.if_modified_since:
+        response = Response(status=304)
+    else:
+        response = Response(
+            stream_with_context(calendar_lines(model, id, entity.name)),
+            mimetype='text/calendar')
+    response.last_modified = modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def parse_date(value):
+    # Report out of range dates as ValueErrors, which request.args.get drops
+    # (dateutil is imported by the first date to parse, not at boot)
+    import dateutil.parser
+    try:
+        return dateutil.parser.parse(value)
+    except OverflowError:
+        raise ValueError(value)
+
+
 @main.route('/')
 def index():
     return render_template('pages/home.html')
 
 
+@main.route('/api/autocomplete')
+def autocomplete_names():
+    # Answer from the in-memory prefix index, without touching the database
+    prefix = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    return jsonify({'data': autocomplete.complete(prefix, limit)})
+
+
+@main.route('/api/cache/stats')
+def cache_stats():
+    # Hit/miss counters of the page cache, for monitoring
+    return jsonify(page_cache.stats)
+
+
+@main.route('/export/<any(venues, artists, shows):kind>'
+            '.<any(csv, ndjson):format>')
+def export(kind, format):
+    # Stream the export as it's read, instead of building it in memory
+    return Response(
+        stream_with_context(export_lines(kind, format)),
+        mimetype=mimetypes[format],
+        headers={'Content-Disposition':
+                 f'attachment; filename={kind}.{format}'})
+
+
+@main.route('/genres')
+@page_cache.cached('genres')
+def genres():
+    try:
+        # Get all the genres with their precomputed venue & artist counts
+        return render_template('pages/genres.html', genres=genre_list())
+
+    except Exception:
+        db.session.rollback()
+        print(sys.exc_info())
+        flash("Something went wrong. Please try again.")
+        return redirect(url_for('.index'))
+
+    finally:
+        db.session.close()
+
+
 @main.route('/venues')
+@page_cache.cached('venues')
 def venues():
 
-    data = []
-    date = datetime.now()
-
     try:
-        # Get all the unique locations (city, state) of venues
-        locations = Venue.query.with_entities(
-            Venue.city.distinct(), Venue.state).all()
-
-        # Loop over all the locations & create a data_dict for each one
-        for location in locations:
-            data_dict = {}
-            city, state = location
-            data_dict['city'] = city
-            data_dict['state'] = state
-
-            # Get all venues in location
-            venue_list = []
-            venues = Venue.query.filter(Venue.city == city).all()
-
-            # Loop over all venues in that location & create a venue_dict for each one
-            for venue in venues:
-                venue_id, venue_dict = venue.id, venue.format_l()
-
-                # Get the number of upcoming shows for that venue
-                venue_dict['num_upcoming_shows'] = Show.query.filter(
-                    Show.venue_id == venue_id,
-                    Show.start_time > date).count()
-                venue_list.append(venue_dict)
-
-            data_dict['venues'] = venue_list
-            data.append(data_dict)
+        # Get all the venues (of the requested genre) grouped by location
+        genre = request.args.get('genre')
+        data = venue_directory(genre)
 
         return render_template('pages/venues.html', areas=data)
 
@@ -61,27 +145,11 @@ def venues():
 @main.route('/venues/search', methods=['POST'])
 def search_venues():
 
-    data = {}
-    date = datetime.now()
-
     try:
-        # Get the search term and query the database using LIKE
+        # Get the search term & page and query the search backend
         search_term = request.form.get('search_term', '')
-        venues = Venue.query.filter(Venue.name.ilike(f'%{search_term}%')).all()
-
-        data['count'] = len(venues)
-        data['data'] = []
-
-        # Loop over the resulting venues
-        for venue in venues:
-            venue_id, venue_dict = venue.id, venue.format_s()
-
-            # Get the number of upcoming shows for that venue
-            venue_dict['num_upcoming_shows'] = Show.query.filter(
-                Show.venue_id == venue_id,
-                Show.start_time > date).count()
-
-            data['data'].append(venue_dict)
+        page = max(request.form.get('page', 1, type=int), 1)
+        data = search(Venue, search_term, page)
 
         return render_template('pages/search_venues.html',
                                results=data, search_term=search_term)
@@ -97,6 +165,7 @@ def search_venues():
 
 
 @main.route('/venues/<int:venue_id>', methods=['GET', 'POST'])
+@page_cache.cached('venue:{venue_id}')
 def show_venue(venue_id):
 
     date = datetime.now()
@@ -106,49 +175,26 @@ def show_venue(venue_id):
         # If the user clicks the Delete Venue button
         if request.method == 'POST':
 
-            # Delelte the venue from the database
-            venue = Venue.query.get(venue_id)
-            db.session.delete(venue)
-            db.session.commit()
-
-            # Flash a success message and redirect to homepage
-            flash(f'Venue {venue.name} was successfully deleted!')
-            return redirect(url_for('.index'))
-
-        # Get the venue with id = venue_id & create a data dict
-        venue_dict = Venue.query.get(venue_id).format_l()
-        venue_dict['upcoming_shows'] = []
-        venue_dict['past_shows'] = []
-
-        # Get the upcoming shows for that venue
-        upcoming_shows = Show.query.filter(
-            Show.venue_id == venue_id,
-            Show.start_time > date).all()
-
-        # Get the needed data from all upcoming shows
-        for show in upcoming_shows:
-            artist_id = show.artist_id
-            artist_dict = Artist.query.get(artist_id).format_m()
-            artist_dict['start_time'] = str(show.start_time)
-            venue_dict['upcoming_shows'].append(artist_dict)
-
-        venue_dict['upcoming_shows_count'] = len(upcoming_shows)
-
-        # Get the past shows for that venue
-        past_shows = Show.query.filter(
-            Show.venue_id == venue_id,
-            Show.start_time < date).all()
-
-        # Get the needed data from past shows
-        for show in past_shows:
-            artist_id = show.artist_id
-            artist_dict = Artist.query.get(artist_id).format_m()
-            artist_dict['start_time'] = str(show.start_time)
-            venue_dict['past_shows'].append(artist_dict)
-
-        venue_dict['past_shows_count'] = len(past_shows)
-
-        return render_template('pages/show_venue.html', venue=venue_dict, form=form)
+            # Hide the venue, and delete it and its shows in the background
+            # (once: one being deleted already is not found)
+            venue = listed(Venue, venue_id)
+            if venue is not None:
+                name, pages = venue.name, venue_pages(venue_id)
+                job_id = start_deletion(venue)
+                autocomplete.remove('venue', venue_id)
+                page_cache.invalidate(*pages)
+
+                # Flash a success message, with where to follow the
+                # deletion, and redirect to homepage
+                status = url_for('api.get_deletion', job_id=job_id)
+                flash(f'Venue {name} was successfully deleted! '
+                      f'Deletion status: {status}')
+                return redirect(url_for('.index'))
+
+        # Get the venue with all its upcoming & past shows
+        venue_dict = venue_detail(venue_id, date)
+        if venue_dict is not None:
+            return render_template('pages/show_venue.html', venue=venue_dict, form=form)
 
     except Exception:
         db.session.rollback()
@@ -159,6 +205,14 @@ def show_venue(venue_id):
     finally:
         db.session.close()
 
+    # The venue doesn't exist, or is being deleted
+    abort(404)
+
+
+@main.route('/venues/<int:venue_id>/calendar.ics')
+def venue_calendar(venue_id):
+    return calendar(Venue, venue_id)
+
 
 @main.route('/venues/create', methods=['GET'])
 def create_venue_form():
@@ -183,6 +237,8 @@ def create_venue_submission():
         venue = Venue(name, city, state, address, phone, genres, facebook_link)
         db.session.add(venue)
         db.session.commit()
+        autocomplete.add('venue', venue.id, venue.name)
+        page_cache.invalidate('venues', 'genres')
 
         # On successful insert flash success
         flash('Venue ' + request.form['name'] + ' was successfully listed!')
@@ -199,13 +255,17 @@ def create_venue_submission():
 
 
 @main.route('/artists')
+@page_cache.cached('artists')
 def artists():
 
     data = []
 
     try:
-        # Get all the artists data
-        artists = Artist.query.all()
+        # Get the ids & names of the artists (of the requested genre)
+        genre = request.args.get('genre')
+        projection = projections[Artist, 's']
+        artists = projection.all(genre_filter(projection.query().filter(
+            Artist.deleted_at.is_(None)), Artist, genre))
         for artist in artists:
             data.append(artist.format_s())
 
@@ -224,30 +284,13 @@ def artists():
 @main.route('/artists/search', methods=['POST'])
 def search_artists():
 
-    data = {}
-    date = datetime.now()
-
     try:
-        # Get the search term and query the database using LIKE
+        # Get the search term & page and query the search backend
         search_term = request.form.get('search_term', '')
-        venues = Artist.query.filter(
-            Artist.name.ilike(f'%{search_term}%')).all()
-
-        data['count'] = len(venues)
-        data['data'] = []
-
-        # Loop over the resulting venues
-        for venue in venues:
-            venue_id, venue_dict = venue.id, venue.format_s()
-
-            # Get the number of upcoming shows for that venue
-            venue_dict['num_upcoming_shows'] = Show.query.filter(
-                Show.venue_id == venue_id,
-                Show.start_time > date).count()
-
-            data['data'].append(venue_dict)
+        page = max(request.form.get('page', 1, type=int), 1)
+        data = search(Artist, search_term, page)
 
-        return render_template('pages/search_venues.html',
+        return render_template('pages/search_artists.html',
                                results=data, search_term=search_term)
 
     except Exception:
@@ -261,6 +304,7 @@ def search_artists():
 
 
 @main.route('/artists/<int:artist_id>', methods=['GET', 'POST'])
+@page_cache.cached('artist:{artist_id}')
 def show_artist(artist_id):
 
     date = datetime.now()
@@ -269,48 +313,26 @@ def show_artist(artist_id):
     try:
         # If the user clicks the Delete Artist button
         if request.method == 'POST':
-            artist = Artist.query.get(artist_id)
-            db.session.delete(artist)
-            db.session.commit()
-
-            # Flash a success message and redirect to homepage
-            flash(f'Artist {artist.name} was successfully deleted!')
-            return redirect(url_for('.index'))
-
-        # Get the artist with id = artist_id & create a data dict
-        artist_dict = Artist.query.get(artist_id).format_l()
-        artist_dict['upcoming_shows'] = []
-        artist_dict['past_shows'] = []
-
-        # Get the upcoming shows for that artist
-        upcoming_shows = Show.query.filter(
-            Show.artist_id == artist_id,
-            Show.start_time > date).all()
-
-        # Get the needed data from all upcoming shows
-        for show in upcoming_shows:
-            venue_id = show.venue_id
-            venue_dict = Venue.query.get(venue_id).format_m()
-            venue_dict['start_time'] = str(show.start_time)
-            artist_dict['upcoming_shows'].append(venue_dict)
-
-        artist_dict['upcoming_shows_count'] = len(upcoming_shows)
-
-        # Get the past shows for that artist
-        past_shows = Show.query.filter(
-            Show.artist_id == artist_id,
-            Show.start_time < date).all()
-
-        # Get the needed data from past shows
-        for show in past_shows:
-            venue_id = show.venue_id
-            venue_dict = Venue.query.get(venue_id).format_m()
-            venue_dict['start_time'] = str(show.start_time)
-            artist_dict['past_shows'].append(venue_dict)
-
-        artist_dict['past_shows_count'] = len(past_shows)
-
-        return render_template('pages/show_artist.html', artist=artist_dict, form=form)
+            # Hide the artist, and delete it and its shows in the background
+            # (once: one being deleted already is not found)
+            artist = listed(Artist, artist_id)
+            if artist is not None:
+                name, pages = artist.name, artist_pages(artist_id)
+                job_id = start_deletion(artist)
+                autocomplete.remove('artist', artist_id)
+                page_cache.invalidate(*pages)
+
+                # Flash a success message, with where to follow the
+                # deletion, and redirect to homepage
+                status = url_for('api.get_deletion', job_id=job_id)
+                flash(f'Artist {name} was successfully deleted! '
+                      f'Deletion status: {status}')
+                return redirect(url_for('.index'))
+
+        # Get the artist with all its upcoming & past shows
+        artist_dict = artist_detail(artist_id, date)
+        if artist_dict is not None:
+            return render_template('pages/show_artist.html', artist=artist_dict, form=form)
 
     except Exception:
         db.session.rollback()
@@ -321,6 +343,14 @@ def show_artist(artist_id):
     finally:
         db.session.close()
 
+    # The artist doesn't exist, or is being deleted
+    abort(404)
+
+
+@main.route('/artists/<int:artist_id>/calendar.ics')
+def artist_calendar(artist_id):
+    return calendar(Artist, artist_id)
+
 
 @main.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
@@ -329,8 +359,10 @@ def edit_artist(artist_id):
 
     try:
         # Get the artist's data
-        artist = Artist.query.get(artist_id).format_l()
-        return render_template('forms/edit_artist.html', form=form, artist=artist)
+        artist = listed(Artist, artist_id)
+        if artist is not None:
+            return render_template('forms/edit_artist.html', form=form,
+                                   artist=artist.format_l())
 
     except Exception:
         db.session.rollback()
@@ -340,6 +372,9 @@ def edit_artist(artist_id):
     finally:
         db.session.close()
 
+    # The artist doesn't exist, or is being deleted
+    abort(404)
+
 
 @main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
@@ -353,20 +388,24 @@ def edit_artist_submission(artist_id):
         genres = ','.join(data.getlist('genres'))
         facebook_link = data.get('facebook_link', '')
 
-        # Get the artist and update its data
-        artist = Artist.query.get(artist_id)
-        artist.name = name
-        artist.city = city
-        artist.state = state
-        artist.phone = phone
-        artist.genres = genres
-        artist.facebook_link = facebook_link
-        db.session.add(artist)
-        db.session.commit()
+        # Get the artist (unless it's being deleted) and update its data
+        artist = listed(Artist, artist_id)
+        if artist is not None:
+            artist.name = name
+            artist.city = city
+            artist.state = state
+            artist.phone = phone
+            artist.set_genres(genres)
+            artist.facebook_link = facebook_link
+            db.session.add(artist)
+            db.session.commit()
+            autocomplete.add('artist', artist.id, artist.name)
+            page_cache.invalidate(*artist_pages(artist_id))
 
-        # On successful insert flash success
-        flash('Artist ' + request.form['name'] + ' was successfully updated!')
-        return redirect(url_for('.show_artist', artist_id=artist_id))
+            # On successful insert flash success
+            flash('Artist ' + request.form['name'] +
+                  ' was successfully updated!')
+            return redirect(url_for('.show_artist', artist_id=artist_id))
 
     except Exception:
         db.session.rollback()
@@ -377,6 +416,9 @@ def edit_artist_submission(artist_id):
     finally:
         db.session.close()
 
+    # The artist doesn't exist, or is being deleted
+    abort(404)
+
 
 @main.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
@@ -385,8 +427,10 @@ def edit_venue(venue_id):
 
     try:
         # Get the venue's data
-        venue = Venue.query.get(venue_id).format_l()
-        return render_template('forms/edit_venue.html', form=form, venue=venue)
+        venue = listed(Venue, venue_id)
+        if venue is not None:
+            return render_template('forms/edit_venue.html', form=form,
+                                   venue=venue.format_l())
 
     except Exception:
         db.session.rollback()
@@ -396,6 +440,9 @@ def edit_venue(venue_id):
     finally:
         db.session.close()
 
+    # The venue doesn't exist, or is being deleted
+    abort(404)
+
 
 @main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
@@ -410,20 +457,25 @@ def edit_venue_submission(venue_id):
         genres = ','.join(data.getlist('genres'))
         facebook_link = data.get('facebook_link', '')
 
-        # Get the venue and update its data
-        venue = Venue.query.get(venue_id)
-        venue.name = name
-        venue.city = city
-        venue.state = state
-        venue.phone = phone
-        venue.genres = genres
-        venue.facebook_link = facebook_link
-        db.session.add(venue)
-        db.session.commit()
+        # Get the venue (unless it's being deleted) and update its data
+        venue = listed(Venue, venue_id)
+        if venue is not None:
+            venue.name = name
+            venue.city = city
+            venue.state = state
+            venue.set_location()
+            venue.phone = phone
+            venue.set_genres(genres)
+            venue.facebook_link = facebook_link
+            db.session.add(venue)
+            db.session.commit()
+            autocomplete.add('venue', venue.id, venue.name)
+            page_cache.invalidate(*venue_pages(venue_id))
 
-        # On successful insert flash success
-        flash('Venue ' + request.form['name'] + ' was successfully updated!')
-        return redirect(url_for('.show_venue', venue_id=venue_id))
+            # On successful insert flash success
+            flash('Venue ' + request.form['name'] +
+                  ' was successfully updated!')
+            return redirect(url_for('.show_venue', venue_id=venue_id))
 
     except Exception:
         db.session.rollback()
@@ -434,6 +486,9 @@ def edit_venue_submission(venue_id):
     finally:
         db.session.close()
 
+    # The venue doesn't exist, or is being deleted
+    abort(404)
+
 
 @main.route('/artists/create', methods=['GET'])
 def create_artist_form():
@@ -457,6 +512,8 @@ def create_artist_submission():
         artist = Artist(name, city, state, phone, genres, facebook_link)
         db.session.add(artist)
         db.session.commit()
+        autocomplete.add('artist', artist.id, artist.name)
+        page_cache.invalidate('artists', 'genres')
 
         # On successful insert flash success
         flash('Artist ' + request.form['name'] + ' was successfully listed!')
@@ -473,19 +530,24 @@ def create_artist_submission():
 
 
 @main.route('/shows')
+@page_cache.cached('shows')
 def shows():
     data = []
 
     try:
-        # Get all the shows
-        shows = Show.query.all()
+        # Get the shows starting between ?from= & ?to= (unparsable dates are
+        # ignored), with their artist & venue in the same query
+        shows = shows_between(request.args.get('from', type=parse_date),
+                              request.args.get('to', type=parse_date))
 
         # Loop over each show and generate its data
         for show in shows:
             show_dict = show.format_l()
-            show_dict['artist_name'] = show.artist.name
-            show_dict['artist_image_link'] = show.artist.image_link
-            show_dict['venue_name'] = show.venue.name
+            # The datetime itself, which the datetime filter formats as is
+            show_dict['start_time'] = show.start_time
+            show_dict['artist_name'] = show.artist_name
+            show_dict['artist_image_link'] = show.artist_image_link
+            show_dict['venue_name'] = show.venue_name
             data.append(show_dict)
 
         return render_template('pages/shows.html', shows=data)
@@ -511,19 +573,43 @@ def create_show_submission():
     try:
         # Get the submitted form data
         data = request.form
-        artist_id = data.get('artist_id')
-        venue_id = data.get('venue_id')
-        start_time = data.get('start_time')
+        artist_id = data.get('artist_id', type=int)
+        venue_id = data.get('venue_id', type=int)
+        start_time = parse_date(data.get('start_time'))
+        duration = data.get('duration', DEFAULT_SHOW_DURATION, type=int)
+
+        if not 1 <= duration <= MAX_SHOW_DURATION:
+            flash('A show lasts between a minute and a day.')
+            return redirect(url_for('.create_shows'))
+
+        # Only book listed venues & artists, not those being deleted
+        if not both_listed(venue_id, artist_id):
+            flash("The venue or the artist doesn't exist.")
+            return redirect(url_for('.create_shows'))
+
+        # Refuse to book the venue or the artist twice at the same time (the
+        # database enforces it too, against concurrent bookings)
+        if booking_conflicts(venue_id, artist_id, start_time, duration):
+            flash('The venue or the artist is already booked at that time.')
+            return redirect(url_for('.create_shows'))
 
         # Create the show and insert it to the DB
-        show = Show(artist_id, venue_id, start_time)
+        show = Show(artist_id, venue_id, start_time, duration)
         db.session.add(show)
         db.session.commit()
+        page_cache.invalidate('shows', f'venue:{venue_id}',
+                              f'artist:{artist_id}')
 
         # On successful insert flash success
         flash('Show was successfully listed!')
         return redirect(url_for('.shows'))
 
+    except IntegrityError:
+        # A concurrent booking took the slot since it was checked
+        db.session.rollback()
+        flash('The venue or the artist is already booked at that time.')
+        return redirect(url_for('.create_shows'))
+
     except Exception:
         db.session.rollback()
         print(sys.exc_info())
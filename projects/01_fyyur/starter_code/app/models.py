@@ -1,25 +1,122 @@
 import os
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import DDL, and_, bindparam, event, func, select
+from sqlalchemy.orm import attributes
 from . import db
+from .geo import locate
+
+
+venue_genres = db.Table(
+    'venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey(
+        'venues.id', ondelete="CASCADE"), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey(
+        'genres.id', ondelete="CASCADE"), primary_key=True),
+    db.Index('ix_venue_genres_genre_id', 'genre_id', 'venue_id')
+)
+
+artist_genres = db.Table(
+    'artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey(
+        'artists.id', ondelete="CASCADE"), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey(
+        'genres.id', ondelete="CASCADE"), primary_key=True),
+    db.Index('ix_artist_genres_genre_id', 'genre_id', 'artist_id')
+)
+
+
+class Genre(db.Model):
+    __tablename__ = "genres"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+    num_venues = db.Column(db.Integer, nullable=False, default=0)
+    num_artists = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, name):
+        self.name = name
+
+    @staticmethod
+    def lookup(names):
+        # Get the genres named `names`, creating the missing ones
+        if not names:
+            return []
+        genres = {genre.name: genre for genre in
+                  Genre.query.filter(Genre.name.in_(names))}
+
+        # Add new genres to the session right away, so that later lookups
+        # (autoflushing) find them instead of creating duplicates
+        for name in names:
+            if name not in genres:
+                genres[name] = Genre(name)
+                db.session.add(genres[name])
+        return [genres[name] for name in names]
+
+    @staticmethod
+    def split(genres):
+        # Split a comma-joined genres string into unique, non-empty names
+        names = (name.strip() for name in (genres or '').split(','))
+        return list(dict.fromkeys(name for name in names if name))
+
+    def format_l(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'num_venues': self.num_venues,
+            'num_artists': self.num_artists
+        }
+
+
+class GenresMixin:
+    def set_genres(self, genres):
+        # `genres` stays as a comma-joined copy for display & full-text search,
+        # `genre_list` is the normalized, indexed source for genre filtering
+        names = Genre.split(genres)
+        self.genres = ','.join(names)
+        self.genre_list = Genre.lookup(names)
+
+
+# Show durations, in minutes. The longest one bounds how far back an
+# overlapping show can start, which keeps overlap checks to an index range
+DEFAULT_SHOW_DURATION = 120
+MAX_SHOW_DURATION = 24 * 60
 
 
 class Show(db.Model):
     __tablename__ = "shows"
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_shows_start_time', 'start_time'),
+        db.CheckConstraint(f'duration BETWEEN 1 AND {MAX_SHOW_DURATION}',
+                           name='ck_shows_duration'),
+    )
     artist_id = db.Column(db.Integer, db.ForeignKey(
         'artists.id', ondelete="CASCADE"), primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey(
         'venues.id', ondelete="CASCADE"), primary_key=True)
     start_time = db.Column(db.DateTime, primary_key=True)
+    duration = db.Column(db.Integer, nullable=False,
+                         default=DEFAULT_SHOW_DURATION,
+                         server_default=str(DEFAULT_SHOW_DURATION))
 
-    def __init__(self, artist_id, venue_id, start_time):
+    def __init__(self, artist_id, venue_id, start_time,
+                 duration=DEFAULT_SHOW_DURATION):
         self.artist_id = artist_id
         self.venue_id = venue_id
         self.start_time = start_time
+        self.duration = duration
+
+    @property
+    def end_time(self):
+        return self.start_time + timedelta(minutes=self.duration)
 
     def format_l(self):
         return {
             'artist_id': self.artist_id,
             'venue_id': self.venue_id,
-            'start_time': str(self.start_time)
+            'start_time': str(self.start_time),
+            'duration': self.duration
         }
 
     def format_s(self):
@@ -29,28 +126,81 @@ class Show(db.Model):
         }
 
 
-class Venue(db.Model):
+def booking_ddl(dialect):
+    # The database-side guarantee that no venue or artist is booked twice at
+    # the same time: a GiST exclusion constraint on PostgreSQL, a trigger
+    # running bounded index range checks on SQLite
+    if dialect == 'postgresql':
+        during = ("tsrange(start_time, "
+                  "start_time + duration * interval '1 minute')")
+        return ['CREATE EXTENSION IF NOT EXISTS btree_gist'] + [
+            f'ALTER TABLE shows ADD CONSTRAINT ex_shows_{fk}_overlap '
+            f'EXCLUDE USING gist ({fk} WITH =, {during} WITH &&)'
+            for fk in ('venue_id', 'artist_id')]
+
+    overlaps = ' OR '.join(
+        f'EXISTS (SELECT 1 FROM shows WHERE {fk} = NEW.{fk} '
+        f"AND start_time > datetime(NEW.start_time, "
+        f"'-{MAX_SHOW_DURATION} minutes') "
+        f"AND start_time < datetime(NEW.start_time, "
+        f"'+' || NEW.duration || ' minutes') "
+        f"AND datetime(start_time, '+' || duration || ' minutes') > "
+        f"datetime(NEW.start_time))"
+        for fk in ('venue_id', 'artist_id'))
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS shows_no_overlap BEFORE INSERT ON shows '
+        f'WHEN {overlaps} '
+        f"BEGIN SELECT RAISE(ABORT, 'overlapping show'); END"]
+
+
+for statement in booking_ddl('postgresql'):
+    event.listen(Show.__table__, 'after_create',
+                 DDL(statement).execute_if(dialect='postgresql'))
+for statement in booking_ddl('sqlite'):
+    event.listen(Show.__table__, 'after_create',
+                 DDL(statement).execute_if(dialect='sqlite'))
+
+
+class Venue(GenresMixin, db.Model):
     __tablename__ = "venues"
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120), nullable=False)
+    # The centroid of the city, and its geohash for the "near" searches
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)
     phone = db.Column(db.String(120), nullable=False)
     genres = db.Column(db.String(120), nullable=True)
     website = db.Column(db.String(120), nullable=True)
     seeking_talent = db.Column(db.Boolean, default=False)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
     seeking_description = db.Column(db.String(120), default='Seeking talents!')
+    # Bumped by every update, versions the API representations (ETags)
+    version_id = db.Column(db.Integer, nullable=False, default=1)
+    # When the venue or its shows last changed (UTC), for Last-Modified
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
     image_link = db.Column(
         db.String(500),
         nullable=True,
         default=f"{os.getenv('DEFAULT_IMG')}")
     facebook_link = db.Column(db.String(120), nullable=True)
+    # Set while the venue's deletion job runs, hiding it meanwhile
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    # The database deletes the shows of a deleted venue (ON DELETE CASCADE),
+    # they are never loaded for it
     artists = db.relationship(
         'Show',
         cascade='all, delete-orphan',
+        passive_deletes=True,
         backref=db.backref('venue', lazy=True)
     )
+    genre_list = db.relationship('Genre', secondary=venue_genres)
+    __mapper_args__ = {'version_id_col': version_id}
 
     def __init__(self, name, city, state, address, phone, genres, facebook_link):
         self.name = name
@@ -58,8 +208,14 @@ class Venue(db.Model):
         self.state = state
         self.address = address
         self.phone = phone
-        self.genres = genres
+        self.set_genres(genres)
         self.facebook_link = facebook_link
+        self.set_location()
+
+    def set_location(self):
+        # Place the venue at the centroid of its city, from the bundled table
+        self.latitude, self.longitude, self.geohash = locate(
+            self.city, self.state)
 
     def format_l(self):
         return {
@@ -68,6 +224,8 @@ class Venue(db.Model):
             'city': self.city,
             'state': self.state,
             'address': self.address,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'phone': self.phone,
             'genres': str(self.genres).split(','),
             'website': self.website,
@@ -91,7 +249,7 @@ class Venue(db.Model):
         }
 
 
-class Artist(db.Model):
+class Artist(GenresMixin, db.Model):
     __tablename__ = "artists"
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -101,23 +259,37 @@ class Artist(db.Model):
     genres = db.Column(db.String(120), nullable=True)
     website = db.Column(db.String(120), nullable=True)
     seeking_venue = db.Column(db.Boolean, default=False)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
     seeking_description = db.Column(db.String(120), default='Seeking venues!')
+    # Bumped by every update, versions the API representations (ETags)
+    version_id = db.Column(db.Integer, nullable=False, default=1)
+    # When the artist or its shows last changed (UTC), for Last-Modified
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow,
+                           onupdate=datetime.utcnow)
     image_link = db.Column(
         db.String(500),
         nullable=True,
         default=f"{os.getenv('DEFAULT_IMG')}")
     facebook_link = db.Column(db.String(120), nullable=True)
+    # Set while the artist's deletion job runs, hiding it meanwhile
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    # The database deletes the shows of a deleted artist (ON DELETE CASCADE),
+    # they are never loaded for it
     shows = db.relationship(
         'Show',
         cascade='all, delete-orphan',
+        passive_deletes=True,
         backref=db.backref('artist', lazy=True))
+    genre_list = db.relationship('Genre', secondary=artist_genres)
+    __mapper_args__ = {'version_id_col': version_id}
 
     def __init__(self, name, city, state, phone, genres, facebook_link):
         self.name = name
         self.city = city
         self.state = state
         self.phone = phone
-        self.genres = genres
+        self.set_genres(genres)
         self.facebook_link = facebook_link
 
     def format_l(self):
@@ -147,3 +319,155 @@ class Artist(db.Model):
             'id': self.id,
             'name': self.name
         }
+
+
+class DeletionJob(db.Model):
+    # The background deletion of a venue or an artist, and of its shows
+    __tablename__ = "deletion_jobs"
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    # queued, running, done or failed
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    deleted_shows = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __init__(self, kind, entity_id):
+        self.kind = kind
+        self.entity_id = entity_id
+
+    def format_l(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'entity_id': self.entity_id,
+            'status': self.status,
+            'deleted_shows': self.deleted_shows,
+            'error': self.error,
+            'created_at': str(self.created_at),
+            'finished_at': self.finished_at and str(self.finished_at),
+        }
+
+
+class ImportCheckpoint(db.Model):
+    # The number of records of a file an interrupted import already went
+    # through, written in the transaction of their last batch
+    __tablename__ = "import_checkpoints"
+    path = db.Column(db.String(1024), primary_key=True)
+    records = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def refresh_genre_counts(connection, genre_ids):
+    # Recount the venues & artists of the given genres from the indexed
+    # association tables
+    genres = Genre.__table__
+    connection.execute(genres.update().where(
+        genres.c.id.in_(genre_ids)).values(
+        num_venues=select([func.count()]).where(
+            venue_genres.c.genre_id == genres.c.id).as_scalar(),
+        num_artists=select([func.count()]).where(
+            artist_genres.c.genre_id == genres.c.id).as_scalar()))
+
+
+@event.listens_for(db.session, 'before_flush')
+def collect_touched_genres(session, flush_context, instances):
+    # Remember the genres gained or lost by the flushed venues & artists
+    touched = session.info.setdefault('touched_genres', set())
+    for obj in session.deleted:
+        if isinstance(obj, GenresMixin):
+            touched.update(obj.genre_list)
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, GenresMixin):
+            history = attributes.get_history(
+                obj, 'genre_list', attributes.PASSIVE_NO_INITIALIZE)
+            touched.update(history.added or ())
+            touched.update(history.deleted or ())
+
+
+@event.listens_for(db.session, 'after_flush')
+def update_genre_counts(session, flush_context):
+    touched = session.info.pop('touched_genres', None)
+    genre_ids = [genre.id for genre in touched or () if genre.id is not None]
+    if genre_ids:
+        refresh_genre_counts(session.connection(), genre_ids)
+
+
+def recount_shows(connection, date, since=None):
+    # Recount the upcoming & past shows of venues and artists. With `since`,
+    # only those having shows that became past in (since, date] are updated.
+    for table, show_fk in ((Venue.__table__, Show.venue_id),
+                           (Artist.__table__, Show.artist_id)):
+        shows = select([func.count()]).where(show_fk == table.c.id)
+        statement = table.update().values(
+            upcoming_shows_count=shows.where(
+                Show.start_time > date).as_scalar(),
+            past_shows_count=shows.where(
+                Show.start_time <= date).as_scalar())
+        if since is not None:
+            statement = statement.where(table.c.id.in_(select([show_fk]).where(
+                and_(Show.start_time > since, Show.start_time <= date))))
+        connection.execute(statement)
+
+
+def locate_venues(connection, relocate=False):
+    # Set the coordinates of the venues without any (or of every venue) from
+    # the city centroids, bumping their version (the coordinates are in their
+    # API representation); returns the number of venues located
+    table = Venue.__table__
+    query = select([table.c.id, table.c.city, table.c.state])
+    if not relocate:
+        query = query.where(table.c.geohash.is_(None))
+    params = []
+    for id, city, state in connection.execute(query).fetchall():
+        latitude, longitude, geohash = locate(city, state)
+        if geohash is not None or relocate:
+            params.append({'_id': id, 'latitude': latitude,
+                           'longitude': longitude, 'geohash': geohash})
+    if params:
+        connection.execute(table.update().where(
+            table.c.id == bindparam('_id')).values(
+            version_id=table.c.version_id + 1), params)
+    return sum(param['geohash'] is not None for param in params)
+
+
+def count_shows(connection, shows, date, delta=1):
+    # Add `delta` to the upcoming/past counters of the venue & artist of each
+    # (venue_id, artist_id, start_time) in `shows`, and mark them updated
+    deltas = Counter()
+    for venue_id, artist_id, start_time in shows:
+        upcoming = start_time > date
+        deltas[(Venue, upcoming, venue_id)] += delta
+        deltas[(Artist, upcoming, artist_id)] += delta
+
+    updates = {}
+    for (model, upcoming, id), total in deltas.items():
+        if total:
+            updates.setdefault((model, upcoming), []).append(
+                {'_id': id, '_delta': total})
+
+    updated_at = datetime.utcnow()
+    for (model, upcoming), params in updates.items():
+        table = model.__table__
+        column = table.c.upcoming_shows_count if upcoming \
+            else table.c.past_shows_count
+        connection.execute(table.update().where(
+            table.c.id == bindparam('_id')).values(
+            {column: column + bindparam('_delta'),
+             table.c.updated_at: updated_at}), params)
+
+
+@event.listens_for(db.session, 'after_flush')
+def update_show_counts(session, flush_context):
+    # Apply the shows inserted or deleted by the flush to the counters of
+    # their venue & artist
+    date = datetime.now()
+    for objects, delta in ((session.new, 1), (session.deleted, -1)):
+        shows = [(show.venue_id, show.artist_id, show.start_time)
+                 for show in objects if isinstance(show, Show)]
+        if shows:
+            count_shows(session.connection(), shows, date, delta)
@@ -0,0 +1,60 @@
+from collections import namedtuple
+from . import db
+from .models import Artist, Show, Venue
+
+
+class Projection:
+    # The columns a format_s/m/l profile of a model reads, selected into
+    # slotted namedtuples with the model's own format method: the rows of a
+    # listing don't become ORM objects (instrumented state, identity map &
+    # all their columns), and format the same way. `extra` columns (labeled
+    # when they aren't the model's) are more fields of the rows
+
+    def __init__(self, model, profile, fields, *extra):
+        self.columns = [getattr(model, field) for field in fields] + \
+            list(extra)
+        name = f'{model.__name__}{profile.upper()}Row'
+        method = 'format_' + profile
+        self.row = type(name, (namedtuple(name, [
+            column.key for column in self.columns]),), {
+            '__slots__': (), method: getattr(model, method)})
+
+    def query(self):
+        # The query of the columns, to filter & order as usual
+        return db.session.query(*self.columns)
+
+    def all(self, query):
+        # Run the query at the Core level: the cursor's rows straight into
+        # the namedtuples, bypassing the ORM's row processing
+        return [self.row(*row) for row in db.session.execute(query.statement)]
+
+
+VENUE_L_FIELDS = ['id', 'name', 'city', 'state', 'address', 'latitude',
+                  'longitude', 'phone', 'genres', 'website', 'seeking_talent',
+                  'seeking_description', 'image_link', 'facebook_link']
+ARTIST_L_FIELDS = ['id', 'name', 'city', 'state', 'phone', 'genres',
+                   'website', 'seeking_venue', 'seeking_description',
+                   'image_link', 'facebook_link']
+
+# (model, profile) -> the projection of its format_<profile>
+projections = {
+    (Venue, 's'): Projection(Venue, 's', ['id', 'name']),
+    (Venue, 'm'): Projection(Venue, 'm', ['id', 'name', 'image_link']),
+    (Venue, 'l'): Projection(Venue, 'l', VENUE_L_FIELDS),
+    (Artist, 's'): Projection(Artist, 's', ['id', 'name']),
+    (Artist, 'm'): Projection(Artist, 'm', ['id', 'name', 'image_link']),
+    (Artist, 'l'): Projection(Artist, 'l', ARTIST_L_FIELDS),
+    (Show, 's'): Projection(Show, 's', ['artist_id', 'start_time']),
+    (Show, 'l'): Projection(Show, 'l', ['artist_id', 'venue_id',
+                                        'start_time', 'duration']),
+}
+
+# The listing pages: the venues with their number of upcoming shows, the
+# shows with the names of their artist & venue
+VENUE_DIRECTORY = Projection(Venue, 'l', VENUE_L_FIELDS,
+                             Venue.upcoming_shows_count)
+SHOW_LISTING = Projection(
+    Show, 'l', ['artist_id', 'venue_id', 'start_time', 'duration'],
+    Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+    Venue.name.label('venue_name'))
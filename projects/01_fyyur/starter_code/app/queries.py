@@ -0,0 +1,166 @@
+from datetime import timedelta
+from itertools import groupby
+from sqlalchemy import and_, or_, select, union_all
+from sqlalchemy.orm import contains_eager
+from . import db
+from .geo import bounding_box, covering_cells, distance_km
+from .models import Artist, Venue, Show, Genre, venue_genres, artist_genres, \
+    MAX_SHOW_DURATION
+from .projections import VENUE_DIRECTORY, SHOW_LISTING
+
+
+def genre_filter(query, model, genre):
+    # Restrict the query to venues/artists of `genre` using the indexed
+    # association table instead of a LIKE over the genres string
+    if not genre:
+        return query
+    if model is Venue:
+        association, model_id = venue_genres, venue_genres.c.venue_id
+    else:
+        association, model_id = artist_genres, artist_genres.c.artist_id
+    return query.join(association, model_id == model.id).join(
+        Genre, Genre.id == association.c.genre_id).filter(Genre.name == genre)
+
+
+def listed(model, id):
+    # Get the venue/artist unless it's being deleted (or doesn't exist)
+    return model.query.filter(model.id == id,
+                              model.deleted_at.is_(None)).first()
+
+
+def both_listed(venue_id, artist_id):
+    # Whether the venue & the artist both exist and aren't being deleted, in
+    # a single query
+    return all(db.session.query(*(
+        model.query.filter(model.id == id, model.deleted_at.is_(None)).exists()
+        for model, id in ((Venue, venue_id), (Artist, artist_id)))).one())
+
+
+def genre_list():
+    return [genre.format_l() for genre in Genre.query.order_by(Genre.name)]
+
+
+def venue_directory(genre=None):
+    # Get every venue with its (maintained) number of upcoming shows in a
+    # single query, ordered so that venues sharing a location are adjacent;
+    # the rows are projections, not ORM objects
+    query = VENUE_DIRECTORY.query().filter(Venue.deleted_at.is_(None))
+    rows = VENUE_DIRECTORY.all(genre_filter(query, Venue, genre).order_by(
+        Venue.state, Venue.city, Venue.id))
+
+    # Group the venues by their location (city, state)
+    data = []
+    for (city, state), group in groupby(rows, lambda venue: (venue.city, venue.state)):
+        venue_list = []
+        for venue in group:
+            venue_dict = venue.format_l()
+            venue_dict['num_upcoming_shows'] = venue.upcoming_shows_count
+            venue_list.append(venue_dict)
+
+        data.append({'city': city, 'state': state, 'venues': venue_list})
+
+    return data
+
+
+def split_shows(data, shows, counterpart, date):
+    # Partition the shows into upcoming & past in a single pass, describing
+    # each one by its counterpart (the show's artist or venue)
+    data['upcoming_shows'] = []
+    data['past_shows'] = []
+    for show in shows:
+        show_dict = getattr(show, counterpart).format_m()
+        show_dict['start_time'] = show.start_time
+        if show.start_time > date:
+            data['upcoming_shows'].append(show_dict)
+        else:
+            data['past_shows'].append(show_dict)
+
+    data['upcoming_shows_count'] = len(data['upcoming_shows'])
+    data['past_shows_count'] = len(data['past_shows'])
+    return data
+
+
+def venue_detail(venue_id, date):
+    # Get the venue, its shows and their artists in a single joined query,
+    # leaving out the shows of artists being deleted
+    venue = Venue.query.outerjoin(Show, and_(
+        Show.venue_id == Venue.id,
+        Show.artist.has(Artist.deleted_at.is_(None)))).outerjoin(
+        Artist, Artist.id == Show.artist_id).options(contains_eager(
+            Venue.artists).contains_eager(Show.artist)).filter(
+        Venue.id == venue_id, Venue.deleted_at.is_(None)).one_or_none()
+    if venue is None:
+        return None
+    return split_shows(venue.format_l(), venue.artists, 'artist', date)
+
+
+def artist_detail(artist_id, date):
+    # Get the artist, its shows and their venues in a single joined query,
+    # leaving out the shows of venues being deleted
+    artist = Artist.query.outerjoin(Show, and_(
+        Show.artist_id == Artist.id,
+        Show.venue.has(Venue.deleted_at.is_(None)))).outerjoin(
+        Venue, Venue.id == Show.venue_id).options(contains_eager(
+            Artist.shows).contains_eager(Show.venue)).filter(
+        Artist.id == artist_id, Artist.deleted_at.is_(None)).one_or_none()
+    if artist is None:
+        return None
+    return split_shows(artist.format_l(), artist.shows, 'venue', date)
+
+
+def shows_between(start=None, end=None):
+    # Get the shows starting in [start, end), with the names of their artist
+    # & venue (but not those being deleted), in order: a range scan of the
+    # start_time index, into rows of the SHOW_LISTING projection
+    query = SHOW_LISTING.query().select_from(Show).join(
+        Artist, Artist.id == Show.artist_id).join(
+        Venue, Venue.id == Show.venue_id).filter(
+        Artist.deleted_at.is_(None), Venue.deleted_at.is_(None))
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end)
+    return SHOW_LISTING.all(query.order_by(Show.start_time))
+
+
+def booking_conflicts(venue_id, artist_id, start_time, duration,
+                      connection=None):
+    # Get the shows of the venue or the artist overlapping the given slot.
+    # An overlapping show starts less than MAX_SHOW_DURATION before the slot,
+    # so each side is a bounded range scan of its (fk, start_time) index
+    end_time = start_time + timedelta(minutes=duration)
+    table = Show.__table__
+    window = and_(
+        table.c.start_time > start_time - timedelta(minutes=MAX_SHOW_DURATION),
+        table.c.start_time < end_time)
+    query = union_all(*(
+        select([table]).where(and_(fk == id, window))
+        for fk, id in ((table.c.venue_id, venue_id),
+                       (table.c.artist_id, artist_id))))
+    rows = {(row.artist_id, row.venue_id, row.start_time): row for row in
+            (connection or db.session).execute(query)}
+    return [row for row in rows.values() if row.start_time +
+            timedelta(minutes=row.duration) > start_time]
+
+
+def venues_in_box(min_lat, min_lng, max_lat, max_lng):
+    # Get the venues inside the box from ranges of the geohash index (one
+    # per covering cell) instead of comparing every venue's coordinates
+    query = Venue.query.filter(Venue.deleted_at.is_(None), or_(*(
+        and_(Venue.geohash >= prefix, Venue.geohash < prefix + '~')
+        for prefix in covering_cells(min_lat, min_lng, max_lat, max_lng))))
+    query = query.filter(Venue.latitude.between(min_lat, max_lat))
+    if -180 <= min_lng and max_lng <= 180:
+        query = query.filter(Venue.longitude.between(min_lng, max_lng))
+    return query
+
+
+def venues_near(latitude, longitude, radius_km, limit=20):
+    # Get the (venue, distance) pairs within `radius_km`, nearest first; only
+    # the venues of the bounding box of the circle are measured
+    venues = venues_in_box(*bounding_box(latitude, longitude, radius_km))
+    pairs = [(venue, distance_km(latitude, longitude, venue.latitude,
+                                 venue.longitude)) for venue in venues]
+    pairs = sorted((pair for pair in pairs if pair[1] <= radius_km),
+                   key=lambda pair: (pair[1], pair[0].id))
+    return pairs[:limit]
@@ -0,0 +1,103 @@
+import time
+import flask
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm, text
+
+# How long a measured replica lag is trusted before measuring it again
+LAG_CHECK_INTERVAL = 5
+
+
+def replica_lag(app, engine):
+    # Seconds the replica is behind the primary; infinite if unreachable
+    state = app.extensions.setdefault('replica', {'checked': 0, 'lag': 0})
+    if time.monotonic() - state['checked'] > LAG_CHECK_INTERVAL:
+        try:
+            if engine.dialect.name == 'postgresql':
+                state['lag'] = engine.scalar(text(
+                    'SELECT COALESCE(EXTRACT(EPOCH FROM now() - '
+                    'pg_last_xact_replay_timestamp()), 0)'))
+            else:
+                state['lag'] = 0
+        except Exception:
+            state['lag'] = float('inf')
+        state['checked'] = time.monotonic()
+    return state['lag']
+
+
+def reads_from_replica(db, app):
+    # Decided once per request: GET requests read from the replica, unless
+    # the client wrote recently (read your writes) or the replica lags
+    if not has_request_context() or \
+            'replica' not in (app.config['SQLALCHEMY_BINDS'] or {}):
+        return False
+    if 'fyyur.replica' not in request.environ:
+        request.environ['fyyur.replica'] = \
+            request.method in ('GET', 'HEAD') and \
+            flask.session.get('primary_until', 0) < time.time() and \
+            replica_lag(app, db.get_engine(app, 'replica')) <= \
+            app.config['REPLICA_MAX_LAG']
+    return request.environ['fyyur.replica']
+
+
+def read_from_primary():
+    # Send the rest of the request's reads to the primary, e.g. to render a
+    # page the cache keeps past the replica's lag
+    if has_request_context():
+        request.environ['fyyur.replica'] = False
+
+
+class RoutingSession(SignallingSession):
+    # Sends the reads of GET requests to the 'replica' bind, and everything
+    # else (flushes, other requests, CLI commands) to the primary
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and reads_from_replica(self.db, self.app):
+            return self.db.get_engine(self.app, bind='replica')
+        return super().get_bind(mapper, clause)
+
+
+def record_write(session, flush_context):
+    session.info['wrote'] = True
+
+
+def forget_write(session, previous_transaction):
+    session.info.pop('wrote', None)
+
+
+def stick_to_primary(session):
+    # Let the client read its own writes until the replica has them
+    if session.info.pop('wrote', None) and has_request_context():
+        flask.session['primary_until'] = time.time() + \
+            current_app.config['REPLICA_STICKY_SECONDS']
+
+
+def enforce_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores the foreign keys (and their ON DELETE CASCADE) unless
+    # asked to, on every connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys = ON')
+    cursor.close()
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        factory = orm.sessionmaker(class_=RoutingSession, db=self, **options)
+        event.listen(factory, 'after_flush', record_write)
+        event.listen(factory, 'after_soft_rollback', forget_write)
+        event.listen(factory, 'after_commit', stick_to_primary)
+        return factory
+
+    def create_engine(self, sa_url, engine_opts):
+        # The SQLite pools (NullPool, StaticPool) aren't sized
+        if sa_url.drivername == 'sqlite':
+            for name in ('pool_size', 'max_overflow', 'pool_timeout'):
+                engine_opts.pop(name, None)
+        engine = super().create_engine(sa_url, engine_opts)
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', enforce_foreign_keys)
+        return engine
@@ -0,0 +1,155 @@
+import re
+from flask import current_app
+from sqlalchemy import DDL, event, func, literal_column, or_, table, column, text
+from . import db
+from .models import Artist, Venue
+
+# The columns covered by the search, for both venues & artists
+SEARCH_COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+def search_tokens(term):
+    # Split the search term into lowercase word tokens
+    return re.findall(r'\w+', term.lower())
+
+
+class LikeSearch:
+    # Substring matching on every search column; works on any database but
+    # can't use an index, so it is only a fallback
+
+    def match(self, query, model, tokens):
+        for token in tokens:
+            query = query.filter(or_(*(
+                getattr(model, name).ilike(f'%{token}%')
+                for name in SEARCH_COLUMNS)))
+        return query, model.name
+
+    def search(self, model, term, page=1, per_page=20):
+        # Get the results with their (maintained) number of upcoming shows
+        # and the total number of hits in the same query
+        query = db.session.query(
+            model, model.upcoming_shows_count, func.count().over()).filter(
+            model.deleted_at.is_(None))
+        tokens = search_tokens(term)
+        if tokens:
+            query, rank = self.match(query, model, tokens)
+        else:
+            rank = model.name
+
+        rows = query.order_by(rank, model.id).limit(
+            per_page).offset((page - 1) * per_page).all()
+
+        data = []
+        for result, num_upcoming_shows, _ in rows:
+            result_dict = result.format_s()
+            result_dict['num_upcoming_shows'] = num_upcoming_shows
+            data.append(result_dict)
+
+        if rows:
+            count = rows[0][2]
+        elif page > 1:
+            # Past the last page, no row carries the total: count it
+            count = query.with_entities(func.count()).scalar()
+        else:
+            count = 0
+
+        return {
+            'count': count,
+            'data': data,
+            'page': page,
+            'per_page': per_page
+        }
+
+
+class SqliteSearch(LikeSearch):
+    # Prefix matching ranked by bm25 over an FTS5 shadow table kept in sync
+    # with its content table by triggers
+
+    def match(self, query, model, tokens):
+        fts_name = f'{model.__tablename__}_fts'
+        fts = table(fts_name, column('rowid'))
+        expression = ' '.join(f'"{token}"*' for token in tokens)
+        query = query.join(fts, fts.c.rowid == model.id).filter(
+            text(f'{fts_name} MATCH :expression').bindparams(
+                expression=expression))
+        # `rank` is bm25(); the function itself isn't usable next to a window
+        return query, literal_column(f'{fts_name}.rank')
+
+
+class PostgresSearch(LikeSearch):
+    # Prefix matching ranked by ts_rank over the GIN-indexed tsvector
+    # expression created by the search migration
+
+    def match(self, query, model, tokens):
+        vector = literal_column(tsvector_sql(model.__tablename__))
+        expression = func.to_tsquery(
+            literal_column("'simple'::regconfig"),
+            ' & '.join(f'{token}:*' for token in tokens))
+        query = query.filter(vector.op('@@')(expression))
+        return query, func.ts_rank(vector, expression).desc()
+
+
+backends = {
+    'like': LikeSearch,
+    'sqlite': SqliteSearch,
+    'postgresql': PostgresSearch,
+}
+
+
+def get_backend():
+    # Use the configured backend, or pick one from the database dialect
+    name = current_app.config.get('SEARCH_BACKEND') or db.engine.dialect.name
+    return backends.get(name, LikeSearch)()
+
+
+def search(model, term, page=1):
+    per_page = current_app.config.get('SEARCH_PER_PAGE', 20)
+    return get_backend().search(model, term, page, per_page)
+
+
+def tsvector_sql(tablename=None):
+    # Must stay identical to the indexed expression for the index to be used
+    prefix = f'{tablename}.' if tablename else ''
+    columns = " || ' ' || ".join(
+        f"coalesce({prefix}{name}, '')" for name in SEARCH_COLUMNS)
+    return f"to_tsvector('simple'::regconfig, {columns})"
+
+
+def fts_ddl(tablename):
+    # The FTS5 shadow table for `tablename` and the triggers keeping it in
+    # sync; updates only reindex a row when a searched column changes (not
+    # on every counter or updated_at bump of a booking)
+    fts = f'{tablename}_fts'
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{name}' for name in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{name}' for name in SEARCH_COLUMNS)
+    insert = (f'INSERT INTO {fts}(rowid, {columns}) '
+              f'VALUES (new.id, {new_values});')
+    delete = (f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+              f"VALUES ('delete', old.id, {old_values});")
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{columns}, content='{tablename}', content_rowid='id')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tablename} '
+        f'BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tablename} '
+        f'BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} '
+        f'ON {tablename} BEGIN {delete} {insert} END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+# Keep `db.create_all()` / `db.drop_all()` consistent with the migration
+for model in (Venue, Artist):
+    tablename = model.__tablename__
+    for statement in fts_ddl(tablename):
+        event.listen(model.__table__, 'after_create',
+                     DDL(statement).execute_if(dialect='sqlite'))
+    event.listen(model.__table__, 'before_drop',
+                 DDL(f'DROP TABLE IF EXISTS {tablename}_fts')
+                 .execute_if(dialect='sqlite'))
+    event.listen(model.__table__, 'after_create',
+                 DDL(f'CREATE INDEX IF NOT EXISTS ix_{tablename}_search '
+                     f'ON {tablename} USING gin ({tsvector_sql()})')
+                 .execute_if(dialect='postgresql'))
@@ -0,0 +1,133 @@
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from . import db
+from .importer import VenueImporter, ArtistImporter, ShowImporter
+from .main.forms import GENRES
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'),
+    ('Houston', 'TX'), ('Phoenix', 'AZ'), ('Philadelphia', 'PA'),
+    ('San Antonio', 'TX'), ('San Diego', 'CA'), ('Dallas', 'TX'),
+    ('Austin', 'TX'), ('San Francisco', 'CA'), ('Seattle', 'WA'),
+    ('Denver', 'CO'), ('Nashville', 'TN'), ('Portland', 'OR'),
+    ('Las Vegas', 'NV'), ('Detroit', 'MI'), ('Memphis', 'TN'),
+    ('Boston', 'MA'), ('New Orleans', 'LA'),
+]
+ADJECTIVES = ['Blue', 'Golden', 'Velvet', 'Electric', 'Rusty', 'Midnight',
+              'Silver', 'Crimson', 'Lucky', 'Wild', 'Hidden', 'Dueling']
+VENUE_NOUNS = ['Room', 'Hall', 'Lounge', 'Cellar', 'Ballroom', 'Tavern',
+               'Club', 'Garden', 'Theatre', 'Pianos Bar', 'Note', 'Barrel']
+ARTIST_NOUNS = ['Petals', 'Wolves', 'Echoes', 'Riders', 'Saints', 'Owls',
+                'Machines', 'Sisters', 'Kings', 'Ghosts', 'Lanterns', 'Tides']
+STREETS = ['Folsom St', 'Main St', 'Broadway', 'Elm St', 'Market St',
+           'Sunset Blvd', 'Whiskey Row', 'Oak Ave', 'Canal St', 'Beale St']
+
+# The genres of the forms, weighted so that a few of them dominate
+GENRE_WEIGHTS = [1 / (rank + 1) for rank in range(len(GENRES))]
+
+
+def skewed_weights(count, exponent=1.2):
+    # Zipf-like cumulative weights: a few entities get most of the picks
+    return list(accumulate(1 / (rank + 1) ** exponent
+                           for rank in range(count)))
+
+
+def pick_genres(rng):
+    count = rng.choices([1, 2, 3], [5, 3, 1])[0]
+    return ','.join(dict.fromkeys(
+        rng.choices(GENRES, GENRE_WEIGHTS, k=count)))
+
+
+def venue_rows(rng, count):
+    for i in range(count):
+        city, state = rng.choice(CITIES)
+        yield {
+            'id': None,
+            'name': f'The {rng.choice(ADJECTIVES)} {rng.choice(VENUE_NOUNS)}'
+                    f' {i + 1}',
+            'city': city,
+            'state': state,
+            'address': f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-'
+                     f'{rng.randint(1000, 9999)}',
+            'facebook_link': f'https://www.facebook.com/venue{i + 1}',
+            'genres': pick_genres(rng),
+        }
+
+
+def artist_rows(rng, count):
+    for i in range(count):
+        city, state = rng.choice(CITIES)
+        yield {
+            'id': None,
+            'name': f'{rng.choice(ADJECTIVES)} {rng.choice(ARTIST_NOUNS)}'
+                    f' {i + 1}',
+            'city': city,
+            'state': state,
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-'
+                     f'{rng.randint(1000, 9999)}',
+            'facebook_link': f'https://www.facebook.com/artist{i + 1}',
+            'genres': pick_genres(rng),
+        }
+
+
+def show_rows(rng, count, venue_ids, artist_ids, date, past_ratio):
+    # Shows are skewed towards a few busy venues & touring artists, last 1
+    # to 3 hours and start in the evening, up to 3 years back or 1 year
+    # ahead
+    venue_weights = skewed_weights(len(venue_ids))
+    artist_weights = skewed_weights(len(artist_ids))
+    for _ in range(count):
+        days = -rng.randint(1, 3 * 365) if rng.random() < past_ratio \
+            else rng.randint(1, 365)
+        start_time = date + timedelta(days=days, hours=rng.randint(18, 23),
+                                      minutes=rng.choice([0, 30]))
+        yield {
+            'venue_id': rng.choices(venue_ids, cum_weights=venue_weights)[0],
+            'artist_id': rng.choices(artist_ids,
+                                     cum_weights=artist_weights)[0],
+            'start_time': start_time,
+            'duration': rng.choice([60, 90, 120, 180]),
+        }
+
+
+def write_batches(importer_class, rows, batch_size, echo, label, ids=None):
+    # Bulk insert `rows` through the importer, a transaction per batch, and
+    # collect their ids into `ids`
+    written, started = 0, time.perf_counter()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        with db.engine.begin() as connection:
+            importer_class(connection).write(batch)
+        written += len(batch)
+        if ids is not None:
+            ids.extend(row['id'] for row in batch)
+        rate = written / (time.perf_counter() - started)
+        echo(f'{written} {label} ({rate:.0f} rows/s)')
+    return written
+
+
+def seed(venues, artists, shows, seed=0, past_ratio=0.7, batch_size=1000,
+         date=None, echo=print):
+    # Generate the same dataset for the same arguments; shows are placed
+    # relative to `date` (default: today at midnight)
+    rng = random.Random(seed)
+    date = date or datetime.combine(datetime.now().date(), datetime.min.time())
+
+    venue_ids, artist_ids = [], []
+    write_batches(VenueImporter, venue_rows(rng, venues), batch_size, echo,
+                  'venues', venue_ids)
+    write_batches(ArtistImporter, artist_rows(rng, artists), batch_size, echo,
+                  'artists', artist_ids)
+    if not venue_ids or not artist_ids:
+        shows = 0
+    # Shows overlapping another booking are skipped by the importer
+    written = write_batches(
+        ShowImporter, show_rows(rng, shows, venue_ids, artist_ids, date,
+                                past_ratio), batch_size, echo, 'shows')
+    return {'venues': len(venue_ids), 'artists': len(artist_ids),
+            'shows': written}
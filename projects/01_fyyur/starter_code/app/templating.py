@@ -0,0 +1,27 @@
+import os
+import time
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_bytecode_cache(app):
+    # Keep the compiled templates on disk, shared by the workers and across
+    # restarts; TEMPLATE_CACHE_DIR = '' disables it
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if directory is None:
+        directory = os.path.join(app.instance_path, 'jinja_cache')
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+        directory, '%s.jinja.cache')
+
+
+def compile_templates(app):
+    # Load every template once, which writes its bytecode to the cache;
+    # returns {name: seconds to compile}
+    timings = {}
+    for name in app.jinja_env.list_templates():
+        start = time.perf_counter()
+        app.jinja_env.get_template(name)
+        timings[name] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,126 @@
+import json
+import logging
+import time
+from flask import current_app, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('fyyur.timing')
+
+
+def current_timing():
+    # The timing of the current request, if it's being timed (kept in its
+    # environ, which a streamed body still reads from)
+    return request.environ.get('fyyur.timing') if has_request_context() \
+        else None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement(conn, cursor, statement, parameters, context,
+                    executemany):
+    if current_timing() is not None:
+        conn.info.setdefault('timing_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def end_statement(conn, cursor, statement, parameters, context, executemany):
+    timing = current_timing()
+    if timing is not None and conn.info.get('timing_start'):
+        duration = time.perf_counter() - conn.info['timing_start'].pop()
+        timing['db'] += duration
+        timing['statements'].append((statement, duration))
+
+
+class TimedTemplate(Template):
+    # Adds the rendering time of the templates to the request's timing
+    # (included and extended templates render within their parent)
+
+    def render(self, *args, **kwargs):
+        timing = current_timing()
+        if timing is None:
+            return super().render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            timing['templates'] += time.perf_counter() - start
+
+
+class RequestTiming:
+    # Measures the SQL statements, DB time & template rendering time of each
+    # request, reports them in a Server-Timing header & a log line, and logs
+    # the statements of the requests slower than SLOW_REQUEST_MS
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.jinja_env.template_class = TimedTemplate
+        app.before_request(self.start)
+        app.after_request(self.finish)
+
+        # The log lines are the point: write them out (once) even when
+        # nothing configured logging
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.propagate = False
+        if logger.level == logging.NOTSET:
+            logger.setLevel(logging.INFO)
+
+    def start(self):
+        if not current_app.config.get('REQUEST_TIMING', True):
+            return
+        request.environ['fyyur.timing'] = {
+            'start': time.perf_counter(), 'db': 0, 'templates': 0,
+            'statements': []}
+
+    def finish(self, response):
+        timing = current_timing()
+        if timing is None:
+            return response
+        total = time.perf_counter() - timing['start']
+
+        response.headers.add('Server-Timing', ', '.join([
+            f'db;dur={timing["db"] * 1000:.1f};desc="'
+            f'{len(timing["statements"])} queries"',
+            f'tpl;dur={timing["templates"] * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ]))
+
+        record = {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+        }
+        threshold = current_app.config.get('SLOW_REQUEST_MS', 500)
+        if response.is_streamed:
+            # The body (exports, feeds) is read & queried after the headers:
+            # log the request once it's sent
+            response.call_on_close(
+                lambda: self.log(timing, record, threshold))
+        else:
+            self.log(timing, record, threshold)
+        return response
+
+    def log(self, timing, record, threshold):
+        # The request's log line; with its statements when it was slow
+        total = time.perf_counter() - timing['start']
+        statements = timing['statements']
+        record.update({
+            'total_ms': round(total * 1000, 1),
+            'db_ms': round(timing['db'] * 1000, 1),
+            'template_ms': round(timing['templates'] * 1000, 1),
+            'queries': len(statements),
+        })
+        if threshold is not None and total * 1000 >= threshold:
+            record['slow'] = True
+            record['statements'] = [
+                {'sql': statement, 'ms': round(duration * 1000, 1)}
+                for statement, duration in statements]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
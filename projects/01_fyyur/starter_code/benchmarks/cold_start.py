@@ -0,0 +1,121 @@
+"""Measure the time to first response of fresh Fyyur workers, without the
+template bytecode cache, with an empty one, and with one precompiled by
+`flask templates compile`, and report the medians per mode as JSON.
+
+    python -m benchmarks.cold_start [--runs N] [--output FILE]
+
+Each run is a new Python process, which imports the app (create_app) and
+then requests every page once: the first hit of a page compiles its
+templates, unless the cache has them.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROUTES = ['/', '/venues', '/artists', '/shows', '/genres', '/venues/1',
+          '/artists/1', '/venues/create', '/artists/create', '/shows/create',
+          '/venues/1/edit', '/artists/1/edit']
+
+
+def worker():
+    # Runs in the fresh process: time the import, then each first response
+    start = time.perf_counter()
+    from fyyur import app
+    timings = {'import_ms': (time.perf_counter() - start) * 1000}
+    client = app.test_client()
+    first = time.perf_counter()
+    for url in ROUTES:
+        response_start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        timings[url] = (time.perf_counter() - response_start) * 1000
+        if response.status_code >= 400:
+            raise SystemExit(f'{url} answered {response.status_code}')
+    timings['first_responses_ms'] = (time.perf_counter() - first) * 1000
+    timings['total_ms'] = (time.perf_counter() - start) * 1000
+    print(json.dumps(timings))
+
+
+def spawn(env):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.cold_start', '--worker'],
+        env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def prepare(env):
+    # A small seeded database, shared by the runs
+    subprocess.run([sys.executable, '-c', (
+        'from fyyur import app\n'
+        'from app import db\n'
+        'from app.seed import seed\n'
+        'with app.app_context():\n'
+        '    db.create_all()\n'
+        '    seed(20, 20, 100, echo=lambda message: None)\n')],
+        env=env, check=True)
+
+
+def run(args):
+    directory = tempfile.mkdtemp()
+    base = dict(os.environ, FLASK_APP='fyyur.py', FLASK_CONFIG='testing',
+                REQUEST_TIMING='0', TEST_DB_URL='sqlite:///' +
+                os.path.join(directory, 'bench.sqlite'))
+    cache = os.path.join(directory, 'jinja_cache')
+    try:
+        prepare(dict(base, TEMPLATE_CACHE_DIR=''))
+        modes = {}
+        for mode in ('no_cache', 'empty_cache', 'precompiled'):
+            env = dict(base, TEMPLATE_CACHE_DIR='' if mode == 'no_cache'
+                       else cache)
+            samples = []
+            for _ in range(args.runs):
+                shutil.rmtree(cache, ignore_errors=True)
+                if mode == 'precompiled':
+                    subprocess.run(
+                        [sys.executable, '-m', 'flask', 'templates',
+                         'compile'], env=env, check=True,
+                        capture_output=True)
+                samples.append(spawn(env))
+            modes[mode] = {key: round(statistics.median(
+                sample[key] for sample in samples), 2) for key in samples[0]}
+            print(f'{mode:>12}: import {modes[mode]["import_ms"]} ms, '
+                  f'first responses {modes[mode]["first_responses_ms"]} ms',
+                  file=sys.stderr)
+    finally:
+        shutil.rmtree(directory)
+
+    return {'meta': {
+        'runs': args.runs, 'routes': ROUTES,
+        'python': sys.version.split()[0],
+        'date': datetime.now().isoformat(timespec='seconds'),
+    }, 'modes': modes}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Fresh processes per mode')
+    parser.add_argument('--output', help='Write the JSON report to a file')
+    parser.add_argument('--worker', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker:
+        return worker()
+
+    output = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
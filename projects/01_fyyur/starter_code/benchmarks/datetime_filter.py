@@ -0,0 +1,65 @@
+"""Per-call cost of the `datetime` template filter on a /shows render.
+
+    python -m benchmarks.datetime_filter [num_rows] [distinct_times]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+import babel.dates
+import dateutil.parser
+from flask import render_template
+
+from app import create_app
+from app.main.filters import cached_format_datetime, format_datetime
+
+
+def format_datetime_uncached(value, format='medium'):
+    # The previous filter: parse & resolve the pattern on every call
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def shows(num_rows, distinct_times):
+    start = datetime(2035, 1, 1, 20, 0)
+    return [{
+        'artist_id': i, 'venue_id': i, 'artist_name': f'Artist {i}',
+        'venue_name': f'Venue {i}', 'artist_image_link': '',
+        'start_time': str(start + timedelta(hours=i % distinct_times)),
+    } for i in range(num_rows)]
+
+
+def render(app, data):
+    with app.test_request_context('/shows'):
+        started = time.perf_counter()
+        render_template('pages/shows.html', shows=data)
+        return time.perf_counter() - started
+
+
+def main(num_rows=10000, distinct_times=2000):
+    app = create_app('testing')
+    data = shows(num_rows, distinct_times)
+    print(f'{num_rows} rows, {distinct_times} distinct start times')
+
+    # Render once so template compilation isn't measured
+    render(app, data[:1])
+
+    results = []
+    app.jinja_env.filters['datetime'] = format_datetime_uncached
+    results.append(('uncached', render(app, data)))
+
+    app.jinja_env.filters['datetime'] = format_datetime
+    cached_format_datetime.cache_clear()
+    results.append(('cached, cold', render(app, data)))
+    results.append(('cached, warm', render(app, data)))
+
+    for name, seconds in results:
+        print(f'{name:>13}: {seconds * 1000:8.1f} ms per render   '
+              f'{seconds / num_rows * 1e6:7.2f} us per call')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
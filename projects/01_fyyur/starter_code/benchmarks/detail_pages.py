@@ -0,0 +1,104 @@
+"""Compare the venue/artist detail page loaders against the per-show lookups
+they replaced.
+
+    python -m benchmarks.detail_pages [num_shows] [repeat]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+
+db_dir = tempfile.mkdtemp()
+db_path = os.path.join(db_dir, 'bench.sqlite')
+os.environ['TEST_DB_URL'] = 'sqlite:///' + db_path
+
+from app import create_app, db  # noqa: E402
+from app.models import Artist, Show, Venue  # noqa: E402
+from app.models import DEFAULT_SHOW_DURATION  # noqa: E402
+from app.queries import venue_detail, artist_detail  # noqa: E402
+
+
+def seed(num_shows):
+    # One venue & one artist carrying every show, half past & half upcoming,
+    # one after the other (a venue or an artist can't be booked twice at once)
+    venue = Venue('Venue', 'City', 'ST', 'Address', '555', 'Jazz', '')
+    artist = Artist('Artist', 'City', 'ST', '555', 'Jazz', '')
+    db.session.add_all([venue, artist])
+    db.session.flush()
+
+    now = datetime.now()
+    db.session.add_all([
+        Show(artist.id, venue.id, now + timedelta(
+            minutes=DEFAULT_SHOW_DURATION * (i - num_shows // 2)))
+        for i in range(num_shows)
+    ])
+    db.session.commit()
+    return venue.id, artist.id
+
+
+def venue_detail_per_show(venue_id, date):
+    # The previous implementation: two filtered queries, then one lookup per show
+    venue_dict = Venue.query.get(venue_id).format_l()
+    venue_dict['upcoming_shows'] = []
+    venue_dict['past_shows'] = []
+    for key, condition in (('upcoming_shows', Show.start_time > date),
+                           ('past_shows', Show.start_time < date)):
+        shows = Show.query.filter(Show.venue_id == venue_id, condition).all()
+        for show in shows:
+            artist_dict = Artist.query.get(show.artist_id).format_m()
+            artist_dict['start_time'] = str(show.start_time)
+            venue_dict[key].append(artist_dict)
+        venue_dict[key + '_count'] = len(shows)
+    return venue_dict
+
+
+def artist_detail_per_show(artist_id, date):
+    artist_dict = Artist.query.get(artist_id).format_l()
+    artist_dict['upcoming_shows'] = []
+    artist_dict['past_shows'] = []
+    for key, condition in (('upcoming_shows', Show.start_time > date),
+                           ('past_shows', Show.start_time < date)):
+        shows = Show.query.filter(Show.artist_id == artist_id, condition).all()
+        for show in shows:
+            venue_dict = Venue.query.get(show.venue_id).format_m()
+            venue_dict['start_time'] = str(show.start_time)
+            artist_dict[key].append(venue_dict)
+        artist_dict[key + '_count'] = len(shows)
+    return artist_dict
+
+
+def measure(loader, entity_id, repeat):
+    def run():
+        loader(entity_id, datetime.now())
+        db.session.remove()
+    return min(timeit.repeat(run, number=1, repeat=repeat)) * 1000
+
+
+def main(num_shows=500, repeat=5):
+    app = create_app('testing')
+    try:
+        with app.app_context():
+            db.create_all()
+            try:
+                venue_id, artist_id = seed(num_shows)
+                print(f'{num_shows} shows, best of {repeat} runs')
+                for name, before, after, entity_id in (
+                        ('venue', venue_detail_per_show, venue_detail,
+                         venue_id),
+                        ('artist', artist_detail_per_show, artist_detail,
+                         artist_id)):
+                    before_ms = measure(before, entity_id, repeat)
+                    after_ms = measure(after, entity_id, repeat)
+                    print(f'{name:>6}: before {before_ms:8.2f} ms   '
+                          f'after {after_ms:8.2f} ms   '
+                          f'speedup {before_ms / after_ms:6.1f}x')
+            finally:
+                db.session.remove()
+                db.drop_all()
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,231 @@
+"""Drive every Fyyur route with concurrent workers through the WSGI test
+client, against a seeded database, and report latency percentiles &
+throughput per route as JSON.
+
+    python -m benchmarks.http_load [--venues N] [--artists N] [--shows N]
+        [--workers N] [--requests N] [--cache BACKEND] [--output FILE]
+        [--baseline FILE] [--tolerance RATIO]
+
+With --baseline, routes whose p95 latency or throughput regressed by more
+than --tolerance against a stored report are flagged, and the exit status
+is 1.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Boot the app from fyyur.py, on its own database unless one is given
+db_path = os.path.join(tempfile.mkdtemp(), 'bench.sqlite')
+os.environ.setdefault('FLASK_CONFIG', 'testing')
+os.environ.setdefault('TEST_DB_URL', 'sqlite:///' + db_path)
+
+from fyyur import app  # noqa: E402
+from app import db, autocomplete, page_cache  # noqa: E402
+from app.geo import centroids  # noqa: E402
+from app.models import Artist, Venue  # noqa: E402
+from app.seed import seed  # noqa: E402
+
+
+def routes(rng, venue_ids, artist_ids):
+    # name -> (method, url, form data) factories; each call picks new ids
+    venue = {'name': 'Bench Venue', 'city': 'City', 'state': 'CA',
+             'address': 'Address', 'phone': '555', 'genres': ['Jazz'],
+             'facebook_link': ''}
+    artist = {name: value for name, value in venue.items()
+              if name != 'address'}
+    today = datetime.now()
+    start = today + timedelta(days=400)
+
+    def show():
+        start_time = start + timedelta(minutes=rng.randint(0, 10 ** 7))
+        return {'artist_id': rng.choice(artist_ids),
+                'venue_id': rng.choice(venue_ids),
+                'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')}
+
+    return {
+        'home': lambda: ('get', '/', None),
+        'venues': lambda: ('get', '/venues', None),
+        'venues_by_genre': lambda: ('get', '/venues?genre=Jazz', None),
+        'artists': lambda: ('get', '/artists', None),
+        'genres': lambda: ('get', '/genres', None),
+        'shows': lambda: ('get', '/shows', None),
+        'shows_range': lambda: (
+            'get', f'/shows?from={today:%Y-%m-%d}&to='
+                   f'{today + timedelta(days=30):%Y-%m-%d}', None),
+        'venue_detail': lambda: (
+            'get', f'/venues/{rng.choice(venue_ids)}', None),
+        'artist_detail': lambda: (
+            'get', f'/artists/{rng.choice(artist_ids)}', None),
+        'venue_calendar': lambda: (
+            'get', f'/venues/{rng.choice(venue_ids)}/calendar.ics', None),
+        'artist_calendar': lambda: (
+            'get', f'/artists/{rng.choice(artist_ids)}/calendar.ics', None),
+        'search_venues': lambda: (
+            'post', '/venues/search',
+            {'search_term': rng.choice(['the', 'blue', 'hall', 'club'])}),
+        'search_artists': lambda: (
+            'post', '/artists/search',
+            {'search_term': rng.choice(['wolves', 'golden', 'saints'])}),
+        'autocomplete': lambda: (
+            'get', f'/api/autocomplete?q={rng.choice(["th", "bl", "go"])}',
+            None),
+        'api_venues': lambda: ('get', '/api/v1/venues?profile=l', None),
+        'api_near': lambda: (
+            'get', '/api/v1/venues/near?lat=%.4f&lng=%.4f&radius=50'
+            % rng.choice(list(centroids().values())), None),
+        'api_artist': lambda: (
+            'get', f'/api/v1/artists/{rng.choice(artist_ids)}', None),
+        'create_venue': lambda: ('post', '/venues/create', venue),
+        'create_artist': lambda: ('post', '/artists/create', artist),
+        'create_show': lambda: ('post', '/shows/create', show()),
+    }
+
+
+def percentile(values, q):
+    # Nearest-rank percentile of sorted `values`
+    return values[max(math.ceil(q / 100 * len(values)) - 1, 0)]
+
+
+def drive(make_request, requests, workers):
+    # Send `requests` requests from `workers` threads, each with its own
+    # client, and return the latencies (s), error count & wall time
+    per_worker = [requests // workers + (i < requests % workers)
+                  for i in range(workers)]
+
+    def work(count):
+        client = app.test_client()
+        latencies, errors = [], 0
+        for _ in range(count):
+            method, url, data = make_request()
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data=data)
+            response.get_data()
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(work, per_worker))
+    wall = time.perf_counter() - start
+    latencies = sorted(latency for result in results for latency in result[0])
+    return latencies, sum(result[1] for result in results), wall
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    with app.app_context():
+        if args.cache:
+            app.config['CACHE_BACKEND'] = args.cache
+            page_cache.init_app(app)
+        db.create_all()
+        if not Venue.query.first():
+            seed(args.venues, args.artists, args.shows, args.seed,
+                 echo=lambda message: None)
+            autocomplete.rebuild()
+        venue_ids = [id for id, in db.session.query(Venue.id)]
+        artist_ids = [id for id, in db.session.query(Artist.id)]
+        db.session.remove()
+
+    report = {'meta': {
+        'venues': len(venue_ids), 'artists': len(artist_ids),
+        'workers': args.workers, 'requests': args.requests,
+        'cache': args.cache or app.config['CACHE_BACKEND'],
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+        'date': datetime.now().isoformat(timespec='seconds'),
+    }, 'routes': {}}
+
+    for name, make_request in routes(rng, venue_ids, artist_ids).items():
+        if args.routes and name not in args.routes:
+            continue
+        # Warm up the route (caches, compiled templates) before measuring
+        drive(make_request, args.workers, args.workers)
+        latencies, errors, wall = drive(make_request, args.requests,
+                                        args.workers)
+        report['routes'][name] = {
+            'requests': len(latencies),
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'throughput_rps': round(len(latencies) / wall, 1),
+        }
+        print(f'{name:>16}: ' + '  '.join(
+            f'{key} {value}' for key, value in report['routes'][name].items()),
+            file=sys.stderr)
+    return report
+
+
+def compare(report, baseline, tolerance):
+    # The routes slower (p95) or with less throughput than the baseline,
+    # beyond `tolerance`
+    regressions = {}
+    for name, stats in report['routes'].items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            continue
+        p95 = stats['p95_ms'] / before['p95_ms'] - 1
+        throughput = 1 - stats['throughput_rps'] / before['throughput_rps']
+        if p95 > tolerance or throughput > tolerance:
+            regressions[name] = {
+                'p95_ms': [before['p95_ms'], stats['p95_ms']],
+                'throughput_rps': [before['throughput_rps'],
+                                   stats['throughput_rps']],
+            }
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--venues', type=int, default=500)
+    parser.add_argument('--artists', type=int, default=500)
+    parser.add_argument('--shows', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Requests per route')
+    parser.add_argument('--routes', nargs='*',
+                        help='Only benchmark these routes')
+    parser.add_argument('--cache', choices=['null', 'lru', 'shared'],
+                        help='Page cache backend (default: the config\'s)')
+    parser.add_argument('--output', help='Write the JSON report to a file')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    try:
+        report = run(args)
+    finally:
+        if os.path.exists(db_path):
+            os.remove(db_path)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report['regressions'] = regressions
+        for name, change in regressions.items():
+            print(f'REGRESSION {name}: p95 {change["p95_ms"][0]} -> '
+                  f'{change["p95_ms"][1]} ms, throughput '
+                  f'{change["throughput_rps"][0]} -> '
+                  f'{change["throughput_rps"][1]} rps', file=sys.stderr)
+        status = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Compare the listing loaders reading rows into projections against the ORM
+objects they replaced, in time and in memory.
+
+    python -m benchmarks.projections [num_rows] [repeat]
+"""
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+db_path = os.path.join(tempfile.mkdtemp(), 'bench.sqlite')
+os.environ['TEST_DB_URL'] = 'sqlite:///' + db_path
+
+from sqlalchemy.orm import joinedload  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import Artist, Show, Venue  # noqa: E402
+from app.projections import projections  # noqa: E402
+from app.queries import shows_between  # noqa: E402
+
+NUM_VENUES = 1000
+
+
+def seed(num_rows):
+    # `num_rows` artists & shows, spread over NUM_VENUES venues
+    now = datetime.now()
+    db.session.execute(Venue.__table__.insert(), [{
+        'name': f'Venue {i}', 'city': 'City', 'state': 'ST',
+        'address': f'{i} Main St', 'phone': '555-555-5555', 'genres': 'Jazz',
+        'image_link': f'https://example.com/venues/{i}.jpg',
+    } for i in range(NUM_VENUES)])
+    db.session.execute(Artist.__table__.insert(), [{
+        'name': f'Artist {i}', 'city': 'City', 'state': 'ST',
+        'phone': '555-555-5555', 'genres': 'Jazz,Rock n Roll',
+        'image_link': f'https://example.com/artists/{i}.jpg',
+        'facebook_link': f'https://www.facebook.com/artist{i}',
+    } for i in range(num_rows)])
+    db.session.execute(Show.__table__.insert(), [{
+        'artist_id': i + 1, 'venue_id': i % NUM_VENUES + 1,
+        'start_time': now + timedelta(minutes=30 * (i - num_rows // 2)),
+    } for i in range(num_rows)])
+    db.session.commit()
+
+
+def artists_orm(format):
+    # The previous implementation: ORM objects, formatted
+    return [getattr(artist, format)() for artist in Artist.query.filter(
+        Artist.deleted_at.is_(None)).all()]
+
+
+def artists_projection(format):
+    projection = projections[Artist, format[-1]]
+    return [getattr(artist, format)() for artist in projection.all(
+        projection.query().filter(Artist.deleted_at.is_(None)))]
+
+
+def shows_orm():
+    shows = Show.query.options(joinedload(Show.artist), joinedload(
+        Show.venue)).order_by(Show.start_time).all()
+    data = []
+    for show in shows:
+        show_dict = show.format_l()
+        show_dict['artist_name'] = show.artist.name
+        show_dict['artist_image_link'] = show.artist.image_link
+        show_dict['venue_name'] = show.venue.name
+        data.append(show_dict)
+    return data
+
+
+def shows_projection():
+    data = []
+    for show in shows_between():
+        show_dict = show.format_l()
+        show_dict['artist_name'] = show.artist_name
+        show_dict['artist_image_link'] = show.artist_image_link
+        show_dict['venue_name'] = show.venue_name
+        data.append(show_dict)
+    return data
+
+
+def measure(loader, repeat):
+    # (best time in ms, peak traced memory in MiB) of a fresh session's run
+    def run():
+        loader()
+        db.session.remove()
+    best = min(timeit.repeat(run, number=1, repeat=repeat)) * 1000
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def main(num_rows=100000, repeat=3):
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        try:
+            seed(num_rows)
+            print(f'{num_rows} rows, best of {repeat} runs, peak memory')
+            for name, before, after in (
+                    ('artists s', lambda: artists_orm('format_s'),
+                     lambda: artists_projection('format_s')),
+                    ('artists l', lambda: artists_orm('format_l'),
+                     lambda: artists_projection('format_l')),
+                    ('shows', shows_orm, shows_projection)):
+                assert before() == after()
+                db.session.remove()
+                before_ms, before_mib = measure(before, repeat)
+                after_ms, after_mib = measure(after, repeat)
+                print(f'{name:>9}: before {before_ms:8.1f} ms '
+                      f'{before_mib:6.1f} MiB   after {after_ms:8.1f} ms '
+                      f'{after_mib:6.1f} MiB   speedup '
+                      f'{before_ms / after_ms:4.1f}x, memory '
+                      f'{before_mib / after_mib:4.1f}x less')
+        finally:
+            db.session.remove()
+            db.drop_all()
+    os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
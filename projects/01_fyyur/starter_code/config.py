@@ -1,10 +1,73 @@
+import atexit
 import os
+import tempfile
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
+def pool_options(**defaults):
+    # Connection pool tuning, from the environment
+    options = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    for name, default in defaults.items():
+        options[name] = int(os.environ.get(f'DB_{name.upper()}', default))
+    return options
+
+
+def test_db_url():
+    # A database of the test run's own (the tests create & drop its tables),
+    # whose file is removed when the process exits
+    url = os.environ.get('TEST_DB_URL')
+    if url:
+        return url
+    path = os.path.join(tempfile.gettempdir(),
+                        f'fyyur-test-{os.getpid()}.sqlite')
+
+    def remove():
+        if os.path.exists(path):
+            os.remove(path)
+    atexit.register(remove)
+    return 'sqlite:///' + path
+
+
+def replica_binds():
+    url = os.environ.get('REPLICA_DB_URL')
+    return {'replica': url} if url else {}
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND')
+    SEARCH_PER_PAGE = int(os.environ.get('SEARCH_PER_PAGE', 20))
+    API_PER_PAGE = int(os.environ.get('API_PER_PAGE', 20))
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'lru'
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+    # How often (seconds) a worker checks for names changed by other workers
+    # in its autocomplete index; 0 never does
+    AUTOCOMPLETE_REFRESH = float(os.environ.get('AUTOCOMPLETE_REFRESH', 60))
+    REQUEST_TIMING = os.environ.get('REQUEST_TIMING', '1') == '1'
+    # Requests slower than this log their SQL statements
+    SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+    SQLALCHEMY_ENGINE_OPTIONS = pool_options(
+        pool_size=5, max_overflow=10, pool_timeout=30)
+    # GET requests read from the 'replica' bind, when there's one, unless
+    # it lags more than REPLICA_MAX_LAG seconds. After a write, a client
+    # keeps reading from the primary for REPLICA_STICKY_SECONDS
+    SQLALCHEMY_BINDS = replica_binds()
+    REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+    # Deleted venues & artists lose their shows in the background, on
+    # JOB_WORKERS threads, DELETE_BATCH_SIZE shows per transaction
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    DELETE_BATCH_SIZE = int(os.environ.get('DELETE_BATCH_SIZE', 1000))
+    # Where `flask assets build` writes (default: app/static/dist)
+    ASSETS_DIR = os.environ.get('ASSETS_DIR')
+    # Where the compiled templates are cached (default: instance/jinja_cache,
+    # '' disables the cache); `flask templates compile` fills it
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR')
 
     @staticmethod
     def init_app(app):
@@ -19,12 +82,23 @@ class DevConfig(Config):
 
 class TestConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DB_URL') or \
-        'sqlite:///' + os.path.join(basedir, 'test_db.sqlite')
+    CACHE_BACKEND = 'null'
+    # Run the jobs inline, for deterministic tests
+    JOB_WORKERS = 0
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', '')
+    SQLALCHEMY_DATABASE_URI = test_db_url()
+
+
+class ProductionConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = pool_options(
+        pool_size=10, max_overflow=20, pool_timeout=10)
+    SESSION_COOKIE_SECURE = True
 
 
 config = {
     'development': DevConfig,
     'testing': TestConfig,
+    'production': ProductionConfig,
     'default': DevConfig
 }
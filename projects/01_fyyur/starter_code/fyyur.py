@@ -1,16 +1,39 @@
 import os
-import sys
-import json
-import babel
 import click
-import dateutil.parser
-from app import create_app, db
-from flask_migrate import Migrate
-from app.models import Artist, Show, Venue
+from datetime import datetime, timedelta
+
+# Report what each module costs to import (FYYUR_PROFILE_IMPORT=1), before
+# importing any of them
+if os.environ.get('FYYUR_PROFILE_IMPORT') == '1':
+    from import_profile import report_imports
+    report_imports('fyyur')
+
+from app import create_app, db  # noqa: E402
+from app.models import (Artist, Show, Venue, recount_shows,  # noqa: E402
+                        locate_venues)
 
 
 app = create_app(os.getenv('FLASK_CONFIG') or 'default')
-migrate = Migrate(app, db)
+
+
+def init_migrate():
+    # Flask-Migrate imports Alembic, a good part of the boot time of a web
+    # worker which never uses it: it's only set up when `flask db` runs
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    return app.cli.commands['db']
+
+
+class MigrateGroup(click.Group):
+    # Stands for the `flask db` group of Flask-Migrate, which parses & runs
+    # the command line once it's used
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        return init_migrate().make_context(info_name, args, parent, **extra)
+
+
+app.cli.add_command(MigrateGroup('db', help='Perform database migrations.'))
 
 
 @app.shell_context_processor
@@ -29,13 +52,136 @@ def test(test_names):
     unittest.TextTestRunner(verbosity=2).run(tests)
 
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+@app.cli.command('recount-shows')
+@click.option('--hours', default=24, show_default=True,
+              help='Only recount entities with shows that started in the '
+                   'last HOURS hours (match the schedule of this command).')
+@click.option('--all', 'recount_all', is_flag=True,
+              help='Recount every venue & artist.')
+def recount_shows_command(hours, recount_all):
+    """Roll the show counters of venues & artists from upcoming to past."""
+    date = datetime.now()
+    since = None if recount_all else date - timedelta(hours=hours)
+    with db.engine.begin() as connection:
+        recount_shows(connection, date, since)
+    click.echo('Show counters are up to date.')
+
+
+@app.cli.command('locate-venues')
+@click.option('--all', 'relocate', is_flag=True,
+              help='Relocate every venue, not only those without coordinates.')
+def locate_venues_command(relocate):
+    """Set the coordinates of the venues from the bundled city centroids."""
+    with db.engine.begin() as connection:
+        located = locate_venues(connection, relocate)
+    click.echo(f'Located {located} venues.')
+
+
+@app.cli.command('resume-deletions')
+def resume_deletions_command():
+    """Finish the venue & artist deletions interrupted by a restart."""
+    from app.deletion import resume_deletions
+    job_ids = resume_deletions()
+    click.echo(f'Finished {len(job_ids)} deletion jobs.')
+
+
+@app.cli.group('assets')
+def assets_group():
+    """Build the static assets served in production."""
+
+
+@assets_group.command('build')
+def build_assets():
+    """Bundle, minify, fingerprint & precompress the static files."""
+    from app.assets import BUNDLES, build
+    sizes = build(app)
+    for name in BUNDLES:
+        click.echo(f'{name}: ' + ', '.join(
+            f'{size / 1024:.1f} KiB {kind}'
+            for kind, size in sizes[name].items()))
+    click.echo(f'Built {len(sizes)} assets.')
+
+
+@app.cli.group('templates')
+def templates_group():
+    """Manage the compiled templates cache."""
+
+
+@templates_group.command('compile')
+def compile_templates_command():
+    """Precompile every template into the bytecode cache."""
+    from app.templating import compile_templates
+    if app.jinja_env.bytecode_cache is None:
+        raise click.ClickException('The template cache is disabled '
+                                   '(TEMPLATE_CACHE_DIR).')
+    timings = compile_templates(app)
+    click.echo(f'Compiled {len(timings)} templates in '
+               f'{sum(timings.values()):.2f}s.')
+
+
+@app.cli.group('import')
+def import_group():
+    """Bulk import venues, artists & shows from CSV or NDJSON files."""
+
+
+def import_command(kind):
+    @import_group.command(kind, help=f'Import the {kind} listed in FILE.')
+    @click.argument('path', metavar='FILE', type=click.Path(exists=True))
+    @click.option('--format', type=click.Choice(['csv', 'ndjson']),
+                  help='Format of FILE (default: guessed from its extension).')
+    @click.option('--batch-size', default=1000, show_default=True,
+                  help='Number of records inserted per transaction.')
+    @click.option('--restart', is_flag=True,
+                  help='Ignore the checkpoint of an interrupted import.')
+    def command(path, format, batch_size, restart):
+        from app.importer import run_import
+        stats = run_import(kind, path, format, batch_size, restart,
+                           echo=click.echo)
+        rate = (stats['imported'] + stats['rejected']) / max(
+            stats['seconds'], 1e-9)
+        click.echo(f"Imported {stats['imported']} {kind} "
+                   f"({stats['rejected']} rejected) in "
+                   f"{stats['seconds']:.1f}s, {rate:.0f} records/s.")
+    return command
+
+
+for kind in ('venues', 'artists', 'shows'):
+    import_command(kind)
+
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']),
+              help='Output format (default: guessed from --output, or csv).')
+@click.option('--output', '-o', type=click.File('w'), default='-',
+              help='File to write to (default: stdout).')
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Number of rows fetched from the database at a time.')
+def export_command(kind, format, output, batch_size):
+    """Export the venues, artists or shows as CSV or NDJSON."""
+    from app.exporter import export_lines
+    if format is None:
+        format = 'ndjson' if output.name.endswith('.ndjson') else 'csv'
+    for chunk in export_lines(kind, format, batch_size):
+        output.write(chunk)
 
 
-app.jinja_env.filters['datetime'] = format_datetime
+@app.cli.command('seed')
+@click.option('--venues', default=1000, show_default=True)
+@click.option('--artists', default=1000, show_default=True)
+@click.option('--shows', default=10000, show_default=True)
+@click.option('--seed', 'seed_value', default=0, show_default=True,
+              help='Random seed; the same seed generates the same data.')
+@click.option('--past-ratio', default=0.7, show_default=True,
+              help='Share of the shows which already took place.')
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Number of rows inserted per transaction.')
+def seed_command(venues, artists, shows, seed_value, past_ratio, batch_size):
+    """Generate synthetic venues, artists & shows for load testing."""
+    from app.seed import seed
+    started = datetime.now()
+    counts = seed(venues, artists, shows, seed_value, past_ratio, batch_size,
+                  echo=click.echo)
+    click.echo(f"Seeded {counts['venues']} venues, {counts['artists']} "
+               f"artists & {counts['shows']} shows in "
+               f"{(datetime.now() - started).total_seconds():.1f}s.")
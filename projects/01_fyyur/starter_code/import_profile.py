@@ -0,0 +1,78 @@
+"""Report the import cost of every module of a fresh Python process.
+
+    FYYUR_PROFILE_IMPORT=1 flask run        # or any entry point of fyyur.py
+    python import_profile.py [MODULE] [--top N]
+
+The module is imported in a child interpreter with CPython's own import
+timer (-X importtime), and the slowest modules are written to stderr: their
+own time, and their cumulative time, which includes their imports.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_PREFIX = 'import time:'
+
+
+def profile_imports(module):
+    # [(module, self_us, cumulative_us, depth)] in import order
+    env = dict(os.environ, FYYUR_PROFILE_IMPORT='0',
+               PYTHONPROFILEIMPORTTIME='1')
+    stderr = subprocess.run(
+        [sys.executable, '-c', f'import {module}'], env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True).stderr
+    return parse_import_times(stderr)
+
+
+def parse_import_times(output):
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+        own, cumulative, name = line[len(IMPORT_TIME_PREFIX):].split('|')
+        if not own.strip().isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(own), int(cumulative), depth))
+    return rows
+
+
+def format_report(rows, top=25):
+    # The total, then the slowest top-level packages & the slowest modules
+    if not rows:
+        return 'No import timings (did the import fail?)'
+    total = sum(own for _, own, _, _ in rows)
+    lines = [f'{len(rows)} modules imported in {total / 1000:.1f} ms']
+    packages = {}
+    for name, own, _, _ in rows:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + own
+    lines.append(f'{"ms":>9}  package (modules included)')
+    for package, own in sorted(packages.items(),
+                               key=lambda item: -item[1])[:top]:
+        lines.append(f'{own / 1000:9.1f}  {package}')
+    lines.append(f'{"self ms":>9} {"cumul ms":>9}  module')
+    for name, own, cumulative, _ in sorted(rows,
+                                           key=lambda row: -row[1])[:top]:
+        lines.append(f'{own / 1000:9.1f} {cumulative / 1000:9.1f}  {name}')
+    return '\n'.join(lines)
+
+
+def report_imports(module, top=None):
+    top = top or int(os.environ.get('FYYUR_PROFILE_IMPORT_TOP', 25))
+    print(format_report(profile_imports(module), top), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('module', nargs='?', default='fyyur')
+    parser.add_argument('--top', type=int, default=25,
+                        help='Number of packages & modules reported')
+    args = parser.parse_args(argv)
+    report_imports(args.module, args.top)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""venue coordinates & geohash index, for the "near" searches
+
+Revision ID: 2a9d4c7e1b83
+Revises: f1c6a8d3e925
+Create Date: 2026-10-18 18:52:30.114582
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a9d4c7e1b83'
+down_revision = 'f1c6a8d3e925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The existing venues are located by `flask locate-venues`
+    op.add_column('venues', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('venues', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('venues', sa.Column('geohash', sa.String(length=12),
+                                      nullable=True))
+    op.create_index(op.f('ix_venues_geohash'), 'venues', ['geohash'])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_venues_geohash'), table_name='venues')
+    with op.batch_alter_table('venues') as batch_op:
+        batch_op.drop_column('geohash')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
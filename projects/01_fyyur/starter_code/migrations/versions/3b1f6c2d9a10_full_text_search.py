@@ -0,0 +1,68 @@
+"""full text search indexes for venues & artists
+
+Revision ID: 3b1f6c2d9a10
+Revises: 7edf91a98ff8
+Create Date: 2026-10-18 10:12:40.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f6c2d9a10'
+down_revision = '7edf91a98ff8'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists')
+COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+def tsvector_sql():
+    columns = " || ' ' || ".join(f"coalesce({name}, '')" for name in COLUMNS)
+    return f"to_tsvector('simple'::regconfig, {columns})"
+
+
+def fts_ddl(tablename):
+    fts = f'{tablename}_fts'
+    columns = ', '.join(COLUMNS)
+    new_values = ', '.join(f'new.{name}' for name in COLUMNS)
+    old_values = ', '.join(f'old.{name}' for name in COLUMNS)
+    insert = (f'INSERT INTO {fts}(rowid, {columns}) '
+              f'VALUES (new.id, {new_values});')
+    delete = (f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+              f"VALUES ('delete', old.id, {old_values});")
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{columns}, content='{tablename}', content_rowid='id')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tablename} '
+        f'BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tablename} '
+        f'BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} '
+        f'ON {tablename} BEGIN {delete} {insert} END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for tablename in TABLES:
+        if dialect == 'postgresql':
+            op.create_index(f'ix_{tablename}_search', tablename,
+                            [sa.text(tsvector_sql())], postgresql_using='gin')
+        elif dialect == 'sqlite':
+            for statement in fts_ddl(tablename):
+                op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for tablename in TABLES:
+        if dialect == 'postgresql':
+            op.drop_index(f'ix_{tablename}_search', table_name=tablename)
+        elif dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {tablename}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {tablename}_fts')
@@ -0,0 +1,30 @@
+"""checkpoints of the imports, committed with their batches
+
+Revision ID: 4f8c1e7b2a95
+Revises: 9d2b6f0e4a71
+Create Date: 2026-10-18 23:12:40.318264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f8c1e7b2a95'
+down_revision = '9d2b6f0e4a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'import_checkpoints',
+        sa.Column('path', sa.String(length=1024), nullable=False),
+        sa.Column('records', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('path')
+    )
+
+
+def downgrade():
+    op.drop_table('import_checkpoints')
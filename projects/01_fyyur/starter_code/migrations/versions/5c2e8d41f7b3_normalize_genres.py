@@ -0,0 +1,83 @@
+"""normalize genres into their own table
+
+Revision ID: 5c2e8d41f7b3
+Revises: 3b1f6c2d9a10
+Create Date: 2026-10-18 11:03:17.542908
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8d41f7b3'
+down_revision = '3b1f6c2d9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('genres',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('num_venues', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('num_artists', sa.Integer(), nullable=False, server_default='0'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('venue_genres',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_venue_genres_genre_id', 'venue_genres',
+                    ['genre_id', 'venue_id'], unique=False)
+    op.create_table('artist_genres',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_artist_genres_genre_id', 'artist_genres',
+                    ['genre_id', 'artist_id'], unique=False)
+
+    # Convert the comma-joined genres of existing rows
+    conn = op.get_bind()
+    genres = sa.table('genres', sa.column('id'), sa.column('name'),
+                      sa.column('num_venues'), sa.column('num_artists'))
+    genre_ids = {}
+    for tablename, fk in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        source = sa.table(tablename, sa.column('id'), sa.column('genres'))
+        association = sa.table(f'{tablename[:-1]}_genres',
+                               sa.column(fk), sa.column('genre_id'))
+        links = []
+        for row_id, value in conn.execute(
+                sa.select([source.c.id, source.c.genres])):
+            names = (name.strip() for name in (value or '').split(','))
+            for name in dict.fromkeys(name for name in names if name):
+                if name not in genre_ids:
+                    conn.execute(genres.insert().values(name=name))
+                    genre_ids[name] = conn.execute(sa.select(
+                        [genres.c.id]).where(genres.c.name == name)).scalar()
+                links.append({fk: row_id, 'genre_id': genre_ids[name]})
+        if links:
+            op.bulk_insert(association, links)
+
+    # Precompute the per-genre counts
+    for tablename, column in (('venue_genres', 'num_venues'),
+                              ('artist_genres', 'num_artists')):
+        association = sa.table(tablename, sa.column('genre_id'))
+        conn.execute(genres.update().values({column: sa.select(
+            [sa.func.count()]).where(
+            association.c.genre_id == genres.c.id).as_scalar()}))
+
+
+def downgrade():
+    op.drop_index('ix_artist_genres_genre_id', table_name='artist_genres')
+    op.drop_table('artist_genres')
+    op.drop_index('ix_venue_genres_genre_id', table_name='venue_genres')
+    op.drop_table('venue_genres')
+    op.drop_table('genres')
@@ -0,0 +1,41 @@
+"""soft deletion of venues & artists, and their background deletion jobs
+
+Revision ID: 6e0f3b9a4d12
+Revises: 2a9d4c7e1b83
+Create Date: 2026-10-18 19:37:48.602215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e0f3b9a4d12'
+down_revision = '2a9d4c7e1b83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for tablename in ('venues', 'artists'):
+        op.add_column(tablename, sa.Column('deleted_at', sa.DateTime(),
+                                           nullable=True))
+    op.create_table(
+        'deletion_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('deleted_shows', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('deletion_jobs')
+    for tablename in ('venues', 'artists'):
+        with op.batch_alter_table(tablename) as batch_op:
+            batch_op.drop_column('deleted_at')
@@ -0,0 +1,46 @@
+"""reindex venues & artists for search only when a searched column changes
+
+Revision ID: 9d2b6f0e4a71
+Revises: 6e0f3b9a4d12
+Create Date: 2026-10-18 21:04:12.530917
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2b6f0e4a71'
+down_revision = '6e0f3b9a4d12'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venues', 'artists')
+COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+def update_trigger(tablename):
+    # The FTS5 sync trigger of updates of the searched columns only; the
+    # first version of 3b1f6c2d9a10 had it fire on any update
+    fts = f'{tablename}_fts'
+    names = ', '.join(COLUMNS)
+    new_values = ', '.join(f'new.{name}' for name in COLUMNS)
+    old_values = ', '.join(f'old.{name}' for name in COLUMNS)
+    return (f'CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} '
+            f'ON {tablename} BEGIN '
+            f"INSERT INTO {fts}({fts}, rowid, {names}) "
+            f"VALUES ('delete', old.id, {old_values}); "
+            f'INSERT INTO {fts}(rowid, {names}) '
+            f'VALUES (new.id, {new_values}); END')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for tablename in TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS {tablename}_fts_au')
+        op.execute(update_trigger(tablename))
+
+
+def downgrade():
+    # 3b1f6c2d9a10 now creates the same trigger, there's nothing to revert
+    pass
@@ -0,0 +1,48 @@
+"""maintained upcoming & past show counters on venues & artists
+
+Revision ID: b7e35f9c1d24
+Revises: 8a4d0e6b2c57
+Create Date: 2026-10-18 12:31:55.270341
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e35f9c1d24'
+down_revision = '8a4d0e6b2c57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for tablename in ('venues', 'artists'):
+        op.add_column(tablename, sa.Column('upcoming_shows_count', sa.Integer(),
+                                           nullable=False, server_default='0'))
+        op.add_column(tablename, sa.Column('past_shows_count', sa.Integer(),
+                                           nullable=False, server_default='0'))
+
+    # Count the existing shows
+    date = datetime.now()
+    shows = sa.table('shows', sa.column('venue_id'), sa.column('artist_id'),
+                     sa.column('start_time'))
+    for tablename, show_fk in (('venues', shows.c.venue_id),
+                               ('artists', shows.c.artist_id)):
+        table = sa.table(tablename, sa.column('id'),
+                         sa.column('upcoming_shows_count'),
+                         sa.column('past_shows_count'))
+        count = sa.select([sa.func.count()]).where(show_fk == table.c.id)
+        op.execute(table.update().values(
+            upcoming_shows_count=count.where(
+                shows.c.start_time > date).as_scalar(),
+            past_shows_count=count.where(
+                shows.c.start_time <= date).as_scalar()))
+
+
+def downgrade():
+    for tablename in ('artists', 'venues'):
+        with op.batch_alter_table(tablename) as batch_op:
+            batch_op.drop_column('past_shows_count')
+            batch_op.drop_column('upcoming_shows_count')
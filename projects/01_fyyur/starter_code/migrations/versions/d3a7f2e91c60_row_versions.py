@@ -0,0 +1,28 @@
+"""row versions of venues & artists, for the API's ETags
+
+Revision ID: d3a7f2e91c60
+Revises: b7e35f9c1d24
+Create Date: 2026-10-18 15:04:12.518233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a7f2e91c60'
+down_revision = 'b7e35f9c1d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for tablename in ('venues', 'artists'):
+        op.add_column(tablename, sa.Column('version_id', sa.Integer(),
+                                           nullable=False, server_default='1'))
+
+
+def downgrade():
+    for tablename in ('venues', 'artists'):
+        with op.batch_alter_table(tablename) as batch_op:
+            batch_op.drop_column('version_id')
@@ -0,0 +1,68 @@
+"""show durations & overlapping bookings prevention
+
+Revision ID: e5b92c4d7a18
+Revises: d3a7f2e91c60
+Create Date: 2026-10-18 17:22:05.671940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b92c4d7a18'
+down_revision = 'd3a7f2e91c60'
+branch_labels = None
+depends_on = None
+
+MAX_SHOW_DURATION = 24 * 60
+FKS = ('venue_id', 'artist_id')
+
+
+def booking_ddl(dialect):
+    if dialect == 'postgresql':
+        during = ("tsrange(start_time, "
+                  "start_time + duration * interval '1 minute')")
+        return ['CREATE EXTENSION IF NOT EXISTS btree_gist'] + [
+            f'ALTER TABLE shows ADD CONSTRAINT ex_shows_{fk}_overlap '
+            f'EXCLUDE USING gist ({fk} WITH =, {during} WITH &&)'
+            for fk in FKS]
+
+    overlaps = ' OR '.join(
+        f'EXISTS (SELECT 1 FROM shows WHERE {fk} = NEW.{fk} '
+        f"AND start_time > datetime(NEW.start_time, "
+        f"'-{MAX_SHOW_DURATION} minutes') "
+        f"AND start_time < datetime(NEW.start_time, "
+        f"'+' || NEW.duration || ' minutes') "
+        f"AND datetime(start_time, '+' || duration || ' minutes') > "
+        f"datetime(NEW.start_time))"
+        for fk in FKS)
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS shows_no_overlap BEFORE INSERT ON shows '
+        f'WHEN {overlaps} '
+        f"BEGIN SELECT RAISE(ABORT, 'overlapping show'); END"]
+
+
+def upgrade():
+    # Existing shows get the default duration; overlapping ones must be
+    # rescheduled before the PostgreSQL exclusion constraints can be added
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.add_column(sa.Column('duration', sa.Integer(),
+                                      nullable=False, server_default='120'))
+        batch_op.create_check_constraint(
+            'ck_shows_duration', f'duration BETWEEN 1 AND {MAX_SHOW_DURATION}')
+
+    for statement in booking_ddl(op.get_bind().dialect.name):
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for fk in FKS:
+            op.drop_constraint(f'ex_shows_{fk}_overlap', 'shows')
+    else:
+        op.execute('DROP TRIGGER IF EXISTS shows_no_overlap')
+
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.drop_constraint('ck_shows_duration', type_='check')
+        batch_op.drop_column('duration')
@@ -0,0 +1,33 @@
+"""show start time index & last modified times for the calendar feeds
+
+Revision ID: f1c6a8d3e925
+Revises: e5b92c4d7a18
+Create Date: 2026-10-18 18:04:41.209318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6a8d3e925'
+down_revision = 'e5b92c4d7a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_shows_start_time', 'shows', ['start_time'])
+    # Plain ADD COLUMN keeps the search triggers of the tables (a batch
+    # rebuild on SQLite would drop them); existing rows start as modified now
+    for table in ('venues', 'artists'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(),
+                                       nullable=True))
+        op.execute(f'UPDATE {table} SET updated_at = CURRENT_TIMESTAMP')
+
+
+def downgrade():
+    for table in ('artists', 'venues'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
+    op.drop_index('ix_shows_start_time', table_name='shows')
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryRecorder:
+    # Records the SQL statements issued, on any engine, while it's active
+
+    def __init__(self):
+        self.statements = []
+
+    def record(self, conn, cursor, statement, parameters, context,
+               executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self.record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, 'before_cursor_execute', self.record)
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@contextmanager
+def query_budget(testcase, budget, label=''):
+    # Fail `testcase` if the block issues more than `budget` statements
+    with QueryRecorder() as recorder:
+        yield recorder
+    if len(recorder) > budget:
+        testcase.fail(
+            f'{label or "Block"} issued {len(recorder)} SQL statements, over '
+            f'its budget of {budget}:\n' + '\n'.join(
+                f'{i}. {statement}'
+                for i, statement in enumerate(recorder.statements, 1)))
+
+
+def assert_query_budget(budget):
+    # Decorator version of query_budget, for a whole test method
+    def decorator(f):
+        @wraps(f)
+        def decorated(self, *args, **kwargs):
+            with query_budget(self, budget, f.__name__):
+                return f(self, *args, **kwargs)
+        return decorated
+    return decorator
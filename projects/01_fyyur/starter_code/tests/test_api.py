@@ -0,0 +1,108 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import Artist, Show, Venue
+
+
+class APITest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        venues = [Venue(f'Venue {i}', 'San Francisco', 'CA', 'Address', '555',
+                        'Jazz', '') for i in range(5)]
+        artist = Artist('Guns N Petals', 'San Francisco', 'CA', '555',
+                        'Rock n Roll', '')
+        db.session.add_all(venues + [artist])
+        db.session.commit()
+        start_time = datetime(2035, 4, 1, 20)
+        db.session.add_all([
+            Show(artist.id, venue.id, start_time + timedelta(days=i))
+            for i, venue in enumerate(venues)])
+        db.session.commit()
+        self.venue_id, self.artist_id = venues[0].id, artist.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def get_all(self, url):
+        data, cursor = [], None
+        while True:
+            response = self.client.get(url, query_string={
+                'limit': 2, 'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            data += response.get_json()['data']
+            cursor = response.get_json()['next_cursor']
+            if cursor is None:
+                return data
+
+    def test_cursor_pagination(self):
+        venues = self.get_all('/api/v1/venues')
+        self.assertEqual([venue['name'] for venue in venues],
+                         [f'Venue {i}' for i in range(5)])
+        shows = self.get_all('/api/v1/shows')
+        self.assertEqual(len(shows), 5)
+        self.assertEqual(shows, sorted(shows, key=lambda show:
+                                       show['start_time']))
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(f'/api/v1/venues/{self.venue_id}')
+        self.assertEqual(response.get_json()['genres'], ['Jazz'])
+
+        response = self.client.get('/api/v1/venues?profile=m&limit=1')
+        self.assertEqual(set(response.get_json()['data'][0]),
+                         {'venue_id', 'venue_name', 'venue_image_link'})
+
+        response = self.client.get(
+            f'/api/v1/artists/{self.artist_id}?fields=name,city')
+        self.assertEqual(response.get_json(),
+                         {'name': 'Guns N Petals', 'city': 'San Francisco'})
+
+        response = self.client.get(
+            f'/api/v1/shows?venue_id={self.venue_id}&profile=l')
+        self.assertEqual(response.get_json()['data'], [{
+            'artist_id': self.artist_id, 'venue_id': self.venue_id,
+            'start_time': '2035-04-01 20:00:00', 'duration': 120}])
+
+    def test_conditional_get(self):
+        url = f'/api/v1/venues/{self.venue_id}'
+        etag = self.client.get(url).headers['ETag']
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        # Any update of the venue changes its version, thus its ETag
+        venue = Venue.query.get(self.venue_id)
+        venue.name = 'The Musical Hop'
+        db.session.commit()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['name'], 'The Musical Hop')
+
+        # So does the ETag of the listings
+        listing = self.client.get('/api/v1/venues')
+        venue = Venue.query.get(self.venue_id)
+        venue.city = 'Oakland'
+        db.session.commit()
+        response = self.client.get('/api/v1/venues', headers={
+            'If-None-Match': listing.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/v1/venues', headers={
+            'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/v1/venues/999').status_code,
+                         404)
+        response = self.client.get('/api/v1/venues?profile=xl')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('xl', response.get_json()['message'])
+        response = self.client.get('/api/v1/shows?cursor=garbage')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/v1/shows?profile=m')
+        self.assertEqual(response.status_code, 400)
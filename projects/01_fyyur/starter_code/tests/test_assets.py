@@ -0,0 +1,96 @@
+import gzip
+import re
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from app import create_app, db
+from app.assets import Assets, build, minify_css, minify_js, rewrite_urls
+
+
+class AssetsTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['ASSETS_DIR'] = tempfile.mkdtemp()
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+        shutil.rmtree(self.app.config['ASSETS_DIR'])
+
+    def stylesheets(self):
+        return re.findall(r'rel="stylesheet" href="([^"]+)"',
+                          self.client.get('/').get_data(as_text=True))
+
+    def test_unbuilt_assets(self):
+        self.assertEqual(self.stylesheets()[0], '/static/css/bootstrap.min.css')
+        response = self.client.get('/static/css/main.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response.headers['Cache-Control'])
+        response.close()
+
+    def test_built_assets(self):
+        build(self.app)
+        stylesheets = self.stylesheets()
+        self.assertEqual(len(stylesheets), 1)
+        self.assertRegex(stylesheets[0],
+                         r'^/static/dist/css/fyyur\.[0-9a-f]{12}\.css$')
+        # Every static URL is fingerprinted
+        self.assertRegex(self.client.get('/').get_data(as_text=True),
+                         r'/static/dist/img/front-splash\.[0-9a-f]{12}\.jpg')
+
+        raw = self.client.get(stylesheets[0])
+        self.assertEqual(raw.status_code, 200)
+        self.assertEqual(raw.mimetype, 'text/css')
+        self.assertNotIn('Content-Encoding', raw.headers)
+        self.assertIn('Accept-Encoding', raw.headers['Vary'])
+        for directive in ('public', 'immutable', 'max-age=31536000'):
+            self.assertIn(directive, raw.headers['Cache-Control'])
+
+        compressed = self.client.get(
+            stylesheets[0], headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed.mimetype, 'text/css')
+        self.assertEqual(gzip.decompress(compressed.get_data()),
+                         raw.get_data())
+        self.assertLess(len(compressed.get_data()), len(raw.get_data()))
+        raw.close()
+        compressed.close()
+
+    def test_manifest_is_loaded_at_startup(self):
+        build(self.app)
+        app = Flask('app')
+        app.config['ASSETS_DIR'] = self.app.config['ASSETS_DIR']
+        Assets(app)
+        self.assertTrue(app.extensions['assets'])
+        self.assertEqual(app.extensions['assets'],
+                         self.app.extensions['assets'])
+
+    def test_minify_css(self):
+        self.assertEqual(
+            minify_css('/* note */ a :hover , b > i {\n  color : red ;\n'
+                       '  content: "a ; b" ;\n}\n/*! license */'),
+            'a :hover,b>i{color : red;content: "a ; b"}/*! license */')
+
+    def test_minify_js(self):
+        self.assertEqual(minify_js('  var a = 1;\n// note\n\n  f(a);\n'),
+                         'var a = 1;\nf(a);')
+        # Strings spanning lines are left as they are
+        for js in ['var t = `a\n  // b\n`;', 'var s = "a\\\n  b";']:
+            with self.subTest(js=js):
+                self.assertEqual(minify_js(js), js)
+
+    def test_rewrite_urls(self):
+        manifest = {'fonts/a.woff': 'dist/fonts/a.0123456789ab.woff'}
+        css = ('@font-face{src:url(../fonts/a.woff?v=1),url("../fonts/b.ttf"),'
+               'url(data:image/png;base64,xyz),url(/img/c.png)}')
+        self.assertEqual(
+            rewrite_urls(css, 'css/main.css', 'dist/css/x.css', manifest),
+            '@font-face{src:url("../fonts/a.0123456789ab.woff?v=1"),'
+            'url("../../fonts/b.ttf"),url(data:image/png;base64,xyz),'
+            'url(/img/c.png)}')
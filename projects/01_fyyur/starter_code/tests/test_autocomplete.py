@@ -0,0 +1,125 @@
+import unittest
+from threading import Thread
+from sqlalchemy import event
+from app import create_app, db, autocomplete
+from app.autocomplete import PrefixIndex
+from app.models import Artist, Venue
+
+
+class PrefixIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.index.extend([
+            ('artist', 1, 'Guns N Petals'),
+            ('artist', 2, 'The Wild Sax Band'),
+            ('venue', 1, 'The Musical Hop'),
+            ('venue', 2, 'Park Square Live Music & Coffee'),
+        ])
+
+    def names(self, prefix, limit=10):
+        return [result['name'] for result in self.index.complete(prefix, limit)]
+
+    def test_complete_matches_any_word_prefix(self):
+        self.assertEqual(self.names('gun'), ['Guns N Petals'])
+        self.assertEqual(self.names('SAX'), ['The Wild Sax Band'])
+        self.assertEqual(self.names('musi'), ['Park Square Live Music & Coffee',
+                                              'The Musical Hop'])
+
+    def test_complete_returns_each_entity_once(self):
+        self.assertEqual(self.names('the'), ['The Musical Hop',
+                                             'The Wild Sax Band'])
+
+    def test_complete_respects_limit_and_empty_prefix(self):
+        self.assertEqual(len(self.names('the', limit=1)), 1)
+        self.assertEqual(self.names(''), [])
+
+    def test_add_replaces_and_remove_deletes(self):
+        self.index.add('venue', 1, 'The Jazz Cellar')
+        self.assertEqual(self.names('musical'), [])
+        self.assertEqual(self.names('jazz'), ['The Jazz Cellar'])
+
+        self.index.remove('venue', 1)
+        self.assertEqual(self.names('jazz'), [])
+        self.assertEqual(len(self.index), 3)
+
+
+class AutocompleteEndpointTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        db.session.add(Artist('The Wild Sax Band', 'San Francisco', 'CA',
+                              '555', 'Jazz', ''))
+        db.session.commit()
+        autocomplete.rebuild()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def complete(self, prefix, expected_statements=0):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = self.client.get(f'/api/autocomplete?q={prefix}')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute',
+                         before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(statements), expected_statements)
+        return [result['name'] for result in response.get_json()['data']]
+
+    def test_autocomplete_answers_without_the_database(self):
+        self.assertEqual(self.complete('wild'), ['The Wild Sax Band'])
+
+    def test_autocomplete_follows_create_and_delete_views(self):
+        self.client.post('/venues/create', data={
+            'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA',
+            'address': '1015 Folsom Street', 'phone': '555',
+            'genres': ['Jazz'], 'facebook_link': ''})
+        self.assertEqual(self.complete('musical'), ['The Musical Hop'])
+
+        venue_id = Venue.query.filter_by(name='The Musical Hop').first().id
+        self.client.post(f'/venues/{venue_id}')
+        self.assertEqual(self.complete('musical'), [])
+
+    def test_autocomplete_follows_other_workers(self):
+        # Names changed by another worker, which this index didn't see
+        with db.engine.begin() as connection:
+            connection.execute(Artist.__table__.update().values(
+                name='The Tame Sax Band',
+                version_id=Artist.__table__.c.version_id + 1))
+        self.assertEqual(self.complete('tame'), [])
+
+        # Once the refresh interval is over, a completion checks the
+        # signature of the names, and rebuilds the index
+        autocomplete.index.checked_at -= 60
+        self.assertEqual(self.complete('tame', expected_statements=4),
+                         ['The Tame Sax Band'])
+        self.assertEqual(self.complete('wild'), [])
+
+        # An unchanged database costs the check only (a query per table)
+        autocomplete.index.checked_at -= 60
+        self.assertEqual(self.complete('tame', expected_statements=2),
+                         ['The Tame Sax Band'])
+
+    def test_complete_reads_under_the_lock(self):
+        # A read waits for the changes of the other threads
+        index = autocomplete.index
+        index.lock.acquire()
+        thread = Thread(target=index.complete, args=('wild',))
+        try:
+            thread.start()
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+        finally:
+            index.lock.release()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from app import create_app, db
+from app.models import Artist, Show, Venue
+from app.queries import booking_conflicts
+
+
+class BookingsTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        venues = [Venue(f'Venue {i}', 'San Francisco', 'CA', 'Address', '555',
+                        'Jazz', '') for i in range(2)]
+        artists = [Artist(f'Artist {i}', 'San Francisco', 'CA', '555',
+                          'Jazz', '') for i in range(2)]
+        db.session.add_all(venues + artists)
+        db.session.commit()
+        self.venue_ids = [venue.id for venue in venues]
+        self.artist_ids = [artist.id for artist in artists]
+
+        # Venue 0 & artist 0 play from 20:00 to 22:00
+        self.start = datetime(2035, 4, 1, 20)
+        db.session.add(Show(self.artist_ids[0], self.venue_ids[0], self.start))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def create_show(self, artist, venue, start_time, duration=120):
+        response = self.client.post('/shows/create', data={
+            'artist_id': self.artist_ids[artist],
+            'venue_id': self.venue_ids[venue],
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration': duration})
+        with self.client.session_transaction() as session:
+            return [message for _, message in session.pop('_flashes', [])]
+
+    def test_conflicts(self):
+        venue_id, artist_id = self.venue_ids[1], self.artist_ids[1]
+        conflicts = booking_conflicts(self.venue_ids[0], artist_id,
+                                      self.start + timedelta(hours=1), 30)
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual(len(booking_conflicts(
+            venue_id, self.artist_ids[0], self.start - timedelta(hours=1),
+            90)), 1)
+
+        # Back to back shows don't overlap
+        self.assertEqual(booking_conflicts(
+            self.venue_ids[0], self.artist_ids[0],
+            self.start + timedelta(hours=2), 60), [])
+        self.assertEqual(booking_conflicts(
+            self.venue_ids[0], self.artist_ids[0],
+            self.start - timedelta(hours=1), 60), [])
+        self.assertEqual(booking_conflicts(
+            venue_id, artist_id, self.start, 120), [])
+
+    def test_double_bookings_are_refused(self):
+        # The venue, then the artist, are already booked
+        self.assertIn('already booked', self.create_show(
+            1, 0, self.start + timedelta(minutes=90))[0])
+        self.assertIn('already booked', self.create_show(
+            0, 1, self.start - timedelta(minutes=30), 60)[0])
+        self.assertEqual(Show.query.count(), 1)
+
+        self.assertEqual(self.create_show(
+            1, 0, self.start + timedelta(hours=2)),
+            ['Show was successfully listed!'])
+        self.assertEqual(self.create_show(1, 1, self.start, 60 * 24 + 1),
+                         ['A show lasts between a minute and a day.'])
+
+    def test_the_database_refuses_overlaps(self):
+        # Even when the check of the view is bypassed
+        db.session.add(Show(self.artist_ids[1], self.venue_ids[0],
+                            self.start + timedelta(hours=1), 30))
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+        db.session.add(Show(self.artist_ids[1], self.venue_ids[0],
+                            self.start + timedelta(hours=2), 30))
+        db.session.commit()
+        self.assertEqual(Show.query.count(), 2)
@@ -0,0 +1,107 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db, page_cache
+from app.cache import LRUBackend, LocalSharedBackend
+from app.models import Artist, Venue
+
+
+class BackendsTest(unittest.TestCase):
+    def test_lru_evicts_least_recently_used(self):
+        backend = LRUBackend(max_entries=2)
+        backend.set('a', 1, 60)
+        backend.set('b', 2, 60)
+        backend.get('a')
+        backend.set('c', 3, 60)
+
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(len(backend), 2)
+
+    def test_lru_expires_entries(self):
+        backend = LRUBackend()
+        backend.set('a', 1, -1)
+        self.assertIsNone(backend.get('a'))
+
+    def test_shared_backend_is_shared_between_instances(self):
+        first, second = LocalSharedBackend(), LocalSharedBackend()
+        first.set('shared-key', {'body': b'page'}, 60)
+        self.assertEqual(second.get('shared-key'), {'body': b'page'})
+        self.assertEqual(first.incr('shared-version'),
+                         second.incr('shared-version') - 1)
+
+
+class PageCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['CACHE_BACKEND'] = 'lru'
+        page_cache.init_app(self.app)
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        venue = Venue('The Musical Hop', 'San Francisco', 'CA', 'Address',
+                      '555', 'Jazz', '')
+        artist = Artist('Guns N Petals', 'San Francisco', 'CA', '555',
+                        'Rock n Roll', '')
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        self.venue_id, self.artist_id = venue.id, artist.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def stats(self):
+        return self.client.get('/api/cache/stats').get_json()
+
+    def test_pages_are_served_from_the_cache(self):
+        first = self.client.get(f'/venues/{self.venue_id}')
+        second = self.client.get(f'/venues/{self.venue_id}')
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(self.stats()['misses'], 1)
+        self.assertEqual(self.stats()['hits'], 1)
+
+    def test_query_strings_are_cached_separately(self):
+        self.client.get('/venues')
+        self.client.get('/venues?genre=Jazz')
+        self.assertEqual(self.stats()['misses'], 2)
+
+    def test_show_creation_invalidates_related_pages(self):
+        self.client.get(f'/artists/{self.artist_id}')
+        self.client.get('/shows')
+
+        start_time = datetime.now() + timedelta(days=1)
+        self.client.post('/shows/create', data={
+            'artist_id': self.artist_id, 'venue_id': self.venue_id,
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')})
+
+        # The redirected page shows a flashed message and bypasses the cache
+        with self.client.session_transaction() as session:
+            session.pop('_flashes', None)
+
+        response = self.client.get(f'/artists/{self.artist_id}')
+        self.assertIn(b'1 Upcoming Show', response.data)
+        response = self.client.get('/shows')
+        self.assertIn(b'The Musical Hop', response.data)
+        self.assertEqual(self.stats()['hits'], 0)
+
+    def test_venue_edit_invalidates_listing_pages(self):
+        self.client.get('/venues')
+        self.client.post(f'/venues/{self.venue_id}/edit', data={
+            'name': 'The Jazz Cellar', 'city': 'San Francisco', 'state': 'CA',
+            'address': 'Address', 'phone': '555', 'genres': ['Jazz'],
+            'facebook_link': ''})
+        with self.client.session_transaction() as session:
+            session.pop('_flashes', None)
+
+        response = self.client.get('/venues')
+        self.assertIn(b'The Jazz Cellar', response.data)
+
+    def test_flashed_pages_are_not_cached(self):
+        with self.client.session_transaction() as session:
+            session['_flashes'] = [('message', 'Venue was listed!')]
+        self.client.get('/venues')
+        self.assertEqual(self.stats()['entries'], 0)
@@ -0,0 +1,120 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.ical import escape_text, fold
+from app.models import Artist, Show, Venue
+
+
+class CalendarTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.venue = Venue('The Musical Hop', 'San Francisco', 'CA',
+                           '1015 Folsom Street', '555', 'Jazz', '')
+        self.artist = Artist('Guns N Petals', 'San Francisco', 'CA', '555',
+                             'Rock n Roll', '')
+        db.session.add_all([self.venue, self.artist])
+        db.session.commit()
+        db.session.add_all([
+            Show(self.artist.id, self.venue.id, datetime(2035, 4, 1, 20), 90),
+            Show(self.artist.id, self.venue.id, datetime(2019, 5, 21, 21)),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def backdate(self):
+        for model in [Venue, Artist]:
+            db.session.query(model).update(
+                {'updated_at': datetime.utcnow() - timedelta(days=1)})
+        db.session.commit()
+
+    def test_venue_calendar(self):
+        response = self.client.get(f'/venues/{self.venue.id}/calendar.ics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/calendar')
+        self.assertTrue(response.is_streamed)
+        self.assertIsNotNone(response.last_modified)
+
+        body = response.get_data(as_text=True)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        # The events are in order, and last their show's duration
+        self.assertLess(body.index('DTSTART:20190521T210000'),
+                        body.index('DTSTART:20350401T200000'))
+        self.assertIn('DTEND:20350401T213000\r\n', body)
+        self.assertIn('SUMMARY:Guns N Petals at The Musical Hop\r\n', body)
+        self.assertIn('LOCATION:The Musical Hop\\, 1015 Folsom Street\\, '
+                      'San Francisco\\, CA\r\n', body)
+
+    def test_artist_calendar(self):
+        response = self.client.get(f'/artists/{self.artist.id}/calendar.ics')
+        body = response.get_data(as_text=True)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('X-WR-CALNAME:Guns N Petals\r\n', body)
+
+    def test_unknown_calendar(self):
+        response = self.client.get('/venues/1000/calendar.ics')
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified_until_a_show_changes(self):
+        url = f'/venues/{self.venue.id}/calendar.ics'
+        last_modified = self.client.get(url).headers['Last-Modified']
+        response = self.client.get(
+            url, headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+        # A new show marks the venue as modified
+        self.backdate()
+        earlier = self.client.get(url).headers['Last-Modified']
+        self.client.post('/shows/create', data={
+            'artist_id': self.artist.id, 'venue_id': self.venue.id,
+            'start_time': '2036-01-01 20:00:00'})
+        response = self.client.get(
+            url, headers={'If-Modified-Since': earlier})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.get_data(as_text=True).count('BEGIN:VEVENT'), 3)
+
+    def test_modified_when_a_counterpart_is_renamed(self):
+        # The venue's feed has the artist's name in its events
+        self.backdate()
+        url = f'/venues/{self.venue.id}/calendar.ics'
+        earlier = self.client.get(url).headers['Last-Modified']
+        self.client.post(f'/artists/{self.artist.id}/edit', data={
+            'name': 'Guns N Roses', 'city': 'San Francisco', 'state': 'CA',
+            'phone': '555', 'genres': 'Rock n Roll'})
+        response = self.client.get(
+            url, headers={'If-Modified-Since': earlier})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Guns N Roses at', response.get_data(as_text=True))
+
+    def test_text_is_escaped_and_folded(self):
+        self.assertEqual(escape_text('a,b;c\\d\ne'), 'a\\,b\;c\\\\d\\ne')
+        lines = fold('SUMMARY:' + 'é' * 100).split('\r\n')
+        self.assertEqual(lines[-1], '')
+        for line in lines[:-1]:
+            self.assertLessEqual(len(line.encode('utf-8')), 75)
+        self.assertEqual(''.join(line[1:] if i else line
+                                 for i, line in enumerate(lines[:-1])),
+                         'SUMMARY:' + 'é' * 100)
+
+    def test_shows_range(self):
+        artist_id = self.artist.id
+        response = self.client.get('/shows?from=2030-01-01&to=2040-01-01')
+        body = response.get_data(as_text=True)
+        self.assertIn(f'/artists/{artist_id}', body)
+        self.assertEqual(body.count('tile-show'), 1)
+
+        # Unparsable dates are ignored
+        response = self.client.get('/shows?from=someday')
+        self.assertEqual(response.get_data(as_text=True).count('tile-show'), 2)
@@ -0,0 +1,87 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.deletion import start_deletion
+from app.models import Artist, Show, Venue, recount_shows
+
+
+class ShowCountersTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.venue = Venue('The Musical Hop', 'San Francisco', 'CA',
+                           'Address', '555', 'Jazz', '')
+        self.artist = Artist('Guns N Petals', 'San Francisco', 'CA', '555',
+                             'Rock n Roll', '')
+        db.session.add_all([self.venue, self.artist])
+        db.session.commit()
+        self.venue_id, self.artist_id = self.venue.id, self.artist.id
+
+        self.now = datetime.now()
+        self.add_show(self.now + timedelta(hours=1))
+        self.add_show(self.now + timedelta(days=2))
+        self.add_show(self.now - timedelta(days=2))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def add_show(self, start_time):
+        db.session.add(Show(self.artist.id, self.venue.id, start_time))
+        db.session.commit()
+
+    def counts(self):
+        db.session.expire_all()
+        return [(entity.upcoming_shows_count, entity.past_shows_count)
+                for entity in (Venue.query.get(self.venue_id),
+                               Artist.query.get(self.artist_id))]
+
+    def test_counters_follow_inserts(self):
+        self.assertEqual(self.counts(), [(2, 1), (2, 1)])
+
+    def test_counters_follow_deletes(self):
+        show = Show.query.filter(Show.start_time < self.now).first()
+        db.session.delete(show)
+        db.session.commit()
+        self.assertEqual(self.counts(), [(2, 0), (2, 0)])
+
+    def test_counters_follow_cascaded_deletes(self):
+        other = Venue('The Dueling Pianos Bar', 'New York', 'NY', 'Address',
+                      '555', 'Jazz', '')
+        db.session.add(other)
+        db.session.commit()
+        db.session.add(Show(self.artist.id, other.id, self.now + timedelta(1)))
+        db.session.commit()
+        self.assertEqual(self.counts()[1], (3, 1))
+
+        start_deletion(other)
+        self.assertEqual(self.counts()[1], (2, 1))
+
+    def test_recount_rolls_shows_into_the_past(self):
+        later = self.now + timedelta(hours=2)
+        with db.engine.begin() as connection:
+            recount_shows(connection, later, since=self.now)
+        self.assertEqual(self.counts(), [(1, 2), (1, 2)])
+
+        with db.engine.begin() as connection:
+            recount_shows(connection, later + timedelta(days=7))
+        self.assertEqual(self.counts(), [(0, 3), (0, 3)])
+
+    def test_recount_since_skips_untouched_entities(self):
+        db.session.query(Venue).update({Venue.upcoming_shows_count: 42})
+        db.session.commit()
+        with db.engine.begin() as connection:
+            recount_shows(connection, self.now, since=self.now)
+        self.assertEqual(self.counts()[0], (42, 1))
+
+    def test_show_form_submission_updates_counters(self):
+        start_time = (self.now + timedelta(days=5)).strftime('%Y-%m-%d %H:%M:%S')
+        self.client.post('/shows/create', data={
+            'artist_id': self.artist_id, 'venue_id': self.venue_id,
+            'start_time': start_time})
+        self.assertEqual(self.counts(), [(3, 1), (3, 1)])
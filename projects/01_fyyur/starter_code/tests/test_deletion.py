@@ -0,0 +1,190 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db, jobs, page_cache
+from app.deletion import resume_deletions, run_deletion
+from app.exporter import export_lines
+from app.models import Artist, DeletionJob, Genre, Show, Venue, venue_genres
+
+
+class DeletionTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['DELETE_BATCH_SIZE'] = 2
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        venues = [Venue(f'Venue {i}', 'San Francisco', 'CA', 'Address', '555',
+                        'Jazz', '') for i in range(2)]
+        artist = Artist('Guns N Petals', 'San Francisco', 'CA', '555', 'Jazz',
+                        '')
+        db.session.add_all(venues + [artist])
+        db.session.commit()
+        now = datetime.now()
+        db.session.add_all(
+            Show(artist.id, venues[i % 2].id, now + timedelta(days=i - 3))
+            for i in range(10))
+        db.session.commit()
+        self.venue_ids = [venue.id for venue in venues]
+        self.artist_id = artist.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def job(self):
+        return DeletionJob.query.order_by(DeletionJob.id.desc()).first()
+
+    def test_venue_deletion(self):
+        venue_id = self.venue_ids[0]
+        response = self.client.post(f'/venues/{venue_id}')
+        self.assertEqual(response.status_code, 302)
+        db.session.remove()
+
+        # The 5 shows went in batches of 2, then the venue & its genre links
+        job = self.job()
+        self.assertEqual((job.kind, job.entity_id, job.status,
+                          job.deleted_shows), ('venue', venue_id, 'done', 5))
+        self.assertIsNone(Venue.query.get(venue_id))
+        self.assertEqual(Show.query.filter_by(venue_id=venue_id).count(), 0)
+        self.assertEqual(db.session.query(venue_genres).filter_by(
+            venue_id=venue_id).count(), 0)
+        self.assertEqual(Genre.query.filter_by(name='Jazz').one().num_venues, 1)
+        # The artist's counters lost the venue's shows
+        artist = Artist.query.get(self.artist_id)
+        self.assertEqual(
+            (artist.upcoming_shows_count, artist.past_shows_count), (3, 2))
+
+    def test_deletion_status(self):
+        self.client.post(f'/artists/{self.artist_id}')
+        response = self.client.get(f'/api/v1/deletions/{self.job().id}')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual((body['kind'], body['status'], body['deleted_shows']),
+                         ('artist', 'done', 10))
+        self.assertIsNotNone(body['finished_at'])
+        self.assertEqual(self.client.get('/api/v1/deletions/100').status_code,
+                         404)
+
+    def test_deleted_entities_are_hidden(self):
+        # Until its job runs, a deleted venue is only marked as such
+        venue = Venue.query.get(self.venue_ids[0])
+        venue.deleted_at = datetime.utcnow()
+        db.session.commit()
+
+        venue_id = self.venue_ids[0]
+        for url in [f'/venues/{venue_id}', f'/venues/{venue_id}/calendar.ics',
+                    f'/api/v1/venues/{venue_id}']:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+        ids = [venue['id'] for venue in
+               self.client.get('/api/v1/venues').get_json()['data']]
+        self.assertEqual(ids, self.venue_ids[1:])
+        self.assertNotIn('Venue 0', self.client.get('/venues').get_data(
+            as_text=True))
+
+    def test_deleted_entities_leave_shows_exports_and_forms(self):
+        venue_id = self.venue_ids[0]
+        venue = Venue.query.get(venue_id)
+        venue.deleted_at = datetime.utcnow()
+        db.session.commit()
+
+        # The venue & its shows are out of the listings & the exports
+        self.assertNotIn('Venue 0', self.client.get('/shows').get_data(
+            as_text=True))
+        shows = self.client.get(
+            '/api/v1/shows?profile=l').get_json()['data']
+        self.assertEqual({show['venue_id'] for show in shows},
+                         {self.venue_ids[1]})
+        self.assertNotIn('Venue 0', ''.join(export_lines('venues')))
+        self.assertEqual(
+            ''.join(export_lines('shows', 'ndjson')).count('\n'), 5)
+
+        # Its edit pages are gone
+        for method in ['get', 'post']:
+            with self.subTest(method=method):
+                response = getattr(self.client, method)(
+                    f'/venues/{venue_id}/edit', data={'name': 'Renamed'})
+                self.assertEqual(response.status_code, 404)
+        self.assertEqual(Venue.query.get(venue_id).name, 'Venue 0')
+
+        # And it can't be booked
+        response = self.client.post('/shows/create', data={
+            'artist_id': self.artist_id, 'venue_id': venue_id,
+            'start_time': '2035-01-01 20:00:00'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Show.query.filter_by(venue_id=venue_id).count(), 5)
+
+    def test_pending_deletions_hide_their_shows(self):
+        # While its job is pending, the artist's shows leave the pages &
+        # feeds of its venues
+        artist = Artist.query.get(self.artist_id)
+        artist.deleted_at = datetime.utcnow()
+        db.session.commit()
+
+        venue_id = self.venue_ids[0]
+        body = self.client.get(f'/venues/{venue_id}').get_data(as_text=True)
+        self.assertNotIn('Guns N Petals', body)
+        self.assertIn('0 Upcoming Shows', body)
+        feed = self.client.get(f'/venues/{venue_id}/calendar.ics')
+        self.assertNotIn('BEGIN:VEVENT', feed.get_data(as_text=True))
+
+    def test_deletions_are_started_once(self):
+        venue_id = self.venue_ids[0]
+        self.client.post(f'/venues/{venue_id}')
+        job = self.job()
+        with self.client.session_transaction() as session:
+            (_, message), = session['_flashes']
+        self.assertIn(f'/api/v1/deletions/{job.id}', message)
+
+        # The venue is already being deleted (or gone)
+        self.assertEqual(self.client.post(f'/venues/{venue_id}').status_code,
+                         404)
+        self.assertEqual(DeletionJob.query.count(), 1)
+
+    def test_finished_deletions_invalidate_the_cache(self):
+        self.app.config['CACHE_BACKEND'] = 'lru'
+        page_cache.init_app(self.app)
+        artist = Artist.query.get(self.artist_id)
+        artist.deleted_at = datetime.utcnow()
+        job = DeletionJob('artist', self.artist_id)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+        # The pages cached while the job is pending
+        self.assertIn('1 Artist<', self.client.get('/genres').get_data(
+            as_text=True))
+        run_deletion(job_id)
+        self.assertIn('0 Artists<', self.client.get('/genres').get_data(
+            as_text=True))
+
+    def test_background_thread(self):
+        self.app.config['JOB_WORKERS'] = 2
+        jobs.init_app(self.app)
+        self.client.post(f'/venues/{self.venue_ids[1]}')
+        jobs.wait(timeout=10)
+        db.session.remove()
+        self.assertEqual(self.job().status, 'done')
+        self.assertIsNone(Venue.query.get(self.venue_ids[1]))
+
+    def test_failures_are_recorded_and_resumed(self):
+        job = DeletionJob('planet', 1)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+        with self.assertRaises(KeyError):
+            run_deletion(job.id)
+        db.session.expire_all()
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNotNone(job.error)
+
+        # An interrupted deletion is finished by resume_deletions
+        job.kind, job.entity_id = 'venue', self.venue_ids[0]
+        db.session.commit()
+        self.assertEqual(resume_deletions(), [job_id])
+        db.session.remove()
+        self.assertEqual(self.job().status, 'done')
+        self.assertIsNone(Venue.query.get(self.venue_ids[0]))
@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from app import create_app, db
+from app.exporter import export_lines
+from app.importer import run_import
+from app.models import Artist, Show, Venue
+
+
+class ExporterTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        venue = Venue('The Musical Hop', 'San Francisco', 'CA', 'Address',
+                      '555', 'Jazz,Reggae', '')
+        artist = Artist('Guns N Petals', 'San Francisco', 'CA', '555',
+                        'Rock n Roll', '')
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        db.session.add_all([
+            Show(artist.id, venue.id, datetime(2019, 5, 21, 21, 30)),
+            Show(artist.id, venue.id, datetime(2035, 4, 1, 20)),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def test_csv_export_is_streamed(self):
+        response = self.client.get('/export/venues.csv')
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(response.get_data(True))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['genres'], 'Jazz,Reggae')
+
+    def test_ndjson_export(self):
+        response = self.client.get('/export/shows.ndjson')
+        records = [json.loads(line) for line in
+                   response.get_data(True).splitlines()]
+        self.assertEqual([record['start_time'] for record in records],
+                         ['2019-05-21 21:30:00', '2035-04-01 20:00:00'])
+
+    def test_export_is_chunked(self):
+        chunks = list(export_lines('shows', 'ndjson', batch_size=1))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(list(export_lines('venues', 'ndjson')), [
+            ''.join(export_lines('venues', 'ndjson', batch_size=1))])
+
+    def test_unknown_exports_are_not_found(self):
+        self.assertEqual(self.client.get('/export/genres.csv').status_code,
+                         404)
+        self.assertEqual(self.client.get('/export/shows.xml').status_code,
+                         404)
+
+    def test_export_can_be_imported(self):
+        exports = {}
+        for kind in ('venues', 'artists', 'shows'):
+            exports[kind] = ''.join(export_lines(kind, 'csv'))
+        for entity in Venue.query.all() + Artist.query.all():
+            db.session.delete(entity)
+        db.session.commit()
+
+        with tempfile.TemporaryDirectory() as directory:
+            for kind in ('venues', 'artists', 'shows'):
+                path = os.path.join(directory, f'{kind}.csv')
+                with open(path, 'w') as f:
+                    f.write(exports[kind])
+                run_import(kind, path, echo=lambda message: None)
+
+        for kind in ('venues', 'artists', 'shows'):
+            self.assertEqual(''.join(export_lines(kind, 'csv')),
+                             exports[kind])
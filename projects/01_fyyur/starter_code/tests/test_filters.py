@@ -0,0 +1,50 @@
+import unittest
+from datetime import datetime
+import babel.dates
+from app import create_app
+from app.main.filters import DATETIME_FORMATS, cached_format_datetime, \
+    format_datetime
+
+
+class DatetimeFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        cached_format_datetime.cache_clear()
+
+    def test_filter_matches_babel(self):
+        value = datetime(2035, 4, 1, 20, 0)
+        for format in ('full', 'medium'):
+            expected = babel.dates.format_datetime(
+                value, DATETIME_FORMATS[format])
+            self.assertEqual(format_datetime(value, format), expected)
+            self.assertEqual(format_datetime(str(value), format), expected)
+
+    def test_filter_resolves_babel_named_formats(self):
+        # 'medium' & 'full' are the app's formats, the others Babel's
+        value = datetime(2019, 5, 21, 21, 30)
+        for format in ('short', 'long'):
+            for locale in ('en_US', 'fr_FR', 'de_DE'):
+                with self.subTest(format=format, locale=locale):
+                    expected = babel.dates.format_datetime(value, format,
+                                                           locale=locale)
+                    self.assertEqual(format_datetime(
+                        str(value), format, locale), expected)
+        # (recent CLDR data puts a narrow no-break space before PM)
+        self.assertEqual(format_datetime(str(value), 'short', 'en_US')
+                         .replace('\u202f', ' '), '5/21/19, 9:30 PM')
+
+    def test_filter_accepts_custom_patterns(self):
+        self.assertEqual(format_datetime('2035-04-01 20:00:00', 'y-MM-dd'),
+                         '2035-04-01')
+
+    def test_filter_memoizes_output(self):
+        for _ in range(3):
+            format_datetime('2035-04-01 20:00:00', 'full')
+        info = cached_format_datetime.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 1))
+
+    def test_filter_is_registered(self):
+        template = self.app.jinja_env.from_string(
+            "{{ value|datetime('full') }}")
+        self.assertEqual(template.render(value='2035-04-01 20:00:00'),
+                         'Sunday April, 1, 2035 at 8:00PM')
@@ -0,0 +1,74 @@
+import unittest
+from app import create_app, db
+from app.models import Artist, Genre, Venue
+from app.queries import venue_directory
+
+
+class GenresTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        db.session.add_all([
+            Venue('The Musical Hop', 'San Francisco', 'CA', 'Address', '555',
+                  'Jazz,Reggae', ''),
+            Venue('The Dueling Pianos Bar', 'New York', 'NY', 'Address',
+                  '555', 'Classical, Jazz,Jazz', ''),
+            Artist('Guns N Petals', 'San Francisco', 'CA', '555',
+                   'Rock n Roll', ''),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def counts(self):
+        db.session.expire_all()
+        return {genre.name: (genre.num_venues, genre.num_artists)
+                for genre in Genre.query}
+
+    def test_genres_are_normalized(self):
+        venue = Venue.query.filter_by(name='The Dueling Pianos Bar').first()
+        self.assertEqual(venue.genres, 'Classical,Jazz')
+        self.assertEqual(sorted(genre.name for genre in venue.genre_list),
+                         ['Classical', 'Jazz'])
+        self.assertEqual(Genre.query.count(), 4)
+
+    def test_genre_counts_are_precomputed(self):
+        self.assertEqual(self.counts(), {
+            'Jazz': (2, 0), 'Reggae': (1, 0), 'Classical': (1, 0),
+            'Rock n Roll': (0, 1)})
+
+    def test_genre_counts_follow_edits_and_deletes(self):
+        artist = Artist.query.first()
+        artist.set_genres('Jazz')
+        db.session.commit()
+        self.assertEqual(self.counts()['Jazz'], (2, 1))
+        self.assertEqual(self.counts()['Rock n Roll'], (0, 0))
+
+        db.session.delete(Venue.query.filter_by(name='The Musical Hop').first())
+        db.session.commit()
+        self.assertEqual(self.counts()['Jazz'], (1, 1))
+        self.assertEqual(self.counts()['Reggae'], (0, 0))
+
+    def test_venue_directory_filters_by_genre(self):
+        data = venue_directory('Reggae')
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['venues'][0]['name'], 'The Musical Hop')
+
+    def test_genre_filtered_pages(self):
+        response = self.client.get('/venues?genre=Classical')
+        self.assertIn(b'The Dueling Pianos Bar', response.data)
+        self.assertNotIn(b'The Musical Hop', response.data)
+
+        response = self.client.get('/artists?genre=Jazz')
+        self.assertNotIn(b'Guns N Petals', response.data)
+
+        response = self.client.get('/genres')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Rock n Roll', response.data)
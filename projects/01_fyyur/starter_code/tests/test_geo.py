@@ -0,0 +1,120 @@
+import unittest
+from app import create_app, db
+from app.geo import bounding_box, covering_cells, distance_km, geohash, locate
+from app.importer import VenueImporter
+from app.models import Venue, locate_venues
+from app.queries import venues_in_box
+
+
+class GeoTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        cities = [('San Francisco', 'CA'), ('Oakland', 'CA'),
+                  ('San Jose', 'CA'), ('New York', 'NY'), ('Nowhere', 'CA')]
+        venues = [Venue(f'Venue {i}', city, state, 'Address', '555', 'Jazz',
+                        '') for i, (city, state) in enumerate(cities)]
+        db.session.add_all(venues)
+        db.session.commit()
+        self.venue_ids = [venue.id for venue in venues]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def near(self, **args):
+        response = self.client.get('/api/v1/venues/near', query_string=args)
+        return response.status_code, response.get_json()
+
+    def test_geohash(self):
+        self.assertEqual(geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geohash(37.7749, -122.4194, 5), '9q8yy')
+
+    def test_locate(self):
+        latitude, longitude, hash = locate(' san francisco ', 'ca')
+        self.assertAlmostEqual(latitude, 37.7749)
+        self.assertEqual(hash, geohash(latitude, longitude))
+        self.assertEqual(locate('Nowhere', 'CA'), (None, None, None))
+        self.assertIsNone(Venue.query.get(self.venue_ids[4]).geohash)
+
+    def test_covering_cells(self):
+        # The cells cover every point of the box, across the antimeridian too
+        for box in [bounding_box(37.7749, -122.4194, 20),
+                    bounding_box(0, 179.9, 50), bounding_box(89.9, 0, 50)]:
+            cells = covering_cells(*box)
+            self.assertLessEqual(len(cells), 4)
+            for latitude in (box[0], (box[0] + box[2]) / 2, box[2]):
+                for longitude in (box[1], (box[1] + box[3]) / 2, box[3]):
+                    hash = geohash(latitude, (longitude + 180) % 360 - 180)
+                    self.assertTrue(any(hash.startswith(cell)
+                                        for cell in cells))
+        self.assertEqual(covering_cells(-90, -180, 90, 180), [''])
+
+    def test_distance(self):
+        # San Francisco to New York
+        self.assertAlmostEqual(
+            distance_km(37.7749, -122.4194, 40.7128, -74.0060), 4130, -1)
+
+    def test_near(self):
+        status, body = self.near(lat=37.7749, lng=-122.4194, radius=20)
+        self.assertEqual(status, 200)
+        self.assertEqual([venue['id'] for venue in body['data']],
+                         self.venue_ids[:2])
+        self.assertEqual(body['data'][0]['distance_km'], 0)
+        self.assertAlmostEqual(body['data'][1]['distance_km'], 13.4, 0)
+
+        status, body = self.near(lat=37.7749, lng=-122.4194, radius=100,
+                                 limit=2)
+        self.assertEqual(len(body['data']), 2)
+        status, body = self.near(lat=37.7749, lng=-122.4194, radius=100)
+        self.assertEqual(len(body['data']), 3)
+
+    def test_bbox(self):
+        status, body = self.near(bbox='-123,37,-121,38')
+        self.assertEqual([venue['id'] for venue in body['data']],
+                         self.venue_ids[:3])
+
+    def test_invalid_parameters(self):
+        for args in [{}, {'lat': 91, 'lng': 0}, {'lat': 0, 'lng': 'east'},
+                     {'lat': 0, 'lng': 0, 'radius': 10000},
+                     {'bbox': '1,2,3'}, {'bbox': '0,10,1,5'}]:
+            with self.subTest(args=args):
+                status, body = self.near(**args)
+                self.assertEqual(status, 400)
+                self.assertEqual(body['error'], 400)
+
+    def test_edited_venues_move(self):
+        data = {'name': 'Venue 0', 'city': 'New York', 'state': 'NY',
+                'address': 'Address', 'phone': '555', 'genres': ['Jazz'],
+                'facebook_link': ''}
+        self.client.post(f'/venues/{self.venue_ids[0]}/edit', data=data)
+        venue = Venue.query.get(self.venue_ids[0])
+        self.assertEqual(venue.geohash, locate('New York', 'NY')[2])
+
+    def test_imported_and_unlocated_venues(self):
+        with db.engine.begin() as connection:
+            importer = VenueImporter(connection)
+            row, errors = importer.validate({
+                'name': 'Imported', 'city': 'Oakland', 'state': 'CA',
+                'address': 'Address', 'phone': '555', 'genres': 'Jazz'})
+            importer.write([row])
+            # Venues written before the coordinates existed
+            connection.execute(Venue.__table__.update().values(
+                latitude=None, longitude=None, geohash=None))
+            self.assertEqual(locate_venues(connection), 5)
+            self.assertEqual(locate_venues(connection), 0)
+        self.assertEqual(venues_in_box(37, -123, 38, -122).count(), 3)
+
+    def test_locating_changes_the_etag(self):
+        url = f'/api/v1/venues/{self.venue_ids[0]}'
+        etag = self.client.get(url).get_etag()[0]
+        with db.engine.begin() as connection:
+            locate_venues(connection, relocate=True)
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.get_etag()[0], etag)
@@ -0,0 +1,205 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from app import create_app, db
+from app.importer import VenueImporter, read_checkpoint, run_import, \
+    write_checkpoint
+from app.models import Artist, Genre, Show, Venue
+from .query_budget import query_budget
+
+
+class ImporterTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.dir = tempfile.mkdtemp()
+        self.messages = []
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+        shutil.rmtree(self.dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def checkpoint(self, path, records):
+        with db.engine.begin() as connection:
+            write_checkpoint(connection, path, records)
+
+    def run_import(self, kind, path, **kwargs):
+        return run_import(kind, path, echo=self.messages.append, **kwargs)
+
+    def test_import_venues_from_csv(self):
+        path = self.write('venues.csv', (
+            'name,city,state,address,phone,genres,facebook_link\n'
+            'The Musical Hop,San Francisco,CA,1015 Folsom,555,"Jazz,Reggae",\n'
+            'Park Square,San Francisco,CA,34 Whiskey,555,Jazz,'
+            'https://www.facebook.com/ParkSquare\n'
+            ',Nowhere,CA,Address,555,Jazz,\n'))
+        stats = self.run_import('venues', path, batch_size=2)
+
+        self.assertEqual((stats['imported'], stats['rejected']), (2, 1))
+        self.assertIn('Record 3 rejected', self.messages[-2])
+        venue = Venue.query.filter_by(name='The Musical Hop').first()
+        self.assertEqual(venue.genres, 'Jazz,Reggae')
+        self.assertEqual(venue.upcoming_shows_count, 0)
+        self.assertEqual(venue.seeking_description, 'Seeking talents!')
+        self.assertEqual(Genre.query.filter_by(name='Jazz').first().num_venues,
+                         2)
+        self.assertEqual(read_checkpoint(path), 0)
+
+    def test_import_artists_from_ndjson(self):
+        path = self.write('artists.ndjson', '\n'.join(json.dumps(record) for
+                                                      record in [
+            {'id': 10, 'name': 'Guns N Petals', 'city': 'San Francisco',
+             'state': 'CA', 'phone': '555', 'genres': ['Rock n Roll']},
+            {'name': 'Matt Quevedo', 'city': 'New York', 'state': 'NY',
+             'phone': '555', 'genres': 'Jazz'},
+        ]))
+        self.run_import('artists', path)
+
+        self.assertEqual(Artist.query.get(10).name, 'Guns N Petals')
+        self.assertEqual(Artist.query.get(11).name, 'Matt Quevedo')
+        self.assertEqual([genre.name for genre in
+                          Artist.query.get(11).genre_list], ['Jazz'])
+
+    def test_import_rejects_taken_ids(self):
+        path = self.write('artists.ndjson', '\n'.join(json.dumps(
+            {'id': id, 'name': name, 'city': 'San Francisco', 'state': 'CA',
+             'phone': '555', 'genres': 'Jazz'}) for id, name in [
+            (10, 'Guns N Petals'), (11, 'Matt Quevedo'), (10, 'Taken'),
+            (12, 'The Wild Sax Band')]))
+        stats = self.run_import('artists', path, batch_size=2)
+        self.assertEqual((stats['imported'], stats['rejected']), (3, 1))
+
+        # A batch of taken ids is rejected instead of failing the import
+        path = self.write('more.ndjson', json.dumps(
+            {'id': 11, 'name': 'Again', 'city': 'San Francisco',
+             'state': 'CA', 'phone': '555', 'genres': 'Jazz'}))
+        stats = self.run_import('artists', path)
+        self.assertEqual((stats['imported'], stats['rejected']), (0, 1))
+        self.assertIn('1 artists skipped: id already taken.', self.messages)
+        self.assertEqual([artist.name for artist in Artist.query.order_by(
+            Artist.id)], ['Guns N Petals', 'Matt Quevedo',
+                          'The Wild Sax Band'])
+
+    def test_import_shows_updates_counters(self):
+        venue = Venue('The Musical Hop', 'San Francisco', 'CA', 'Address',
+                      '555', 'Jazz', '')
+        artist = Artist('Guns N Petals', 'San Francisco', 'CA', '555',
+                        'Rock n Roll', '')
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        venue_id, artist_id = venue.id, artist.id
+
+        future = (datetime.now() + timedelta(days=1)).strftime(
+            '%Y-%m-%d %H:%M:%S')
+        path = self.write('shows.csv', (
+            'artist_id,venue_id,start_time\n'
+            f'{artist_id},{venue_id},2019-05-21 21:30:00\n'
+            f'{artist_id},{venue_id},{future}\n'
+            f'{artist_id},{venue_id},{future}\n'
+            f'{artist_id},999,{future}\n'))
+        stats = self.run_import('shows', path)
+
+        self.assertEqual((stats['imported'], stats['rejected']), (2, 2))
+        self.assertEqual(Show.query.count(), 2)
+        db.session.expire_all()
+        venue = Venue.query.get(venue_id)
+        self.assertEqual((venue.upcoming_shows_count, venue.past_shows_count),
+                         (1, 1))
+
+    def test_import_skips_shows_of_entities_being_deleted(self):
+        venue = Venue('The Musical Hop', 'San Francisco', 'CA', 'Address',
+                      '555', 'Jazz', '')
+        artist = Artist('Guns N Petals', 'San Francisco', 'CA', '555',
+                        'Rock n Roll', '')
+        venue.deleted_at = datetime.utcnow()
+        db.session.add_all([venue, artist])
+        db.session.commit()
+
+        path = self.write('shows.csv', (
+            'artist_id,venue_id,start_time\n'
+            f'{artist.id},{venue.id},2035-05-21 21:30:00\n'))
+        stats = self.run_import('shows', path)
+        self.assertEqual((stats['imported'], stats['rejected']), (0, 1))
+        self.assertEqual(Show.query.count(), 0)
+
+    def test_import_checks_bookings_per_batch(self):
+        venue = Venue('The Musical Hop', 'San Francisco', 'CA', 'Address',
+                      '555', 'Jazz', '')
+        artists = [Artist(f'Artist {i}', 'San Francisco', 'CA', '555',
+                          'Jazz', '') for i in range(3)]
+        db.session.add_all([venue] + artists)
+        db.session.flush()
+        date = datetime(2030, 1, 1, 20)
+        db.session.add(Show(artists[0].id, venue.id, date))
+        db.session.commit()
+
+        lines = ['artist_id,venue_id,start_time,duration']
+        for day in range(1, 31):
+            lines.append(f'{artists[day % 3].id},{venue.id},'
+                         f'{date + timedelta(days=day)},60')
+        # Overlapping the listed show, then a show of the same batch
+        lines.append(f'{artists[1].id},{venue.id},'
+                     f'{date + timedelta(minutes=30)},60')
+        lines.append(f'{artists[2].id},{venue.id},'
+                     f'{date + timedelta(days=5, minutes=30)},60')
+        path = self.write('shows.csv', '\n'.join(lines) + '\n')
+
+        # A constant number of statements per batch, whatever its size
+        with query_budget(self, 10, 'Importing a batch of 32 shows'):
+            stats = self.run_import('shows', path)
+        self.assertEqual((stats['imported'], stats['rejected']), (30, 2))
+        self.assertEqual(Show.query.count(), 31)
+
+    def test_import_resumes_from_checkpoint(self):
+        path = self.write('venues.csv', (
+            'name,city,state,address,phone,genres\n'
+            'The Musical Hop,San Francisco,CA,Address,555,Jazz\n'
+            'Park Square,San Francisco,CA,Address,555,Jazz\n'))
+        self.checkpoint(path, 1)
+        self.run_import('venues', path)
+
+        self.assertEqual([venue.name for venue in Venue.query],
+                         ['Park Square'])
+
+        self.checkpoint(path, 1)
+        self.run_import('venues', path, restart=True)
+        self.assertEqual(Venue.query.count(), 3)
+
+    def test_checkpoints_commit_with_their_batch(self):
+        path = self.write('venues.csv', (
+            'name,city,state,address,phone,genres\n'
+            'The Musical Hop,San Francisco,CA,Address,555,Jazz\n'
+            'Park Square,San Francisco,CA,Address,555,Jazz\n'))
+
+        # The second batch fails: the first one & its checkpoint stay
+        write, calls = VenueImporter.write, []
+
+        def interrupted_write(importer, rows):
+            calls.append(rows)
+            if len(calls) > 1:
+                raise RuntimeError('Interrupted')
+            write(importer, rows)
+
+        with mock.patch.object(VenueImporter, 'write', interrupted_write):
+            with self.assertRaises(RuntimeError):
+                self.run_import('venues', path, batch_size=1)
+        self.assertEqual(read_checkpoint(path), 1)
+
+        # Resuming imports the second one only
+        self.run_import('venues', path, batch_size=1)
+        self.assertEqual([venue.name for venue in Venue.query.order_by(
+            Venue.id)], ['The Musical Hop', 'Park Square'])
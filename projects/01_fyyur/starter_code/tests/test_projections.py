@@ -0,0 +1,55 @@
+import unittest
+from datetime import datetime
+from app import create_app, db
+from app.models import Artist, Show, Venue
+from app.projections import projections
+from app.queries import shows_between
+
+
+class ProjectionsTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+
+        venue = Venue('The Musical Hop', 'San Francisco', 'CA',
+                      '1015 Folsom Street', '555', 'Jazz,Reggae', '')
+        artist = Artist('Guns N Petals', 'San Francisco', 'CA', '555',
+                        'Rock n Roll', 'https://www.facebook.com/GunsNPetals')
+        venue.image_link = 'https://example.com/hop.jpg'
+        db.session.add_all([venue, artist])
+        db.session.commit()
+        db.session.add(Show(artist.id, venue.id, datetime(2035, 4, 1, 20)))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def test_rows_format_like_the_models(self):
+        for (model, profile), projection in projections.items():
+            with self.subTest(model=model.__name__, profile=profile):
+                method = 'format_' + profile
+                expected = [getattr(obj, method)() for obj in
+                            model.query.order_by(*projection.columns)]
+                rows = projection.all(projection.query().order_by(
+                    *projection.columns))
+                self.assertEqual(
+                    [getattr(row, method)() for row in rows], expected)
+
+    def test_rows_are_slotted_tuples(self):
+        projection = projections[Artist, 's']
+        artist, = projection.all(projection.query())
+        self.assertEqual(artist, (artist.id, 'Guns N Petals'))
+        self.assertFalse(hasattr(artist, '__dict__'))
+        # Nothing went through the ORM's identity map
+        self.assertEqual(len(db.session.identity_map), 0)
+
+    def test_show_listing(self):
+        show, = shows_between()
+        self.assertEqual(show.artist_name, 'Guns N Petals')
+        self.assertEqual(show.venue_name, 'The Musical Hop')
+        self.assertEqual(show.format_l()['start_time'], '2035-04-01 20:00:00')
+        self.assertEqual(shows_between(end=datetime(2030, 1, 1)), [])
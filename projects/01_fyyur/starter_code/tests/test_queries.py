@@ -0,0 +1,102 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Artist, Show, Venue
+from app.queries import venue_directory, venue_detail, artist_detail
+
+
+class QueriesTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def seed(self, num_venues):
+        artist = Artist('Artist', 'City', 'ST', '555', 'Jazz', '')
+        db.session.add(artist)
+        db.session.flush()
+
+        now = datetime.now()
+        for i in range(num_venues):
+            venue = Venue(f'Venue {i}', f'City {i % 3}', f'S{i % 2}',
+                          'Address', '555', 'Jazz,Rock', '')
+            db.session.add(venue)
+            db.session.flush()
+            db.session.add(Show(artist.id, venue.id, now + timedelta(days=i + 1)))
+            db.session.add(Show(artist.id, venue.id, now - timedelta(days=i + 1)))
+        db.session.commit()
+
+    def count_queries(self, url):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute',
+                         before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def test_venue_directory_groups_by_city_and_state(self):
+        self.seed(6)
+        data = venue_directory()
+
+        locations = [(area['city'], area['state']) for area in data]
+        self.assertEqual(len(locations), len(set(locations)))
+        self.assertEqual(len(locations), 6)
+
+        for area in data:
+            for venue in area['venues']:
+                self.assertEqual(venue['city'], area['city'])
+                self.assertEqual(venue['state'], area['state'])
+                self.assertEqual(venue['num_upcoming_shows'], 1)
+
+    def test_venues_page_query_count_is_constant(self):
+        self.seed(3)
+        few = self.count_queries('/venues')
+
+        self.seed(30)
+        many = self.count_queries('/venues')
+
+        self.assertEqual(few, many)
+
+    def test_venue_detail_splits_past_and_upcoming_shows(self):
+        self.seed(1)
+        venue = Venue.query.first()
+        data = venue_detail(venue.id, datetime.now())
+
+        self.assertEqual(data['upcoming_shows_count'], 1)
+        self.assertEqual(data['past_shows_count'], 1)
+        self.assertEqual(data['upcoming_shows'][0]['artist_name'], 'Artist')
+
+    def test_artist_detail_splits_past_and_upcoming_shows(self):
+        self.seed(4)
+        artist = Artist.query.first()
+        data = artist_detail(artist.id, datetime.now())
+
+        self.assertEqual(data['upcoming_shows_count'], 4)
+        self.assertEqual(data['past_shows_count'], 4)
+        self.assertIn('venue_name', data['past_shows'][0])
+
+    def test_detail_pages_query_count_is_constant(self):
+        self.seed(2)
+        artist_id = Artist.query.first().id
+        few = self.count_queries(f'/artists/{artist_id}')
+
+        self.seed(20)
+        artist_id = Artist.query.order_by(Artist.id.desc()).first().id
+        venue_id = Venue.query.order_by(Venue.id.desc()).first().id
+        self.assertEqual(few, self.count_queries(f'/artists/{artist_id}'))
+        self.assertEqual(few, self.count_queries(f'/venues/{venue_id}'))
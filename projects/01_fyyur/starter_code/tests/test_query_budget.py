@@ -0,0 +1,127 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import Artist, Show, Venue
+from app.queries import venue_directory
+from tests.query_budget import query_budget, assert_query_budget
+
+
+class QueryBudgetTest(unittest.TestCase):
+    # Request every route of the main blueprint against hundreds of rows,
+    # with a budget of SQL statements which doesn't depend on the row count:
+    # any per-row query (N+1) blows it
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        now = datetime.now()
+        genres = ['Jazz', 'Rock n Roll', 'Classical', 'Folk']
+        venues = [Venue(f'Venue {i}', f'City {i % 10}', 'CA', 'Address',
+                        '555', genres[i % 4], '') for i in range(200)]
+        artists = [Artist(f'Artist {i}', f'City {i % 10}', 'CA', '555',
+                          f'{genres[i % 4]},{genres[(i + 1) % 4]}', '')
+                   for i in range(200)]
+        db.session.add_all(venues + artists)
+        db.session.flush()
+        db.session.add_all(
+            Show(artists[i % 20].id, venues[i * 7 % 20].id,
+                 now + timedelta(days=i - 250))
+            for i in range(500))
+        db.session.commit()
+
+        self.venue_ids = [venue.id for venue in venues[:2]]
+        self.artist_ids = [artist.id for artist in artists[:2]]
+        self.start_time = (now + timedelta(days=1000)).strftime(
+            '%Y-%m-%d %H:%M:%S')
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def routes(self):
+        # (method, url, form data, budget) per endpoint; the routes deleting
+        # rows come last, and use their own venue & artist (their budget
+        # includes the deletion job, run inline in tests, with a single batch
+        # of shows)
+        venue_id, deleted_venue_id = self.venue_ids
+        artist_id, deleted_artist_id = self.artist_ids
+        venue = {'name': 'Venue', 'city': 'City', 'state': 'CA',
+                 'address': 'Address', 'phone': '555', 'genres': ['Jazz'],
+                 'facebook_link': ''}
+        artist = dict(venue)
+        del artist['address']
+        return [
+            ('main.index', 'get', '/', None, 0),
+            ('main.autocomplete_names', 'get', '/api/autocomplete?q=ven',
+             None, 0),
+            ('main.cache_stats', 'get', '/api/cache/stats', None, 0),
+            ('main.export', 'get', '/export/shows.csv', None, 1),
+            ('main.genres', 'get', '/genres', None, 1),
+            ('main.venues', 'get', '/venues?genre=Jazz', None, 1),
+            ('main.search_venues', 'post', '/venues/search',
+             {'search_term': 'venue'}, 1),
+            ('main.show_venue', 'get', f'/venues/{venue_id}', None, 1),
+            ('main.venue_calendar', 'get', f'/venues/{venue_id}/calendar.ics',
+             None, 2),
+            ('main.create_venue_form', 'get', '/venues/create', None, 0),
+            ('main.create_venue_submission', 'post', '/venues/create', venue,
+             5),
+            ('main.artists', 'get', '/artists?genre=Jazz', None, 1),
+            ('main.search_artists', 'post', '/artists/search',
+             {'search_term': 'artist'}, 1),
+            ('main.show_artist', 'get', f'/artists/{artist_id}', None, 1),
+            ('main.artist_calendar', 'get',
+             f'/artists/{artist_id}/calendar.ics', None, 2),
+            ('main.edit_artist', 'get', f'/artists/{artist_id}/edit', None, 1),
+            ('main.edit_artist_submission', 'post',
+             f'/artists/{artist_id}/edit', artist, 8),
+            ('main.edit_venue', 'get', f'/venues/{venue_id}/edit', None, 1),
+            ('main.edit_venue_submission', 'post', f'/venues/{venue_id}/edit',
+             venue, 6),
+            ('main.create_artist_form', 'get', '/artists/create', None, 0),
+            ('main.create_artist_submission', 'post', '/artists/create',
+             artist, 5),
+            ('main.shows', 'get', '/shows', None, 1),
+            ('main.shows', 'get', '/shows?from=2020-01-01&to=2030-01-01', None,
+             1),
+            ('main.create_shows', 'get', '/shows/create', None, 0),
+            ('main.create_show_submission', 'post', '/shows/create', {
+                'artist_id': artist_id, 'venue_id': venue_id,
+                'start_time': self.start_time}, 5),
+            ('main.show_venue', 'post', f'/venues/{deleted_venue_id}', None,
+             20),
+            ('main.show_artist', 'post', f'/artists/{deleted_artist_id}',
+             None, 20),
+        ]
+
+    def test_routes_stay_within_their_query_budget(self):
+        for endpoint, method, url, data, budget in self.routes():
+            with self.subTest(method=method, url=url):
+                with query_budget(self, budget, f'{method.upper()} {url}'):
+                    response = getattr(self.client, method)(url, data=data)
+                    # Streamed responses query as they're read
+                    response.get_data()
+                self.assertLess(response.status_code, 400)
+
+    def test_every_main_route_is_budgeted(self):
+        budgeted = {(endpoint, method.upper())
+                    for endpoint, method, *_ in self.routes()}
+        for rule in self.app.url_map.iter_rules():
+            if rule.endpoint.startswith('main.'):
+                for method in rule.methods - {'HEAD', 'OPTIONS'}:
+                    self.assertIn((rule.endpoint, method), budgeted)
+
+    def test_budget_overruns_fail(self):
+        with self.assertRaises(AssertionError) as context:
+            with query_budget(self, 0, 'Listing'):
+                Venue.query.all()
+        self.assertIn('Listing issued 1 SQL statements', str(context.exception))
+
+    @assert_query_budget(1)
+    def test_venue_directory_is_a_single_query(self):
+        self.assertEqual(len(venue_directory()), 10)
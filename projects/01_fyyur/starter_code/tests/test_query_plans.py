@@ -0,0 +1,156 @@
+import re
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Artist, Show, Venue
+from app.queries import venue_directory, venue_detail, artist_detail, \
+    genre_filter, booking_conflicts, shows_between, venues_near
+from app.ical import calendar_shows
+from app.search import search
+
+# Plan lines reporting a full scan of a table, per dialect: in SQLite any
+# SCAN of a table, even through an index (which reads the whole index), and
+# an automatic index (built from a full scan on every execution); only
+# SEARCHes are index range or key lookups
+FULL_SCANS = {
+    'sqlite': re.compile(r'^(?:SCAN|SEARCH(?=.* USING AUTOMATIC )) '
+                         r'(?!CONSTANT ROW|\()(\w+?)(?:_\d+)?'
+                         r'(?: (?!VIRTUAL TABLE INDEX)|$)'),
+    'postgresql': re.compile(r'Seq Scan on (\w+?)(?:_\d+)?\b'),
+}
+
+
+class QueryPlansTest(unittest.TestCase):
+    # Run the hot queries of views.py against a seeded database and fail if
+    # any plan falls back to a sequential scan of a table it filters on
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+
+        now = datetime.now()
+        genres = ['Jazz', 'Rock n Roll', 'Classical', 'Folk']
+        venues = [Venue(f'Venue {i}', f'City {i % 10}', 'CA', 'Address',
+                        '555', genres[i % 4], '') for i in range(100)]
+        artists = [Artist(f'Artist {i}', f'City {i % 10}', 'CA', '555',
+                          genres[i % 4], '') for i in range(100)]
+        db.session.add_all(venues + artists)
+        db.session.flush()
+        db.session.add_all(
+            Show(artists[i % 100].id, venues[i * 7 % 100].id,
+                 now + timedelta(days=i - 500))
+            for i in range(1000))
+        db.session.commit()
+        db.session.execute('ANALYZE')
+
+        self.date = now
+        self.venue_id = venues[0].id
+        self.artist_id = artists[0].id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def explain(self, query):
+        # Capture every statement issued by `query` and return their plans
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, *args):
+            statements.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            query()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute',
+                         before_cursor_execute)
+
+        dialect = db.engine.dialect.name
+        plans = []
+        with db.engine.connect() as conn:
+            if dialect == 'postgresql':
+                conn.execute('SET enable_seqscan = off')
+                prefix = 'EXPLAIN '
+            else:
+                prefix = 'EXPLAIN QUERY PLAN '
+            for statement, parameters in statements:
+                rows = conn.connection.cursor()
+                rows.execute(prefix + statement, parameters)
+                plans.append([row[-1] for row in rows.fetchall()])
+        return plans
+
+    def assertNoFullScan(self, query, allowed=()):
+        full_scan = FULL_SCANS.get(db.engine.dialect.name)
+        if full_scan is None:
+            self.skipTest(f'no plan checks for {db.engine.dialect.name}')
+
+        plans = self.explain(query)
+        self.assertTrue(plans)
+        for plan in plans:
+            for line in plan:
+                match = full_scan.search(line.strip())
+                if match and match.group(1) not in allowed:
+                    self.fail(f'full scan of {match.group(1)}:\n' +
+                              '\n'.join(plan))
+
+    def test_full_scan_patterns(self):
+        full_scan = FULL_SCANS['sqlite']
+        for line, table in [
+                ('SCAN venues', 'venues'),
+                ('SCAN shows USING INDEX ix_shows_start_time', 'shows'),
+                ('SCAN artists USING COVERING INDEX ix_artists_name',
+                 'artists'),
+                ('SEARCH shows_1 USING AUTOMATIC COVERING INDEX (venue_id=?)',
+                 'shows'),
+                ('SEARCH shows USING INDEX ix_shows_start_time '
+                 '(start_time>?)', None),
+                ('SEARCH artists USING INTEGER PRIMARY KEY (rowid=?)', None),
+                ('SCAN venues_fts VIRTUAL TABLE INDEX 0:M4', None),
+                ('SCAN (subquery-2)', None),
+                ('SCAN CONSTANT ROW', None)]:
+            with self.subTest(line=line):
+                match = full_scan.search(line)
+                self.assertEqual(match and match.group(1), table)
+
+    def test_venue_directory(self):
+        # The whole directory is listed: the one expected full scan
+        self.assertNoFullScan(lambda: venue_directory(),
+                              allowed=('venues',))
+
+    def test_venue_directory_by_genre(self):
+        self.assertNoFullScan(lambda: venue_directory('Jazz'))
+
+    def test_venue_detail(self):
+        self.assertNoFullScan(lambda: venue_detail(self.venue_id, self.date))
+
+    def test_artist_detail(self):
+        self.assertNoFullScan(lambda: artist_detail(self.artist_id, self.date))
+
+    def test_search_venues(self):
+        self.assertNoFullScan(lambda: search(Venue, 'venue 1'))
+
+    def test_search_artists(self):
+        self.assertNoFullScan(lambda: search(Artist, 'jazz'))
+
+    def test_artists_by_genre(self):
+        self.assertNoFullScan(
+            lambda: genre_filter(Artist.query, Artist, 'Folk').all())
+
+    def test_booking_conflicts(self):
+        self.assertNoFullScan(lambda: booking_conflicts(
+            self.venue_id, self.artist_id, self.date, 120))
+
+    def test_shows_between(self):
+        self.assertNoFullScan(lambda: shows_between(
+            self.date, self.date + timedelta(days=7)))
+
+    def test_calendar_shows(self):
+        self.assertNoFullScan(
+            lambda: calendar_shows(Venue, self.venue_id).all())
+
+    def test_venues_near(self):
+        self.assertNoFullScan(lambda: venues_near(37.7749, -122.4194, 20))
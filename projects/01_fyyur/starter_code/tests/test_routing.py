@@ -0,0 +1,75 @@
+import os
+import tempfile
+import time
+import unittest
+from app import create_app, db, page_cache
+from app.models import Venue
+
+
+class ReplicaRoutingTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        fd, self.replica_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.app.config['SQLALCHEMY_BINDS'] = {
+            'replica': 'sqlite:///' + self.replica_path}
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        # The two databases hold different venues, to tell which one answered
+        self.replica = db.get_engine(bind='replica')
+        db.Model.metadata.create_all(self.replica)
+        db.session.add(Venue('Primary Venue', 'San Francisco', 'CA',
+                             'Address', '555', 'Jazz', ''))
+        db.session.commit()
+        self.replica.execute(Venue.__table__.insert(), {
+            'name': 'Replica Venue', 'city': 'San Francisco', 'state': 'CA',
+            'address': 'Address', 'phone': '555', 'genres': 'Jazz'})
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.replica.dispose()
+        self.app_ctx.pop()
+        os.remove(self.replica_path)
+
+    def venue_names(self):
+        response = self.client.get('/api/v1/venues')
+        return [venue['name'] for venue in response.get_json()['data']]
+
+    def test_get_requests_read_from_the_replica(self):
+        self.assertEqual(self.venue_names(), ['Replica Venue'])
+        response = self.client.get('/venues')
+        self.assertIn(b'Replica Venue', response.data)
+
+    def test_cached_pages_are_read_from_the_primary(self):
+        # A cached page outlives the replica's lag, it's rendered from the
+        # primary
+        self.app.config['CACHE_BACKEND'] = 'lru'
+        page_cache.init_app(self.app)
+        for _ in range(2):
+            response = self.client.get('/venues')
+            self.assertIn(b'Primary Venue', response.data)
+        self.assertEqual(page_cache.stats['hits'], 1)
+        self.assertEqual(self.venue_names(), ['Replica Venue'])
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual([venue.name for venue in Venue.query],
+                         ['Primary Venue'])
+
+    def test_clients_read_their_writes_from_the_primary(self):
+        self.client.post('/venues/create', data={
+            'name': 'New Venue', 'city': 'San Francisco', 'state': 'CA',
+            'address': 'Address', 'phone': '555', 'genres': ['Jazz']})
+        self.assertEqual(self.venue_names(), ['Primary Venue', 'New Venue'])
+
+        with self.client.session_transaction() as session:
+            session['primary_until'] = time.time() - 1
+        self.assertEqual(self.venue_names(), ['Replica Venue'])
+
+    def test_lagging_replica_falls_back_to_the_primary(self):
+        self.app.extensions['replica'] = {
+            'checked': time.monotonic(), 'lag': 60}
+        self.assertEqual(self.venue_names(), ['Primary Venue'])
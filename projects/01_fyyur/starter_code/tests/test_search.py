@@ -0,0 +1,114 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import Artist, Show, Venue
+from app.search import LikeSearch, SqliteSearch, search
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        now = datetime.now()
+        self.artist = Artist('The Wild Sax Band', 'San Francisco', 'CA',
+                             '555', 'Jazz,Classical', '')
+        db.session.add(self.artist)
+        db.session.add_all([
+            Venue('The Musical Hop', 'San Francisco', 'CA', 'Address', '555',
+                  'Jazz,Reggae,Swing', ''),
+            Venue('Park Square Live Music & Coffee', 'San Francisco', 'CA',
+                  'Address', '555', 'Rock n Roll,Jazz,Classical', ''),
+            Venue('The Dueling Pianos Bar', 'New York', 'NY', 'Address',
+                  '555', 'Classical,R&B,Hip-Hop', ''),
+        ])
+        db.session.flush()
+        for venue in Venue.query.all():
+            db.session.add(Show(self.artist.id, venue.id,
+                                now + timedelta(days=venue.id)))
+        db.session.add(Show(self.artist.id, venue.id, now - timedelta(days=1)))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def names(self, results):
+        return sorted(result['name'] for result in results['data'])
+
+    def test_search_matches_name_prefix_case_insensitively(self):
+        for backend in (SqliteSearch(), LikeSearch()):
+            results = backend.search(Venue, 'musi')
+            self.assertEqual(self.names(results),
+                             ['Park Square Live Music & Coffee',
+                              'The Musical Hop'])
+
+    def test_search_covers_city_state_and_genres(self):
+        for backend in (SqliteSearch(), LikeSearch()):
+            self.assertEqual(
+                backend.search(Venue, 'new york')['count'], 1)
+            self.assertEqual(backend.search(Venue, 'ny')['count'], 1)
+            self.assertEqual(
+                backend.search(Venue, 'hip-hop')['count'], 1)
+            self.assertEqual(
+                backend.search(Artist, 'jazz')['count'], 1)
+
+    def test_search_counts_upcoming_shows(self):
+        results = search(Artist, 'wild sax')
+        self.assertEqual(results['data'][0]['num_upcoming_shows'], 3)
+
+        results = search(Venue, 'dueling')
+        self.assertEqual(results['data'][0]['num_upcoming_shows'], 1)
+
+    def test_search_paginates(self):
+        self.app.config['SEARCH_PER_PAGE'] = 2
+        first = search(Venue, '', page=1)
+        second = search(Venue, '', page=2)
+
+        self.assertEqual(first['count'], 3)
+        self.assertEqual(len(first['data']), 2)
+        self.assertEqual(len(second['data']), 1)
+        self.assertNotIn(second['data'][0], first['data'])
+
+        # Past the last page, the total is still reported
+        for backend in (SqliteSearch(), LikeSearch()):
+            past = backend.search(Venue, 'san francisco', page=5, per_page=2)
+            self.assertEqual(past['data'], [])
+            self.assertEqual(past['count'], 2)
+
+    def test_bookings_dont_reindex(self):
+        # The counters & updated_at changes of a booking leave the FTS rows
+        fts_rows = 'SELECT count(*) FROM venues_fts_data'
+        before = db.session.execute(fts_rows).scalar()
+        venue = Venue.query.first()
+        db.session.add(Show(self.artist.id, venue.id,
+                            datetime.now() + timedelta(days=30)))
+        db.session.commit()
+        self.assertEqual(db.session.execute(fts_rows).scalar(), before)
+        self.assertEqual(search(Venue, 'musical')['count'], 1)
+
+    def test_search_index_follows_updates_and_deletes(self):
+        venue = Venue.query.filter_by(name='The Musical Hop').first()
+        venue.name = 'The Jazz Cellar'
+        db.session.commit()
+        self.assertEqual(search(Venue, 'musical')['count'], 0)
+        self.assertEqual(search(Venue, 'cellar')['count'], 1)
+
+        db.session.delete(venue)
+        db.session.commit()
+        self.assertEqual(search(Venue, 'cellar')['count'], 0)
+
+    def test_search_pages_render(self):
+        response = self.client.post('/artists/search',
+                                    data={'search_term': 'sax'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'The Wild Sax Band', response.data)
+
+        response = self.client.post('/venues/search',
+                                    data={'search_term': 'piano'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'The Dueling Pianos Bar', response.data)
@@ -0,0 +1,56 @@
+import unittest
+from datetime import datetime
+from app import create_app, db
+from app.exporter import export_lines
+from app.models import Show, Venue
+from app.seed import seed
+
+
+class SeedTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.date = datetime(2030, 1, 1)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def seed(self, **kwargs):
+        return seed(50, 40, 1000, date=self.date, batch_size=300,
+                    echo=lambda message: None, **kwargs)
+
+    def export(self):
+        return {kind: ''.join(export_lines(kind)) for kind in
+                ('venues', 'artists', 'shows')}
+
+    def test_seed_is_deterministic(self):
+        self.seed()
+        first = self.export()
+        db.drop_all()
+        db.create_all()
+        self.seed()
+        self.assertEqual(self.export(), first)
+
+        db.drop_all()
+        db.create_all()
+        self.seed(seed=1)
+        self.assertNotEqual(self.export()['venues'], first['venues'])
+
+    def test_seeded_distributions(self):
+        counts = self.seed(past_ratio=0.8)
+        self.assertEqual((counts['venues'], counts['artists']), (50, 40))
+        self.assertEqual(Show.query.count(), counts['shows'])
+        self.assertGreater(counts['shows'], 900)
+
+        past = Show.query.filter(Show.start_time < self.date).count()
+        self.assertAlmostEqual(past / counts['shows'], 0.8, delta=0.05)
+
+        # The busiest venue hosts far more shows than the median one
+        totals = sorted(venue.upcoming_shows_count + venue.past_shows_count
+                        for venue in Venue.query)
+        self.assertEqual(sum(totals), counts['shows'])
+        self.assertGreater(totals[-1], 5 * totals[len(totals) // 2])
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from import_profile import format_report, parse_import_times
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules a web worker must not import at boot
+DEFERRED = ['alembic', 'flask_migrate', 'dateutil', 'mako']
+
+IMPORT_TIMES = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2000 |       2500 |     babel.core
+import time:       300 |       2800 |   babel
+import time:      1000 |       3800 | fyyur
+"""
+
+
+class StartupTest(unittest.TestCase):
+    def run_python(self, code, **env):
+        env = dict(os.environ, FLASK_CONFIG='testing', TEST_DB_URL='sqlite://',
+                   **env)
+        return subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                              check=True, capture_output=True, text=True)
+
+    def test_lazy_imports(self):
+        output = self.run_python(
+            'import json, sys, fyyur\n'
+            'print(json.dumps(sorted(sys.modules)))').stdout
+        modules = {name.split('.')[0] for name in json.loads(output)}
+        for name in DEFERRED:
+            self.assertNotIn(name, modules)
+
+    def test_migrate_is_set_up_by_the_db_command(self):
+        output = self.run_python(
+            'import fyyur\n'
+            'runner = fyyur.app.test_cli_runner()\n'
+            'print(runner.invoke(args=["db", "--help"]).output)\n'
+            'print("migrate" in fyyur.app.extensions)').stdout
+        self.assertIn('upgrade', output)
+        self.assertTrue(output.strip().endswith('True'))
+
+    def test_profile_report(self):
+        stderr = self.run_python('import fyyur',
+                                 FYYUR_PROFILE_IMPORT='1').stderr
+        self.assertRegex(stderr, r'^\d+ modules imported in [\d.]+ ms')
+        self.assertIn('app.models', stderr)
+
+    def test_parse_import_times(self):
+        self.assertEqual(parse_import_times(IMPORT_TIMES), [
+            ('_io', 120, 120, 1), ('babel.core', 2000, 2500, 2),
+            ('babel', 300, 2800, 1), ('fyyur', 1000, 3800, 0)])
+
+    def test_format_report(self):
+        report = format_report(parse_import_times(IMPORT_TIMES), top=2)
+        lines = report.splitlines()
+        self.assertEqual(lines[0], '4 modules imported in 3.4 ms')
+        # The packages, then the modules, by their own time
+        self.assertEqual(lines[2].split(), ['2.3', 'babel'])
+        self.assertEqual(lines[3].split(), ['1.0', 'fyyur'])
+        self.assertEqual(lines[5].split(), ['2.0', '2.5', 'babel.core'])
+        self.assertEqual(len(lines), 7)
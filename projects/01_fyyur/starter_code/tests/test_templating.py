@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from app import create_app
+from app.templating import compile_templates, init_bytecode_cache
+
+
+class TemplateCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_app(self):
+        app = create_app('testing')
+        app.config['TEMPLATE_CACHE_DIR'] = self.directory
+        init_bytecode_cache(app)
+        return app
+
+    def test_disabled_in_tests(self):
+        self.assertIsNone(create_app('testing').jinja_env.bytecode_cache)
+
+    def test_precompiled_templates_are_not_compiled_again(self):
+        timings = compile_templates(self.make_app())
+        self.assertIn('layouts/main.html', timings)
+        self.assertIn('pages/home.html', timings)
+        self.assertEqual(len(os.listdir(self.directory)), len(timings))
+
+        # A fresh worker loads the bytecode instead of compiling
+        fresh = self.make_app()
+        with mock.patch.object(fresh.jinja_env, 'compile',
+                               wraps=fresh.jinja_env.compile) as compile:
+            for name in timings:
+                fresh.jinja_env.get_template(name)
+        compile.assert_not_called()
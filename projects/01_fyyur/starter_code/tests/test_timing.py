@@ -0,0 +1,76 @@
+import json
+import logging
+import re
+import unittest
+from app import create_app, db
+from app.models import Venue
+
+
+class RequestTimingTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_ctx = self.app.app_context()
+        self.app_ctx.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        venue = Venue('The Musical Hop', 'San Francisco', 'CA', 'Address',
+                      '555', 'Jazz', '')
+        db.session.add(venue)
+        db.session.commit()
+        self.venue_id = venue.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_ctx.pop()
+
+    def server_timing(self, response):
+        return {name: (float(duration), rest) for name, duration, rest in
+                re.findall(r'(\w+);dur=([\d.]+)(;desc="[^"]*")?',
+                           response.headers['Server-Timing'])}
+
+    def test_server_timing_header(self):
+        with self.assertLogs('fyyur.timing', 'INFO') as logs:
+            response = self.client.get(f'/venues/{self.venue_id}')
+        timing = self.server_timing(response)
+        self.assertEqual(set(timing), {'db', 'tpl', 'total'})
+        self.assertGreater(timing['tpl'][0], 0)
+        self.assertGreaterEqual(timing['total'][0], timing['tpl'][0])
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], f'/venues/{self.venue_id}')
+        self.assertGreater(record['queries'], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"',
+                      response.headers['Server-Timing'])
+        self.assertNotIn('statements', record)
+
+    def test_slow_requests_log_their_statements(self):
+        self.app.config['SLOW_REQUEST_MS'] = 0
+        with self.assertLogs('fyyur.timing', 'WARNING') as logs:
+            self.client.get('/api/v1/venues')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertTrue(record['slow'])
+        self.assertEqual(len(record['statements']), record['queries'])
+        self.assertIn('FROM venues', record['statements'][-1]['sql'])
+
+    def test_request_lines_are_logged(self):
+        # Without any logging configuration
+        logger = logging.getLogger('fyyur.timing')
+        self.assertTrue(logger.isEnabledFor(logging.INFO))
+        self.assertTrue(logger.handlers)
+
+    def test_streamed_bodies_are_timed(self):
+        with self.assertLogs('fyyur.timing', 'INFO') as logs:
+            response = self.client.get('/export/venues.csv')
+            self.assertEqual(logs.records, [])
+            self.assertIn('The Musical Hop', response.get_data(as_text=True))
+            response.close()
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], '/export/venues.csv')
+        # The export's query ran while the body was sent
+        self.assertGreater(record['queries'], 0)
+
+    def test_timing_can_be_disabled(self):
+        self.app.config['REQUEST_TIMING'] = False
+        self.assertNotIn('Server-Timing', self.client.get('/').headers)